@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+analyze-usage の参照解決を、合成したオブジェクト群で計測するベンチマークです。
+
+従来の「全ソースを連結して name in full_source_code で判定する」方式と、
+識別子索引（ReferenceIndex）による方式の処理時間を比較します。
+
+    python benchmarks/bench_reference_index.py [オブジェクト数 ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from src.core.reference_index import ReferenceIndex, extract_public_procedures
+
+CATEGORIES = ["Forms", "Reports", "Macros", "Modules", "Queries"]
+LINES_PER_OBJECT = 200
+
+
+def build_corpus(object_count, seed=0):
+    rng = random.Random(seed)
+    objects = [(CATEGORIES[i % len(CATEGORIES)], f"Obj{i}") for i in range(object_count)]
+    sources = {}
+    for category, name in objects:
+        lines = []
+        for line_no in range(LINES_PER_OBJECT):
+            target_category, target = rng.choice(objects)
+            if line_no % 10 == 0:
+                lines.append(f'    DoCmd.OpenForm "{target}"')
+            elif line_no % 10 == 1:
+                lines.append(f"    Set rs = db.OpenRecordset(\"SELECT * FROM [{target}]\")")
+            else:
+                lines.append(f"    x{line_no} = y{line_no} + Calc{line_no}(z) ' {name}")
+        if category == "Modules":
+            lines.insert(0, f"Public Function Fn_{name}()")
+            lines.append("End Function")
+        sources[(category, name)] = "\n".join(lines)
+    return objects, sources
+
+
+def run_legacy(objects, sources):
+    full_source_code = ""
+    for owner in objects:
+        full_source_code += sources[owner] + '\n'
+    return [owner for owner in objects if owner[1] not in full_source_code]
+
+
+def run_indexed(objects, sources):
+    index = ReferenceIndex()
+    module_symbols = {}
+    for owner in objects:
+        index.add_source(owner, sources[owner])
+        if owner[0] == "Modules":
+            module_symbols[owner[1]] = extract_public_procedures(sources[owner])
+    return index.find_unused(objects, module_symbols)
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'objects':>8} {'source MB':>10} {'legacy (s)':>12} {'indexed (s)':>12} {'speedup':>8}")
+    for size in sizes:
+        objects, sources = build_corpus(size)
+        source_mb = sum(len(text) for text in sources.values()) / 1024 / 1024
+        legacy_time, _ = measure(run_legacy, objects, sources)
+        indexed_time, _ = measure(run_indexed, objects, sources)
+        print(f"{size:>8} {source_mb:>10.1f} {legacy_time:>12.3f} {indexed_time:>12.3f} {legacy_time / indexed_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [200, 800, 1800])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+CLIの起動時間をコマンドごとに計測するベンチマークです。
+
+各コマンドについて新しいPythonプロセスで `main.py <コマンド> --help` を実行した時間と、
+コマンドモジュールのインポートにかかった時間、およびその時点で読み込まれていた
+重いモジュール（win32com, pyodbc, webbrowser など）を表示します。
+
+    python benchmarks/bench_startup.py [実行回数]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+MAIN_SCRIPT = os.path.join(PROJECT_ROOT, "src", "main.py")
+
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.main import COMMANDS
+
+HEAVY_MODULES = ["win32com", "pythoncom", "pyodbc", "webbrowser", "openpyxl"]
+
+# 新しいプロセスでコマンドモジュールを読み込み、所要時間と読み込まれた重いモジュールを出力する
+IMPORT_PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def measure_help(command, runs):
+    args = [sys.executable, MAIN_SCRIPT] + ([command] if command else []) + ["--help"]
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=PROJECT_ROOT, check=False)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_import(module_name, runs):
+    code = IMPORT_PROBE.format(root=PROJECT_ROOT, module=module_name, heavy=HEAVY_MODULES)
+    timings = []
+    heavy = ""
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=PROJECT_ROOT)
+        if output.returncode != 0:
+            return None, output.stderr.strip().splitlines()[-1]
+        elapsed, _, heavy = output.stdout.strip().partition(" ")
+        timings.append(float(elapsed))
+    return statistics.median(timings), heavy
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"実行回数: {runs}回（中央値）")
+    print(f"{'コマンド':<18}{'--help (ms)':>14}{'import (ms)':>14}  読み込まれた重いモジュール")
+    print(f"{'(なし)':<18}{measure_help(None, runs) * 1000:>14.1f}{'':>14}")
+    for name, (module_name, _) in COMMANDS.items():
+        help_seconds = measure_help(name, runs)
+        import_seconds, heavy = measure_import(module_name, runs)
+        import_text = f"{import_seconds * 1000:.1f}" if import_seconds is not None else "失敗"
+        print(f"{name:<18}{help_seconds * 1000:>14.1f}{import_text:>14}  {heavy or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ python -m nuitka ^
     --standalone ^
     --windows-console-mode=force ^
     --output-filename=AccessDevKit.exe ^
+    --include-package=src.command ^
     --include-package=typer ^
     --include-package=rich ^
     --include-package=pyodbc ^
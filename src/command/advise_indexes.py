@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import os
+import typer
+from rich.console import Console
+from rich.table import Table
+from rich.markup import escape
+import logging
+
+from src.utils import handle_com_error
+from src.core.access_handler import access_application, get_access_query_sql, read_exported_query_sql, temporary_access_copy
+from src.core.db_operations import (db_connection, get_table_names, get_table_columns, get_table_indexes,
+                                    get_table_row_count, measure_query)
+from src.core.benchmark_stats import run_adaptive
+from src.core.index_advisor import rank_index_suggestions, validate_suggestion
+
+console = Console()
+logger = logging.getLogger(__name__)
+
+def collect_table_metadata(conn):
+    """全てのテーブルの列・インデックス・行数を取得し、(列, インデックス, 行数) の辞書を返します。"""
+    table_columns, indexes, row_counts = {}, {}, {}
+    for table in get_table_names(conn):
+        table_columns[table] = [name for name, _ in get_table_columns(conn, table)]
+        indexes[table] = list(get_table_indexes(conn, table).values())
+        try:
+            row_counts[table] = get_table_row_count(conn, table)
+        except Exception as e:
+            logger.warning(f"テーブル '{table}' の行数を取得できませんでした: {e}")
+    return table_columns, indexes, row_counts
+
+def advise_indexes(file_path: str = typer.Argument(..., help="分析対象のAccessファイルのパス"),
+                   export_dir: str = typer.Option(None, "--export-dir", help="export コマンドで出力したフォルダー。指定すると .qry ファイルからSQLを読み込み、Accessを起動しません。"),
+                   top: int = typer.Option(20, "--top", "-n", min=1, help="表示する候補の最大件数。"),
+                   validate: bool = typer.Option(False, "--validate", help="上位の候補について、一時コピーにインデックスを追加して、使用しているクエリの実行時間を追加の前後で比較します。"),
+                   validate_count: int = typer.Option(5, "--validate-count", min=1, help="--validate で検証する候補の件数。"),
+                   runs: int = typer.Option(5, "--runs", "-r", min=1, help="--validate で各クエリを実行する回数（ウォームアップを除く）。")):
+    """
+    保存済みクエリのSQLを解析し、インデックスを追加すると効果がありそうな列を提案します。
+
+    各クエリの JOIN の結合条件・WHERE 句・ORDER BY 句で使用されている列を集計し、
+    既存のインデックス（cursor.statistics() で取得）の先頭列になっていない列を、
+    使用しているクエリの数・句の種類（結合 > 抽出条件 > 並べ替え）・テーブルの行数から算出したスコアの順に表示します。
+
+    `--validate` を指定すると、上位 `--validate-count` 件の候補について、Accessファイルの一時コピーにインデックスを追加し、
+    候補を使用しているクエリの実行時間の中央値を追加の前後で比較します。元のファイルは変更されません。
+    """
+    file_path = os.path.abspath(file_path)
+    logger.info(f"advise-indexes コマンドが実行されました。ファイルパス: {file_path}, エクスポートフォルダー: {export_dir}, "
+                f"件数: {top}, 検証: {validate}")
+    if not os.path.exists(file_path):
+        console.print(f"[bold red]エラー: ファイルが見つかりません: {file_path}[/bold red]")
+        logger.error(f"ファイルが見つかりません: {file_path}")
+        raise typer.Exit(code=1)
+    if export_dir and not os.path.isdir(export_dir):
+        console.print(f"[bold red]エラー: フォルダーが見つかりません: {export_dir}[/bold red]")
+        logger.error(f"フォルダーが見つかりません: {export_dir}")
+        raise typer.Exit(code=1)
+
+    try:
+        with console.status("[bold green]クエリのSQLを読み込み中...[/]"):
+            if export_dir:
+                query_sql = read_exported_query_sql(export_dir)
+            else:
+                with access_application(file_path) as app:
+                    query_sql = get_access_query_sql(app)
+        if not query_sql:
+            console.print("[yellow]警告: 分析できるクエリが見つかりませんでした。[/yellow]")
+            logger.warning("分析できるクエリが見つかりませんでした。")
+            return
+        console.print(f"[cyan]{len(query_sql)}件のクエリを分析します。[/cyan]")
+        logger.info(f"{len(query_sql)}件のクエリを分析します。")
+
+        with console.status("[bold green]テーブルとインデックスの情報を取得中...[/]"):
+            with db_connection(file_path, readonly=True) as conn:
+                table_columns, indexes, row_counts = collect_table_metadata(conn)
+
+        suggestions = rank_index_suggestions(query_sql, indexes, row_counts, table_columns)[:top]
+        if not suggestions:
+            console.print("[bold green]✅ インデックスの追加が必要な列は見つかりませんでした。[/bold green]")
+            logger.info("インデックスの追加が必要な列は見つかりませんでした。")
+            return
+
+        table = Table(title="インデックスの候補", title_justify="left", show_header=True, header_style="bold ")
+        table.add_column("順位", justify="right")
+        table.add_column("テーブル", style="cyan")
+        table.add_column("列", style="green")
+        table.add_column("スコア", style="yellow", justify="right")
+        table.add_column("行数", justify="right")
+        table.add_column("使用箇所")
+        table.add_column("クエリ")
+        for rank, suggestion in enumerate(suggestions, 1):
+            rows = "-" if suggestion["rows"] is None else f"{suggestion['rows']:,}"
+            queries = ", ".join(suggestion["queries"][:5]) + (f" 他{len(suggestion['queries']) - 5}件" if len(suggestion["queries"]) > 5 else "")
+            table.add_row(str(rank), escape(suggestion["table"]), escape(suggestion["column"]), f"{suggestion['score']:.1f}", rows,
+                          ", ".join(suggestion["clauses"]), escape(queries))
+            logger.info(f"インデックスの候補 {rank}: [{suggestion['table']}].[{suggestion['column']}] スコア={suggestion['score']:.1f}, "
+                        f"行数={suggestion['rows']}, 使用箇所={suggestion['clauses']}, クエリ={suggestion['queries']}")
+        console.print(table)
+
+        if not validate:
+            return
+
+        def benchmark(conn, query_name):
+            result = run_adaptive(query_name, lambda: measure_query(conn, query_name), warmup=1, min_runs=runs, max_runs=runs)
+            if result.error:
+                raise RuntimeError(result.error)
+            return result.to_dict()["median"]
+
+        validation = Table(title="インデックスの追加前後の実行時間（中央値）", title_justify="left", show_header=True, header_style="bold ")
+        validation.add_column("候補", style="green")
+        validation.add_column("クエリ")
+        validation.add_column("追加前 (秒)", justify="right")
+        validation.add_column("追加後 (秒)", justify="right")
+        validation.add_column("改善率", style="yellow", justify="right")
+        with temporary_access_copy(file_path) as (temp_path, _):
+            with db_connection(temp_path) as conn:
+                for suggestion in suggestions[:validate_count]:
+                    label = f"[{suggestion['table']}].[{suggestion['column']}]"
+                    with console.status(f"[bold green]{escape(label)} を検証中...[/]"):
+                        try:
+                            timings = validate_suggestion(conn, suggestion, benchmark)
+                        except Exception as e:
+                            console.print(f"[yellow]{escape(label)} のインデックスを追加できませんでした: {e}[/yellow]")
+                            logger.warning(f"{label} のインデックスを追加できませんでした: {e}")
+                            continue
+                    for query_name, (before, after) in timings.items():
+                        if before is None or after is None:
+                            change = "測定できませんでした"
+                        else:
+                            change = f"{1 - after / before:+.1%}" if before > 0 else "-"
+                        format_seconds = lambda value: "-" if value is None else f"{value:.4f}"
+                        validation.add_row(escape(label), escape(query_name), format_seconds(before), format_seconds(after), change)
+                        logger.info(f"{label} の検証: クエリ '{query_name}' 追加前={before}, 追加後={after}")
+        console.print(validation)
+
+    except Exception as e:
+        handle_com_error(e)
+        logger.error(f"advise-indexes コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
+        raise typer.Exit(code=1)
@@ -4,18 +4,19 @@ import typer
 from rich.console import Console
 from rich.table import Table
 from datetime import datetime
-import webbrowser
 import logging
 
-from src.utils import handle_com_error
+from src.utils import handle_com_error, open_in_browser
 from src.core.access_handler import access_application, analyze_usage as core_analyze_usage
+from src.core.export_cache import open_export_cache
 from src.core.reporting import ReportGenerator
 from src.constants import UNUSED_OBJECTS_REPORT_PATH
 
 console = Console()
 logger = logging.getLogger(__name__)
 
-def analyze_usage(file_path: str = typer.Argument(..., help="分析対象のAccessファイルのパス")):
+def analyze_usage(file_path: str = typer.Argument(..., help="分析対象のAccessファイルのパス"),
+                  use_cache: bool = typer.Option(True, "--cache/--no-cache", help="変更されていないオブジェクトのエクスポート結果をキャッシュから再利用します。")):
     """
     指定されたAccessファイル（.accdbまたは.mdb）内の未使用の可能性のあるオブジェクトを分析し、HTMLレポートを生成します。
 
@@ -41,13 +42,18 @@ def analyze_usage(file_path: str = typer.Argument(..., help="分析対象のAcce
     html_output_path = UNUSED_OBJECTS_REPORT_PATH
 
     report_generator = ReportGenerator()
+    cache = open_export_cache(file_path, use_cache)
 
     try:
         with access_application(file_path) as app:
             console.print(f"[cyan]オブジェクトの参照状況を分析中...（時間がかかる場合があります）[/cyan]")
             logger.info("オブジェクトの参照状況を分析中...")
             with console.status("[bold green]分析中...[/]"):
-                unused_objects = core_analyze_usage(app)
+                unused_objects = core_analyze_usage(app, cache)
+            if cache:
+                cache.save()
+                console.print(f"[dim]{cache.summary()}[/dim]")
+                logger.info(cache.summary())
 
             if not unused_objects:
                 console.print("[bold green]✅ 未使用の可能性が高いオブジェクトは見つかりませんでした。[/bold green]")
@@ -57,7 +63,7 @@ def analyze_usage(file_path: str = typer.Argument(..., help="分析対象のAcce
                 report_generator.create_unused_objects_report([], html_output_path, report_datetime, file_path)
                 console.print(f"\n[bold green]✅ 未使用オブジェクトレポートを '{html_output_path}' に出力しました。[/bold green]")
                 logger.info(f"未使用オブジェクトレポートを '{html_output_path}' に出力しました。")
-                webbrowser.open(os.path.abspath(html_output_path))
+                open_in_browser(os.path.abspath(html_output_path))
                 return
 
             console.print("\n[yellow]⚠️ 以下のオブジェクトは、どこからも参照されていない可能性があります。[/yellow]")
@@ -78,7 +84,7 @@ def analyze_usage(file_path: str = typer.Argument(..., help="分析対象のAcce
             report_generator.create_unused_objects_report(unused_objects, html_output_path, report_datetime, file_path)
             console.print(f"\n[bold green]✅ 未使用オブジェクトレポートを '{html_output_path}' に出力しました。[/bold green]")
             logger.info(f"未使用オブジェクトレポートを '{html_output_path}' に出力しました。")
-            webbrowser.open(os.path.abspath(html_output_path))
+            open_in_browser(os.path.abspath(html_output_path))
 
     except Exception as e:
         handle_com_error(e)
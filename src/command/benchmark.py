@@ -1,26 +1,248 @@
 # -*- coding: utf-8 -*>
 import os
+import math
+import contextlib
 import typer
 import time
 from rich.console import Console
 from rich.table import Table
+from rich.markup import escape
 from datetime import datetime
-import webbrowser
 import logging
 
-from src.utils import handle_com_error
-from src.core.db_operations import db_connection, run_benchmark as core_run_benchmark
+from src.utils import handle_com_error, open_in_browser
+from src.core.db_operations import db_connection, open_odbc_connection, run_query, measure_query, measure_statement
+from src.core.benchmark_stats import run_adaptive, trace_peak_memory
+from src.core.load_test import parse_query_mix, run_load_test
+from src.core.form_benchmark import benchmark_form, record_source_sql
+from src.core.parameter_sets import load_parameter_sets, ParameterCycle
+from src.core.benchmark_history import BenchmarkHistory, compare_runs, detect_version, machine_name
 from src.core.reporting import ReportGenerator
-from src.constants import BENCHMARK_REPORT_PATH
-from src.core.access_handler import access_application, get_access_query_names
+from src.constants import BENCHMARK_REPORT_PATH, LOAD_TEST_REPORT_PATH, BENCHMARK_HISTORY_PATH, BENCHMARK_TREND_RUNS
+from src.core.access_handler import (
+    access_application, get_access_query_names, get_access_form_names, temporary_access_copy, get_linked_table_names,
+)
 
 console = Console()
 logger = logging.getLogger(__name__)
 
+# アクションクエリの実行方法（none: 読み取り専用で実行しない、rollback: 元のファイルで実行してロールバック、copy: 一時コピーで実行してロールバック）
+# copy の一時コピーはフロントエンドのみのため、リンクテーブルのデータはロールバックでのみ保護される
+ACTION_MODES = ("none", "rollback", "copy")
+
+def run_load_test_mode(file_path, query_mix, users, duration):
+    console.print(f"[cyan]負荷テストを開始します（ユーザー数: {users}、実行時間: {duration}秒、クエリ: "
+                  f"{', '.join(f'{name}×{weight:g}' for name, weight in query_mix)}）[/cyan]")
+    logger.info(f"負荷テストを開始します（ユーザー数: {users}、実行時間: {duration}秒、クエリ: {query_mix}）")
+    # 各ユーザーは実際の利用者と同じく専用の接続を使用する（接続プールは使用しない）
+    open_connection = lambda: contextlib.closing(open_odbc_connection(file_path))
+    with console.status(f"[bold green]{users}ユーザーでクエリを実行中...[/]"):
+        result = run_load_test(open_connection, run_query, query_mix, users, duration)
+
+    console.print(f"\n[bold]スループット: {result.throughput:.2f} クエリ/秒[/bold]（成功 {result.completed}件, "
+                  f"エラー {result.errors}件, ロックの競合 {result.lock_errors}件, 経過時間 {result.elapsed:.1f}秒）")
+    logger.info(f"負荷テストの結果: スループット {result.throughput:.2f} クエリ/秒, 成功 {result.completed}件, "
+                f"エラー {result.errors}件, ロックの競合 {result.lock_errors}件")
+    if result.connect_errors:
+        console.print(f"[bold red]{len(result.connect_errors)}人のユーザーが接続できませんでした: {result.connect_errors[0]}[/bold red]")
+        logger.error(f"{len(result.connect_errors)}人のユーザーが接続できませんでした: {result.connect_errors}")
+
+    format_seconds = lambda value: "-" if value is None else f"{value:.4f}"
+    table = Table(title="クエリ別のレイテンシー", title_justify="left", show_header=True, header_style="bold ")
+    table.add_column("クエリ名", style="green")
+    table.add_column("成功", justify="right")
+    table.add_column("p50 (秒)", style="yellow", justify="right")
+    table.add_column("p95 (秒)", justify="right")
+    table.add_column("p99 (秒)", justify="right")
+    table.add_column("最大 (秒)", justify="right")
+    table.add_column("エラー", style="red", justify="right")
+    table.add_column("ロックの競合", style="red", justify="right")
+    for row in result.per_query():
+        table.add_row(row["name"], str(row["count"]), format_seconds(row["p50"]), format_seconds(row["p95"]),
+                      format_seconds(row["p99"]), format_seconds(row["max"]), str(row["errors"]), str(row["lock_errors"]))
+    console.print(table)
+
+    report_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    ReportGenerator().create_load_test_report(result, LOAD_TEST_REPORT_PATH, report_datetime, file_path)
+    console.print(f"\n[bold green]✅ 負荷テストのレポートを '{LOAD_TEST_REPORT_PATH}' に出力しました。[/bold green]")
+    logger.info(f"負荷テストのレポートを '{LOAD_TEST_REPORT_PATH}' に出力しました。")
+    open_in_browser(os.path.abspath(LOAD_TEST_REPORT_PATH))
+
+def record_and_compare(file_path, results, history, tag, compare_to, max_slowdown, alpha, kind):
+    """
+    測定結果（BenchmarkResult.to_dict() のリスト）を履歴に保存し、ベースラインと比較して (推移, 比較結果) を返します。
+
+    kind は測定対象の種類（"query" または "form"）で、ベースラインと推移は同じ種類の実行に限ります。
+    ベースラインが見つからない場合は typer.Exit を送出します。
+    """
+    trends, comparisons = None, None
+    if not (history or compare_to):
+        return trends, comparisons
+    version = tag or detect_version(file_path)
+    machine = machine_name()
+    with BenchmarkHistory(BENCHMARK_HISTORY_PATH) as store:
+        run_id = None
+        if history:
+            run_id = store.record(file_path, version, machine, results, kind=kind)
+            console.print(f"[cyan]測定結果を履歴に保存しました（バージョン: {version}、マシン: {machine}）。[/cyan]")
+            logger.info(f"測定結果を履歴に保存しました: {BENCHMARK_HISTORY_PATH} (実行ID: {run_id}, バージョン: {version}, マシン: {machine})")
+        if compare_to:
+            baseline_id = store.find_run(file_path, compare_to, machine, before=run_id, kind=kind)
+            if baseline_id is None:
+                console.print(f"[bold red]エラー: ベースライン '{compare_to}' の実行が履歴に見つかりません（マシン: {machine}）。[/bold red]")
+                logger.error(f"ベースライン '{compare_to}' の実行が履歴に見つかりません: {file_path} (マシン: {machine}, 種類: {kind})")
+                raise typer.Exit(code=1)
+            # エラーになったものは、途中までの測定値があっても比較に使わず、未測定として扱う
+            current_timings = {result["name"]: result["timings"] for result in results if result["runs"] and not result["error"]}
+            comparisons = compare_runs(store.run_timings(baseline_id), current_timings, max_slowdown, alpha)
+        trends = store.trends(file_path, machine, BENCHMARK_TREND_RUNS, kind=kind)
+    return trends, comparisons
+
+def print_comparisons(comparisons, compare_to, label):
+    if comparisons is None:
+        return
+    comparison_table = Table(title=f"ベースライン '{compare_to}' との比較", title_justify="left", show_header=True, header_style="bold ")
+    comparison_table.add_column(f"{label}名", style="green")
+    comparison_table.add_column("ベースライン平均 (秒)", justify="right")
+    comparison_table.add_column("今回の平均 (秒)", justify="right")
+    comparison_table.add_column("増加率", justify="right")
+    comparison_table.add_column("p値", justify="right")
+    comparison_table.add_column("判定")
+    for comparison in comparisons:
+        if comparison["missing"]:
+            comparison_table.add_row(comparison["name"], f"{comparison['baseline_mean']:.4f}", "-", "-", "-",
+                                     "[bold red]測定失敗[/bold red]")
+            logger.info(f"{label} '{comparison['name']}' は今回の実行で測定できませんでした（エラー、タイムアウト、または未実行）。")
+            continue
+        p_value = "-" if comparison["p_value"] is None else f"{comparison['p_value']:.4f}"
+        verdict = "[bold red]性能低下[/bold red]" if comparison["regression"] else "[green]OK[/green]"
+        comparison_table.add_row(comparison["name"], f"{comparison['baseline_mean']:.4f}", f"{comparison['current_mean']:.4f}",
+                                 f"{comparison['change']:+.1%}", p_value, verdict)
+        logger.info(f"{label} '{comparison['name']}' のベースラインとの比較: 増加率={comparison['change']:+.1%}, p値={p_value}, "
+                    f"性能低下={comparison['regression']}")
+    console.print(comparison_table)
+
+def exit_on_regressions(comparisons, max_slowdown, alpha, label):
+    regressions = [comparison["name"] for comparison in comparisons or [] if comparison["regression"]]
+    missing = [comparison["name"] for comparison in comparisons or [] if comparison["missing"]]
+    if regressions:
+        console.print(f"[bold red]エラー: {len(regressions)}件の{label}で性能の低下が検出されました: {', '.join(regressions)}[/bold red]")
+        logger.error(f"性能の低下が検出されました（しきい値: {max_slowdown:.0%}, 有意水準: {alpha}）: {regressions}")
+    if missing:
+        console.print(f"[bold red]エラー: ベースラインにある{len(missing)}件の{label}を今回は測定できませんでした: {', '.join(missing)}[/bold red]")
+        logger.error(f"ベースラインにある{label}を測定できませんでした（エラー、タイムアウト、または未実行）: {missing}")
+    if regressions or missing:
+        raise typer.Exit(code=1)
+
+def run_form_benchmark_mode(file_path, forms, warmup, runs, max_runs, target_ci, timeout, time_record_source,
+                            history, tag, compare_to, max_slowdown, alpha):
+    results = []
+    with access_application(file_path) as app:
+        form_names = get_access_form_names(app) if forms.strip() == "*" else [name.strip() for name in forms.split(",") if name.strip()]
+        if not form_names:
+            console.print("[yellow]警告: 測定するフォームが見つかりませんでした。[/yellow]")
+            logger.warning("測定するフォームが見つかりませんでした。")
+            return
+        console.print(f"[cyan]フォームのベンチマークを開始します（{len(form_names)}件、実行回数: {runs}〜{max_runs}回、ウォームアップ: {warmup}回）[/cyan]")
+        logger.info(f"フォームのベンチマークを開始します: {form_names}")
+        for form_name in form_names:
+            with console.status(f"[bold green]フォーム '{form_name}' を開いています...[/]"):
+                result, record_source = benchmark_form(app, form_name, warmup=warmup, min_runs=runs, max_runs=max(runs, max_runs),
+                                                       target_relative_ci=target_ci, timeout=timeout or None)
+            stats = result.to_dict()
+            stats["record_source"] = record_source
+            stats["record_source_seconds"] = None
+            results.append(stats)
+            if result.error:
+                console.print(f"[bold red]フォーム '{form_name}' の測定中にエラーが発生しました: {result.error}[/bold red]")
+                logger.error(f"フォーム '{form_name}' の測定中にエラーが発生しました: {result.error}")
+            if result.timed_out:
+                console.print(f"[yellow]フォーム '{form_name}' は時間の上限（{timeout}秒）に達したため、{result.runs}回で測定を終了しました。[/yellow]")
+                logger.warning(f"フォーム '{form_name}' は時間の上限（{timeout}秒）に達したため、{result.runs}回で測定を終了しました。")
+
+    # レコードソースは、フォームを閉じた後にODBCで単独で実行し、フォームの表示にかかる時間と比較する
+    if time_record_source:
+        with db_connection(file_path, readonly=True) as conn:
+            for stats in results:
+                if not stats["record_source"] or not stats["runs"]:
+                    continue
+                sql = record_source_sql(stats["record_source"])
+                with console.status(f"[bold green]フォーム '{stats['name']}' のレコードソースを実行中...[/]"):
+                    source_result = run_adaptive(stats["name"], lambda: measure_statement(conn, sql), warmup=warmup, min_runs=runs,
+                                                 max_runs=max(runs, max_runs), target_relative_ci=target_ci, timeout=timeout or None)
+                if source_result.error or not source_result.runs:
+                    # フォームのコントロールを参照するパラメーターなど、ODBCでは実行できないレコードソースがある
+                    logger.warning(f"フォーム '{stats['name']}' のレコードソースを単独で実行できませんでした: {source_result.error}")
+                    continue
+                stats["record_source_seconds"] = source_result.to_dict()["median"]
+
+    format_seconds = lambda value: "-" if value is None else f"{value:.4f}"
+    table = Table(title="フォームのベンチマーク結果", title_justify="left", show_header=True, header_style="bold ")
+    table.add_column("フォーム名", style="green")
+    table.add_column("回数", justify="right")
+    table.add_column("中央値 (秒)", style="yellow", justify="right")
+    table.add_column("p95 (秒)", justify="right")
+    table.add_column("p99 (秒)", justify="right")
+    table.add_column("開く (秒)", justify="right")
+    table.add_column("レコードの読み込み (秒)", justify="right")
+    table.add_column("閉じる (秒)", style="dim", justify="right")
+    table.add_column("レコード数", justify="right")
+    table.add_column("レコードソース")
+    table.add_column("レコードソースの実行 (秒)", justify="right")
+    table.add_column("割合", justify="right")
+    for stats in results:
+        if not stats["runs"]:
+            continue
+        metrics = stats["metrics"]
+        record_source = stats["record_source"] or "（なし）"
+        share = "-"
+        if stats["record_source_seconds"] is not None and stats["median"]:
+            share = f"{stats['record_source_seconds'] / stats['median']:.0%}"
+        table.add_row(stats["name"], str(stats["runs"]), format_seconds(stats["median"]), format_seconds(stats["p95"]),
+                      format_seconds(stats["p99"]), format_seconds(metrics["open_seconds"]), format_seconds(metrics["populate_seconds"]),
+                      format_seconds(metrics["close_seconds"]), f"{metrics['records']:,.0f}",
+                      escape(record_source if len(record_source) <= 60 else record_source[:60] + "..."),
+                      format_seconds(stats["record_source_seconds"]), share)
+        logger.info(f"フォーム '{stats['name']}': 回数={stats['runs']}, 中央値={stats['median']:.4f}秒, p95={stats['p95']:.4f}秒, "
+                    f"p99={stats['p99']:.4f}秒, 開く={metrics['open_seconds']:.4f}秒, 読み込み={metrics['populate_seconds']:.4f}秒, "
+                    f"レコード数={metrics['records']:.0f}, レコードソース={stats['record_source']!r}, "
+                    f"レコードソースの実行={stats['record_source_seconds']}秒")
+    console.print(table)
+
+    trends, comparisons = record_and_compare(file_path, results, history, tag, compare_to, max_slowdown, alpha, "form")
+    print_comparisons(comparisons, compare_to, "フォーム")
+
+    report_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    ReportGenerator().create_benchmark_report(results, BENCHMARK_REPORT_PATH, report_datetime, file_path, trends=trends,
+                                              comparisons=comparisons, baseline_label=compare_to or "")
+    console.print(f"\n[bold green]✅ ベンチマークレポートを '{BENCHMARK_REPORT_PATH}' に出力しました。[/bold green]")
+    logger.info(f"ベンチマークレポートを '{BENCHMARK_REPORT_PATH}' に出力しました。")
+    open_in_browser(os.path.abspath(BENCHMARK_REPORT_PATH))
+
+    exit_on_regressions(comparisons, max_slowdown, alpha, "フォーム")
+
 def benchmark(
     file_path: str = typer.Argument(..., help="ベンチマーク対象のAccessファイルのパス"), 
     queries: str = typer.Option(None, "--query", "-q", help="測定対象のクエリ名（カンマ区切りで複数指定可）。指定しない場合、Accessファイル内の全てのクエリを測定します。"),
-    runs: int = typer.Option(5, "--runs", "-r", help="各クエリの実行回数。デフォルトは5回です。")
+    runs: int = typer.Option(5, "--runs", "-r", min=1, help="各クエリの最小実行回数。デフォルトは5回です。"),
+    max_runs: int = typer.Option(30, "--max-runs", min=1, help="各クエリの最大実行回数。信頼区間が十分狭くなるまで、この回数まで実行を繰り返します。"),
+    warmup: int = typer.Option(1, "--warmup", "-w", min=0, help="集計から除外するウォームアップの実行回数。"),
+    target_ci: float = typer.Option(0.05, "--target-ci", min=0.0, help="平均値に対する95%信頼区間の半分の幅の目標値（0.05 = ±5%）。"),
+    timeout: float = typer.Option(0, "--timeout", "-t", min=0.0, help="1つのクエリの測定に使用する時間の上限（秒）。0は無制限です。"),
+    trace_memory: bool = typer.Option(True, "--trace-memory/--no-trace-memory", help="測定後に1回追加で実行し、Pythonのメモリ使用量のピークを計測します（計測のオーバーヘッドが実行時間に影響しないよう、測定とは別に実行します）。"),
+    history: bool = typer.Option(True, "--history/--no-history", help="測定結果を履歴データベースに保存します。"),
+    tag: str = typer.Option(None, "--tag", help="履歴に保存するバージョンタグ。指定しない場合は、Accessファイルのあるディレクトリの git describe の結果を使用します。"),
+    compare_to: str = typer.Option(None, "--compare-to", help="比較するベースラインのバージョンタグ。同じファイル・同じマシンの、そのタグの最新の実行と比較します。"),
+    max_slowdown: float = typer.Option(0.10, "--max-slowdown", min=0.0, help="性能の低下とみなす平均値の増加率（0.10 = 10%）。"),
+    alpha: float = typer.Option(0.05, "--alpha", min=0.0, max=1.0, help="Welch の t 検定の有意水準。"),
+    params_path: str = typer.Option(None, "--params", help="パラメータークエリに渡す値のファイル（.json または .csv）。実行のたびに次の組の値を使用します。"),
+    forms: str = typer.Option(None, "--form", "-f", help="測定するフォーム名（カンマ区切りで複数指定可、* で全てのフォーム）。指定するとクエリの代わりにフォームを開く時間を測定します。"),
+    time_record_source: bool = typer.Option(True, "--record-source/--no-record-source", help="フォームのレコードソースをODBCで単独で実行し、フォームを開く時間と比較します。"),
+    action_mode: str = typer.Option("none", "--actions", help="アクションクエリ（追加・更新・削除）の実行方法。none: 実行しない（読み取り専用）、rollback: 元のファイルで実行して毎回ロールバック、copy: 一時コピーで実行して毎回ロールバック（一時コピーはフロントエンドのみのため、リンクテーブルを含むファイルでは使用できません）。データを保護するのは実行ごとのロールバックのみです。"),
+    load_test: bool = typer.Option(False, "--load-test", help="複数のユーザーが同時にクエリを実行する負荷テストを行います。"),
+    users: int = typer.Option(10, "--users", "-u", min=1, help="負荷テストの同時ユーザー数（ユーザーごとにスレッドと接続を作成します）。"),
+    duration: float = typer.Option(30, "--duration", "-d", min=1.0, help="負荷テストの実行時間（秒）。"),
+    mix: str = typer.Option(None, "--mix", help="負荷テストで実行するクエリと重み（例: 受注一覧=5,在庫集計=1）。指定しない場合は --query のクエリ（または全てのクエリ）を同じ重みで実行します。")
 ):
     """
     指定されたAccessファイル（.accdbまたは.mdb）内のクエリの実行パフォーマンスを計測し、HTMLレポートを生成します。
@@ -28,17 +250,55 @@ def benchmark(
     このコマンドは、データベースの最適化やパフォーマンスチューニングの際に役立ちます。
     - **クエリ指定**: 特定のクエリを指定してその実行時間を測定できます。複数のクエリをカンマ区切りで指定することも可能です。
     - **全クエリ測定**: クエリを指定しない場合、Accessファイル内の全てのクエリを自動的に検出し、それぞれの実行時間を測定します。
-    - **複数回実行**: 各クエリを複数回実行し、平均実行時間を算出することで、より信頼性の高いパフォーマンスデータを提供します。
+    - **ウォームアップ**: 最初の `--warmup` 回の実行は、キャッシュの影響を除くため集計から除外します。
+    - **外れ値の除外**: 四分位範囲から大きく外れた測定値（ウイルス対策ソフトのスキャンなど）は集計から除外します。
+    - **実行回数の自動調整**: `--runs` 回以上実行した後、平均値の95%信頼区間が `--target-ci` 以内に収まるか、
+      `--max-runs` 回に達するまで実行を繰り返します。`--timeout` で1つのクエリの測定時間の上限を指定できます。
 
-    ベンチマーク結果は、クエリ名、平均実行時間、合計実行時間を含む表形式で `reports/benchmark_report.html` にHTML形式で出力され、完了後に自動で開かれます。
+    各実行では、実行（execute）・最初の行の取得・全ての行の読み込みの時間、行数、行/秒、おおよその転送量を個別に記録します。
+    行は fetchmany で少しずつ読み込み、保持せずに破棄します。
+
+    ベンチマーク結果は、最小・中央値・平均・p95・p99・標準偏差・信頼区間を含む表形式で `reports/benchmark_report.html` にHTML形式で出力され、完了後に自動で開かれます。
+
+    測定結果は `output/history/benchmark_history.sqlite3` に、ファイル・クエリ名・バージョンタグ（`--tag`）・マシン名ごとに蓄積され、
+    HTMLレポートに最近の実行の中央値の推移が表示されます。`--compare-to` でベースラインのタグを指定すると、
+    Welch の t 検定で有意に遅くなり、かつ増加率が `--max-slowdown` を超えたクエリを性能の低下として報告し、終了コード1で終了します。
+
+    `--params` でパラメーターの値を指定したクエリは、値をバインドして CALL 構文で実行します。
+    `--actions rollback` または `--actions copy` を指定すると、アクションクエリも測定し、実行のたびにロールバックします。
+    `copy` の一時コピーはフロントエンドのみで、リンクテーブルは元のバックエンドを参照するため、リンクテーブルを含むファイルでは使用できません。
+    元のデータを保護するのは実行ごとのロールバックのみです。
+    アクションクエリでは、影響を受けた行数と1秒あたりの影響行数を記録します。
+
+    `--form` を指定すると、Accessのオートメーションで各フォームを非表示で開き（DoCmd.OpenForm）、全てのレコードが
+    読み込まれるまでの時間を測定して閉じることを繰り返します。フォームごとのパーセンタイルと、レコードソースを単独で実行した時間を表示します。
+    フォームの測定結果もクエリとは別の種類として履歴に保存され、`--compare-to` で同じタグのフォームの実行と比較します。
+
+    `--load-test` を指定すると、`--users` 人のユーザーがそれぞれの接続で `--mix` の重みに従ってクエリを選び、
+    `--duration` 秒間繰り返し実行します。スループット、レイテンシーのパーセンタイルの推移、エラーとロックの競合の件数を
+    `reports/load_test_report.html` に出力します。
     """
     file_path = os.path.abspath(file_path)
-    logger.info(f"benchmark コマンドが実行されました。ファイルパス: {file_path}, クエリ: {queries}, 実行回数: {runs}")
+    logger.info(f"benchmark コマンドが実行されました。ファイルパス: {file_path}, クエリ: {queries}, 実行回数: {runs}〜{max_runs}, "
+                f"ウォームアップ: {warmup}, 目標信頼区間: {target_ci}, タイムアウト: {timeout}")
     if not os.path.exists(file_path):
         console.print(f"[bold red]エラー: ファイルが見つかりません: {file_path}[/bold red]")
         logger.error(f"ファイルが見つかりません: {file_path}")
         raise typer.Exit(code=1)
 
+    if action_mode not in ACTION_MODES:
+        console.print(f"[bold red]エラー: --actions には {', '.join(ACTION_MODES)} のいずれかを指定してください: {action_mode}[/bold red]")
+        logger.error(f"不正なアクションクエリの実行方法です: {action_mode}")
+        raise typer.Exit(code=1)
+    parameters = ParameterCycle({})
+    if params_path:
+        try:
+            parameters = ParameterCycle(load_parameter_sets(params_path))
+        except (OSError, ValueError) as e:
+            console.print(f"[bold red]エラー: パラメーターのファイルを読み込めませんでした: {e}[/bold red]")
+            logger.error(f"パラメーターのファイルを読み込めませんでした: {params_path} - {e}")
+            raise typer.Exit(code=1)
+
     # 固定のHTML出力パス
     html_output_path = BENCHMARK_REPORT_PATH
 
@@ -46,8 +306,15 @@ def benchmark(
 
     results = []
     try:
+        if forms:
+            run_form_benchmark_mode(file_path, forms, warmup, runs, max_runs, target_ci, timeout, time_record_source,
+                                    history, tag, compare_to, max_slowdown, alpha)
+            return
+
         # クエリが指定されていない場合、Access COMオブジェクト経由でクエリ名を取得
-        if queries and queries.lower() != "none":
+        if load_test and mix:
+            queries_to_benchmark = []
+        elif queries and queries.lower() != "none":
             queries_to_benchmark = [q.strip() for q in queries.split(',')]
         else:
             console.print("[cyan]クエリが指定されていません。全てのクエリを測定します。[/cyan]")
@@ -60,39 +327,134 @@ def benchmark(
                 logger.warning("データベース内に測定可能なクエリが見つかりませんでした。")
                 return
 
-        with db_connection(file_path) as conn:
-            console.print(f"[cyan]ベンチマークを開始します（実行回数: {runs}回）[/cyan]")
-            logger.info(f"ベンチマークを開始します（実行回数: {runs}回）")
+        if load_test:
+            try:
+                query_mix = parse_query_mix(mix) if mix else [(name, 1.0) for name in queries_to_benchmark]
+            except ValueError as e:
+                console.print(f"[bold red]エラー: --mix の指定が正しくありません: {e}[/bold red]")
+                logger.error(f"--mix の指定が正しくありません: {mix} - {e}")
+                raise typer.Exit(code=1)
+            run_load_test_mode(file_path, query_mix, users, duration)
+            return
+
+        if action_mode == "copy":
+            # 一時コピーのリンクテーブルは元のバックエンドを参照するため、コピーで実行しても分離されない
+            with access_application(file_path) as app:
+                linked_tables = get_linked_table_names(app)
+            if linked_tables:
+                console.print(f"[bold red]エラー: リンクテーブルがあるため、--actions copy は使用できません（一時コピーでもリンク先のデータが変更されます）: "
+                              f"{', '.join(linked_tables)}[/bold red]")
+                logger.error(f"リンクテーブルがあるため、--actions copy は使用できません: {linked_tables}")
+                raise typer.Exit(code=1)
+
+        with contextlib.ExitStack() as stack:
+            target_path = file_path
+            if action_mode == "copy":
+                target_path, _ = stack.enter_context(temporary_access_copy(file_path))
+                console.print("[cyan]アクションクエリは一時コピーで実行します。[/cyan]")
+            # アクションクエリを実行しない場合は、誤って変更しないよう読み取り専用で接続する
+            conn = stack.enter_context(db_connection(target_path, readonly=action_mode == "none"))
+            call = action_mode != "none"
+
+            def measure(query_name):
+                try:
+                    return measure_query(conn, query_name, params=parameters.next(query_name), call=call)
+                finally:
+                    # アクションクエリの変更は毎回取り消す（ロールバックの時間は測定に含めない）
+                    if call:
+                        conn.rollback()
+
+            console.print(f"[cyan]ベンチマークを開始します（実行回数: {runs}〜{max_runs}回、ウォームアップ: {warmup}回）[/cyan]")
+            logger.info(f"ベンチマークを開始します（実行回数: {runs}〜{max_runs}回、ウォームアップ: {warmup}回）")
 
             table = Table(title="ベンチマーク結果", title_justify="left", show_header=True, header_style="bold ")
             table.add_column("クエリ名", style="green")
-            table.add_column("平均実行時間 (秒)", style="yellow", justify="right")
-            table.add_column("合計実行時間 (秒)", style="dim", justify="right")
-
-            for query_name in queries_to_benchmark:
-                with console.status(f"[bold green]クエリ '{query_name}' を実行中...[/]"):
-                    try:
-                        timings = core_run_benchmark(conn, query_name, runs)
-                        
-                        avg_time = sum(timings) / len(timings)
-                        total_time = sum(timings)
-                        results.append((query_name, avg_time, total_time))
-                        table.add_row(query_name, f"{avg_time:.4f}", f"{total_time:.4f}")
-                        logger.info(f"クエリ '{query_name}': 平均実行時間={avg_time:.4f}秒, 合計実行時間={total_time:.4f}秒")
-
-                    except Exception as e:
-                        console.print(f"[bold red]クエリ '{query_name}' の実行中にエラーが発生しました: {e}[/bold red]")
-                        logger.error(f"クエリ '{query_name}' の実行中にエラーが発生しました: {e}", exc_info=True)
+            table.add_column("回数", justify="right")
+            table.add_column("最小 (秒)", justify="right")
+            table.add_column("中央値 (秒)", style="yellow", justify="right")
+            table.add_column("平均 (秒)", justify="right")
+            table.add_column("p95 (秒)", justify="right")
+            table.add_column("p99 (秒)", justify="right")
+            table.add_column("標準偏差", style="dim", justify="right")
+            table.add_column("95%信頼区間", style="dim", justify="right")
+            table.add_column("外れ値", style="dim", justify="right")
+
+            # ODBCのクエリタイムアウトも設定し、1回の実行が上限を超えた場合はドライバーに中断させる
+            previous_timeout = conn.timeout
+            if timeout:
+                conn.timeout = math.ceil(timeout)
+            try:
+                for query_name in queries_to_benchmark:
+                    with console.status(f"[bold green]クエリ '{query_name}' を実行中...[/]"):
+                        result = run_adaptive(query_name, lambda: measure(query_name), warmup=warmup,
+                                              min_runs=runs, max_runs=max(runs, max_runs), target_relative_ci=target_ci,
+                                              timeout=timeout or None)
+                        if trace_memory and result.runs and not result.error:
+                            try:
+                                _, result.peak_memory = trace_peak_memory(lambda: measure(query_name))
+                            except Exception as e:
+                                logger.warning(f"クエリ '{query_name}' のメモリ使用量を計測できませんでした: {e}")
+                    stats = result.to_dict()
+                    results.append(stats)
+                    if result.error:
+                        console.print(f"[bold red]クエリ '{query_name}' の実行中にエラーが発生しました: {result.error}[/bold red]")
+                        logger.error(f"クエリ '{query_name}' の実行中にエラーが発生しました: {result.error}")
+                    if result.timed_out:
+                        console.print(f"[yellow]クエリ '{query_name}' は時間の上限（{timeout}秒）に達したため、{result.runs}回で測定を終了しました。[/yellow]")
+                        logger.warning(f"クエリ '{query_name}' は時間の上限（{timeout}秒）に達したため、{result.runs}回で測定を終了しました。")
+                    if not result.runs:
+                        continue
+                    ci = f"±{stats['ci_half_width']:.4f}" if stats["ci_half_width"] is not None else "-"
+                    table.add_row(query_name, str(stats["runs"]), f"{stats['min']:.4f}", f"{stats['median']:.4f}", f"{stats['mean']:.4f}",
+                                  f"{stats['p95']:.4f}", f"{stats['p99']:.4f}", f"{stats['stdev']:.4f}", ci, str(stats["outliers"]))
+                    logger.info(f"クエリ '{query_name}': 回数={stats['runs']}, 中央値={stats['median']:.4f}秒, 平均={stats['mean']:.4f}秒, "
+                                f"p95={stats['p95']:.4f}秒, p99={stats['p99']:.4f}秒, 標準偏差={stats['stdev']:.4f}, 外れ値={stats['outliers']}件")
+            finally:
+                conn.timeout = previous_timeout
             
             console.print(table)
 
-            report_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            report_generator.create_benchmark_report(results, html_output_path, report_datetime, file_path)
-            console.print(f"\n[bold green]✅ ベンチマークレポートを '{html_output_path}' に出力しました。[/bold green]")
-            logger.info(f"ベンチマークレポートを '{html_output_path}' に出力しました。")
-            webbrowser.open(os.path.abspath(html_output_path))
+            breakdown = Table(title="実行と読み込みの内訳（中央値）", title_justify="left", show_header=True, header_style="bold ")
+            breakdown.add_column("クエリ名", style="green")
+            breakdown.add_column("実行 (秒)", justify="right")
+            breakdown.add_column("最初の行 (秒)", justify="right")
+            breakdown.add_column("読み込み (秒)", justify="right")
+            breakdown.add_column("行数", justify="right")
+            breakdown.add_column("行/秒", style="yellow", justify="right")
+            breakdown.add_column("転送量 (KB)", justify="right")
+            breakdown.add_column("メモリのピーク (KB)", justify="right")
+            breakdown.add_column("影響行数", justify="right")
+            breakdown.add_column("影響行/秒", style="yellow", justify="right")
+            for stats in results:
+                metrics = stats["metrics"]
+                if not metrics:
+                    continue
+                peak = "-" if stats["peak_memory"] is None else f"{stats['peak_memory'] / 1024:,.1f}"
+                breakdown.add_row(stats["name"], f"{metrics['execute_seconds']:.4f}", f"{metrics['first_row_seconds']:.4f}",
+                                  f"{metrics['fetch_seconds']:.4f}", f"{metrics['rows']:,.0f}", f"{metrics['rows_per_second']:,.0f}",
+                                  f"{metrics['bytes'] / 1024:,.1f}", peak, f"{metrics['affected_rows']:,.0f}",
+                                  f"{metrics['affected_rows_per_second']:,.0f}")
+                logger.info(f"クエリ '{stats['name']}': 実行={metrics['execute_seconds']:.4f}秒, 最初の行={metrics['first_row_seconds']:.4f}秒, "
+                            f"読み込み={metrics['fetch_seconds']:.4f}秒, 行数={metrics['rows']:.0f}, 行/秒={metrics['rows_per_second']:.0f}, "
+                            f"転送量={metrics['bytes']:.0f}バイト, メモリのピーク={stats['peak_memory']}バイト, "
+                            f"影響行数={metrics['affected_rows']:.0f}, 影響行/秒={metrics['affected_rows_per_second']:.0f}")
+            console.print(breakdown)
 
+        trends, comparisons = record_and_compare(file_path, results, history, tag, compare_to, max_slowdown, alpha, "query")
+        print_comparisons(comparisons, compare_to, "クエリ")
+
+        report_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        report_generator.create_benchmark_report(results, html_output_path, report_datetime, file_path, trends=trends,
+                                                 comparisons=comparisons, baseline_label=compare_to or "")
+        console.print(f"\n[bold green]✅ ベンチマークレポートを '{html_output_path}' に出力しました。[/bold green]")
+        logger.info(f"ベンチマークレポートを '{html_output_path}' に出力しました。")
+        open_in_browser(os.path.abspath(html_output_path))
+
+        exit_on_regressions(comparisons, max_slowdown, alpha, "クエリ")
+
+    except typer.Exit:
+        raise
     except Exception as e:
         handle_com_error(e)
         logger.error(f"benchmark コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
-        raise typer.Exit(code=1)
\ No newline at end of file
+        raise typer.Exit(code=1)
@@ -1,19 +1,21 @@
 # -*- coding: utf-8 -*-
 import os
 import difflib
-import pyodbc
 import typer
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn
 from datetime import datetime
-import webbrowser
 import logging
 
 from src.core.access_handler import temporary_access_copy, access_application, export_objects
+from src.core.export_cache import open_export_cache
 from src.core.db_operations import db_connection, get_table_names, get_table_data
+from src.core.table_diff import diff_table_streaming, diff_table_digest
+from src.core.table_fingerprint import open_fingerprint_cache, get_table_fingerprint
+from src.core.table_pipeline import SideFetcher, pipelined_table_diffs
 from src.core.reporting import ReportGenerator
-from src.utils import handle_com_error, sanitize_for_excel
-from src.constants import DIFF_REPORT_PATH
+from src.utils import handle_com_error, open_in_browser, sanitize_for_excel
+from src.constants import DIFF_REPORT_PATH, TABLE_PIPELINE_MAX_INFLIGHT, TABLE_PIPELINE_MEMORY_CAP_MB
 
 console = Console()
 logger = logging.getLogger(__name__)
@@ -48,17 +50,85 @@ def diff_exported_objects(dir1, dir2):
             diffs[filename] = ["--- /dev/null", f"+++ {filename}", "@@ -0,0 +1 @@", "+Object only exists in the second file."]
     return diffs
 
-def diff_tables(conn1, conn2):
+TABLE_DIFF_MODES = ("stream", "digest", "memory", "pipeline")
+
+def diff_tables_pipelined(conn1, conn2, tables, max_inflight, memory_cap_mb, use_fingerprints, fingerprint_caches):
+    """両方の接続を専用のスレッドで同時に読み込み、比較中に次のテーブルを先読みします。"""
+    diffs = {}
+    skipped = 0
+    fetcher1 = SideFetcher(conn1)
+    fetcher2 = SideFetcher(conn2)
+    columns = (SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(),
+               TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+               TextColumn("[dim]ファイル1: {task.fields[rate1]:,.0f} 行/秒 / ファイル2: {task.fields[rate2]:,.0f} 行/秒[/dim]"))
+    try:
+        with Progress(*columns) as progress:
+            task = progress.add_task("[cyan]テーブル比較中...[/cyan]", total=len(tables), rate1=0.0, rate2=0.0)
+            show_rates = lambda: progress.update(task, rate1=fetcher1.rows_per_second, rate2=fetcher2.rows_per_second)
+            for table, table_diff in pipelined_table_diffs(fetcher1, fetcher2, tables, max_inflight,
+                                                           memory_cap_mb * 1024 * 1024, use_fingerprints, fingerprint_caches,
+                                                           show_rates):
+                progress.update(task, advance=1, description=f"[cyan]テーブル比較中...[/cyan] {table}")
+                show_rates()
+                if table_diff is None:
+                    skipped += 1
+                elif table_diff.has_changes():
+                    diffs[table] = table_diff
+    finally:
+        fetcher1.close()
+        fetcher2.close()
+    logger.info(f"テーブルの読み込み速度: ファイル1 {fetcher1.rows}行 ({fetcher1.rows_per_second:,.0f} 行/秒), "
+                f"ファイル2 {fetcher2.rows}行 ({fetcher2.rows_per_second:,.0f} 行/秒)")
+    return diffs, skipped
+
+def diff_tables(conn1, conn2, mode="stream", use_fingerprints=False, fingerprint_caches=(None, None),
+                max_inflight=TABLE_PIPELINE_MAX_INFLIGHT, memory_cap_mb=TABLE_PIPELINE_MEMORY_CAP_MB):
     tables1 = set(get_table_names(conn1))
     tables2 = set(get_table_names(conn2))
     all_tables = sorted(list(tables1 | tables2))
     diffs = {}
+    skipped = 0
+
+    if mode == "pipeline":
+        # 接続はそれぞれのスレッドからのみ使用するため、フィンガープリントも読み込み用のスレッドで計算する
+        for table in all_tables:
+            if table not in tables2:
+                diffs[table] = ({"Table only exists in file 1"}, set())
+            elif table not in tables1:
+                diffs[table] = (set(), {"Table only exists in file 2"})
+        common_tables = [table for table in all_tables if table in tables1 and table in tables2]
+        table_diffs, skipped = diff_tables_pipelined(conn1, conn2, common_tables, max_inflight, memory_cap_mb,
+                                                     use_fingerprints, fingerprint_caches)
+        diffs.update(table_diffs)
+        diffs = {table: diffs[table] for table in all_tables if table in diffs}
+        if use_fingerprints:
+            console.print(f"[dim]フィンガープリントが一致したため、{skipped}件のテーブルの比較を省略しました。[/dim]")
+            logger.info(f"フィンガープリントが一致したため、{skipped}件のテーブルの比較を省略しました。")
+        return diffs
 
     with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(), TextColumn("[progress.percentage]{task.percentage:>3.0f}%")) as progress:
         task = progress.add_task("[cyan]テーブル比較中...[/cyan]", total=len(all_tables))
         for table in all_tables:
             progress.update(task, advance=1, description=f"[cyan]テーブル比較中...[/cyan] {table}")
-            if table in tables1 and table in tables2:
+            if table in tables1 and table in tables2 and use_fingerprints:
+                # 行数と集約ハッシュ値が一致するテーブルは内容が同じため、比較を省略する
+                # （キャッシュにない側だけを、行を保持せずに読み込んで計算する）
+                fingerprint1 = get_table_fingerprint(conn1, table, fingerprint_caches[0])
+                fingerprint2 = get_table_fingerprint(conn2, table, fingerprint_caches[1])
+                if fingerprint1 == fingerprint2:
+                    skipped += 1
+                    continue
+            if table in tables1 and table in tables2 and mode == "stream":
+                # 主キー順に少しずつ読み込んで比較する（使用メモリはテーブルの大きさに依存しない）
+                table_diff = diff_table_streaming(conn1, conn2, table, logger=logger)
+                if table_diff.has_changes():
+                    diffs[table] = table_diff
+            elif table in tables1 and table in tables2 and mode == "digest":
+                # 各行をハッシュ値に変換して比較し、差分のあった行だけを読み込み直す
+                table_diff = diff_table_digest(conn1, conn2, table, logger=logger)
+                if table_diff.has_changes():
+                    diffs[table] = table_diff
+            elif table in tables1 and table in tables2:
                 data1 = get_table_data(conn1, table)
                 data2 = get_table_data(conn2, table)
                 only_in_1 = data1 - data2
@@ -69,9 +139,12 @@ def diff_tables(conn1, conn2):
                 diffs[table] = ({"Table only exists in file 1"}, set())
             else:
                 diffs[table] = (set(), {"Table only exists in file 2"})
+    if use_fingerprints:
+        console.print(f"[dim]フィンガープリントが一致したため、{skipped}件のテーブルの比較を省略しました。[/dim]")
+        logger.info(f"フィンガープリントが一致したため、{skipped}件のテーブルの比較を省略しました。")
     return diffs
 
-def diff_vba_objects(file1_path, file2_path, temp_dir1, temp_dir2):
+def diff_vba_objects(file1_path, file2_path, temp_dir1, temp_dir2, cache1=None, cache2=None):
     if os.path.splitext(file1_path)[1].lower() == ".accde" or os.path.splitext(file2_path)[1].lower() == ".accde":
         console.print("[yellow]⚠️ .accde ファイルのため、VBA/フォームの比較はスキップされます。[/yellow]")
         logger.warning(".accde ファイルのため、VBA/フォームの比較はスキップされます。")
@@ -86,9 +159,9 @@ def diff_vba_objects(file1_path, file2_path, temp_dir1, temp_dir2):
     try:
         with console.status("[bold green]VBA/フォーム/マクロをエクスポート中...[/]"):
             with access_application(file1_path) as app1:
-                export_objects(app1, export_dir1)
+                export_objects(app1, export_dir1, cache1)
             with access_application(file2_path) as app2:
-                export_objects(app2, export_dir2)
+                export_objects(app2, export_dir2, cache2)
     except Exception as e:
         console.print(f"[bold red]❌ オブジェクトのエクスポート中にエラーが発生しました: {e}[/bold red]")
         logger.error(f"オブジェクトのエクスポート中にエラーが発生しました: {e}", exc_info=True)
@@ -96,12 +169,18 @@ def diff_vba_objects(file1_path, file2_path, temp_dir1, temp_dir2):
 
     return diff_exported_objects(export_dir1, export_dir2)
 
-def diff(file1_path: str = typer.Argument(..., help="比較元のAccessファイルのパス"),          file2_path: str = typer.Argument(..., help="比較先のAccessファイルのパス")):
+def diff(file1_path: str = typer.Argument(..., help="比較元のAccessファイルのパス"),          file2_path: str = typer.Argument(..., help="比較先のAccessファイルのパス"),
+         use_cache: bool = typer.Option(True, "--cache/--no-cache", help="変更されていないオブジェクトのエクスポート結果をキャッシュから再利用します。"),
+         table_mode: str = typer.Option("stream", "--table-mode", help="テーブルの比較方法。stream: 主キー順に少しずつ読み込んで比較し、変更された行を列単位で報告します。digest: 各行をハッシュ値に変換して比較し、差分のあった行だけを読み込み直します（重複行も区別されます）。memory: 全ての行をメモリに読み込んで比較します（従来の方法）。pipeline: 両方のファイルを別々のスレッドで同時に読み込み、比較中に次のテーブルを先読みします。"),
+         use_fingerprints: bool = typer.Option(True, "--fingerprint/--no-fingerprint", help="行数と集約ハッシュ値が一致するテーブルの比較を省略します。値は行を保持せずに読み込んで計算し、--cache 指定時はファイルのパス・サイズ・更新日時ごとに再利用します（変更されていない側のファイルは読み込みません）。"),
+         max_inflight: int = typer.Option(TABLE_PIPELINE_MAX_INFLIGHT, "--inflight-tables", min=1, help="pipeline モードで、比較中のテーブルとは別に先読みするテーブル数。"),
+         memory_cap_mb: int = typer.Option(TABLE_PIPELINE_MEMORY_CAP_MB, "--memory-cap-mb", min=1, help="pipeline モードで、読み込み中・読み込み済み・比較中のテーブルのデータの合計がこのサイズ（MB）を超えている間は、新しいテーブルの読み込みを開始しません（1つのテーブルがこのサイズを超える場合は、そのテーブルだけを読み込みます）。")):
     """
     2つのAccessデータベース（.accdb, .mdb）の差分を詳細に比較し、結果をExcelファイルに出力します。
 
     このコマンドは、以下の要素を比較します。
-    - **テーブルデータ**: 各テーブルのレコードを比較し、追加・削除された行を特定します。
+    - **テーブルデータ**: 各テーブルのレコードを比較し、追加・削除・変更された行を特定します。
+      主キーが同じで内容が異なる行は、変更（UPDATED）として列単位の差分が報告されます。
     - **VBAオブジェクト**: フォーム、レポート、モジュール、マクロ、クエリのソースコードや定義を比較し、変更点を明らかにします。
 
     比較結果は、見やすいように色分けされたExcelレポートとして `reports/` ディレクトリに保存され、完了後に自動で開かれます。
@@ -109,7 +188,11 @@ def diff(file1_path: str = typer.Argument(..., help="比較元のAccessファイ
     """
     file1_path = os.path.abspath(file1_path)
     file2_path = os.path.abspath(file2_path)
-    logger.info(f"diff コマンドが実行されました。ファイル1: {file1_path}, ファイル2: {file2_path}")
+    logger.info(f"diff コマンドが実行されました。ファイル1: {file1_path}, ファイル2: {file2_path}, テーブル比較: {table_mode}")
+    if table_mode not in TABLE_DIFF_MODES:
+        console.print(f"[bold red]エラー: --table-mode には {', '.join(TABLE_DIFF_MODES)} のいずれかを指定してください: {table_mode}[/bold red]")
+        logger.error(f"不正なテーブル比較モードです: {table_mode}")
+        return
     if not os.path.exists(file1_path):
         console.print(f"[bold red]エラー: ファイルが見つかりません: {file1_path}[/bold red]")
         logger.error(f"ファイルが見つかりません: {file1_path}")
@@ -131,10 +214,20 @@ def diff(file1_path: str = typer.Argument(..., help="比較元のAccessファイ
 
             console.rule("[bold]テーブル比較[/bold]")
             logger.info("テーブル比較を開始します。")
+            import pyodbc
             try:
-                with db_connection(f1_copy) as conn1, db_connection(f2_copy) as conn2:
-                    table_diffs = diff_tables(conn1, conn2)
-                    logger.info("テーブル比較が完了しました。")
+                # 一時コピーの内容は元ファイルと同じため、フィンガープリントは元ファイルのパスでキャッシュする
+                fingerprint_caches = (open_fingerprint_cache(file1_path, use_cache and use_fingerprints),
+                                      open_fingerprint_cache(file2_path, use_cache and use_fingerprints))
+                with db_connection(f1_copy, readonly=True) as conn1, db_connection(f2_copy, readonly=True) as conn2:
+                    table_diffs = diff_tables(conn1, conn2, table_mode, use_fingerprints, fingerprint_caches,
+                                              max_inflight, memory_cap_mb)
+                for cache in fingerprint_caches:
+                    if cache:
+                        cache.save()
+                        console.print(f"[dim]{cache.summary()}[/dim]")
+                        logger.info(cache.summary())
+                logger.info("テーブル比較が完了しました。")
             except pyodbc.Error as e:
                 console.print(f"[bold red]❌ DB接続に失敗したため、テーブル比較を中止します。: {e}[/bold red]")
                 logger.error(f"DB接続に失敗したため、テーブル比較を中止します。: {e}", exc_info=True)
@@ -142,7 +235,15 @@ def diff(file1_path: str = typer.Argument(..., help="比較元のAccessファイ
 
             console.rule("[bold]VBA/フォーム/マクロ比較[/bold]")
             logger.info("VBA/フォーム/マクロ比較を開始します。")
-            vba_diffs = diff_vba_objects(f1_copy, f2_copy, temp1, temp2)
+            # 一時コピーのパスは毎回変わるため、キャッシュは元ファイルのパスで識別する
+            cache1 = open_export_cache(file1_path, use_cache)
+            cache2 = open_export_cache(file2_path, use_cache)
+            vba_diffs = diff_vba_objects(f1_copy, f2_copy, temp1, temp2, cache1, cache2)
+            for cache in (cache1, cache2):
+                if cache:
+                    cache.save()
+                    console.print(f"[dim]{cache.summary()}[/dim]")
+                    logger.info(cache.summary())
             logger.info("VBA/フォーム/マクロ比較が完了しました。")
 
             console.rule("[bold]レポート作成[/bold]")
@@ -150,7 +251,7 @@ def diff(file1_path: str = typer.Argument(..., help="比較元のAccessファイ
             report_generator.create_diff_report(table_diffs, vba_diffs, DIFF_REPORT_PATH, report_datetime, file1_path, file2_path)
             console.print(f"\n[bold green]✅ 比較結果を '{DIFF_REPORT_PATH}' に出力しました。[/bold green]")
             logger.info(f"比較結果を '{DIFF_REPORT_PATH}' に出力しました。")
-            webbrowser.open(os.path.abspath(DIFF_REPORT_PATH))
+            open_in_browser(os.path.abspath(DIFF_REPORT_PATH))
     except Exception as e:
         handle_com_error(e)
         logger.error(f"diff コマンドの実行中に予期せぬエラーが発生しました: {e}", exc_info=True)
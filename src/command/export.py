@@ -1,19 +1,30 @@
 # -*- coding: utf-8 -*-
 import os
+import shutil
 import typer
 from rich.console import Console
 from rich.tree import Tree
+from rich.table import Table
 import logging
 
 from src.utils import handle_com_error
-from src.core.access_handler import access_application, export_objects
+from src.core.access_handler import OBJECT_EXTENSIONS, access_application, list_access_objects, export_catalog_entries
+from src.core.export_cache import open_export_cache
+from src.core.parallel_export import export_objects_parallel
+from src.core.export_manifest import (
+    ExportManifest, plan_incremental_export, apply_incremental_export, remove_exported_files, estimate_saved_seconds,
+)
 from src.constants import BASE_APP_DIR
 
 console = Console()
 logger = logging.getLogger(__name__)
 
 def export(file_path: str = typer.Argument(..., help="エクスポート対象のAccessファイルのパス"), 
-           output_dir: str = typer.Option(os.path.join(BASE_APP_DIR, "output", "export"), "--output", "-o", help="エクスポートされたオブジェクトの保存先ディレクトリ。デフォルトは `./output/export` です。")):
+           output_dir: str = typer.Option(os.path.join(BASE_APP_DIR, "output", "export"), "--output", "-o", help="エクスポートされたオブジェクトの保存先ディレクトリ。デフォルトは `./output/export` です。"),
+           use_cache: bool = typer.Option(True, "--cache/--no-cache", help="変更されていないオブジェクトはキャッシュから出力し、Accessからの再エクスポートを省略します。"),
+           workers: int = typer.Option(1, "--workers", "-w", help="並列にエクスポートするAccessインスタンスの数。2以上を指定すると、ファイルの一時コピーを複数のプロセスで分担してエクスポートします。"),
+           retries: int = typer.Option(2, "--retries", help="並列エクスポートで失敗したオブジェクトを再試行する回数。"),
+           incremental: bool = typer.Option(False, "--incremental", "-i", help="前回のエクスポート以降に変更されたオブジェクトのみをエクスポートし、出力ディレクトリを削除せずに更新します。")):
     """
     指定されたAccessファイル（.accdbまたは.mdb）から、オブジェクトをテキストファイルとしてエクスポートします。
 
@@ -26,39 +37,127 @@ def export(file_path: str = typer.Argument(..., help="エクスポート対象
 
     これらのオブジェクトは、指定された出力ディレクトリにそれぞれのファイルとして保存されます。
     これにより、バージョン管理システムでの管理や、他のAccessファイルへのインポートが容易になります。
+
+    前回の実行以降に変更されていないオブジェクト（DateModifiedが同じもの）は、エクスポートキャッシュから出力されます。
+
+    `--workers` に2以上を指定すると、オブジェクトを複数のシャードに分割し、
+    シャードごとに専用のAccessインスタンスでファイルの一時コピーからエクスポートします。
+
+    出力ディレクトリには、各オブジェクトの DateModified と内容のハッシュ値を記録したマニフェスト
+    （`.export_manifest.json`）が保存されます。`--incremental` を指定すると、マニフェストと比較して
+    変更されたオブジェクトのみをエクスポートし、内容が変わったファイルだけを書き換えます。
+    Accessから削除されたオブジェクトのファイルは出力ディレクトリからも削除されます。
     """
     file_path = os.path.abspath(file_path)
     output_dir = os.path.abspath(output_dir)
-    logger.info(f"export コマンドが実行されました。ファイルパス: {file_path}, 出力ディレクトリ: {output_dir}")
+    logger.info(f"export コマンドが実行されました。ファイルパス: {file_path}, 出力ディレクトリ: {output_dir}, 差分エクスポート: {incremental}")
     if not os.path.exists(file_path):
         console.print(f"[bold red]エラー: ファイルが見つかりません: {file_path}[/bold red]")
         logger.error(f"ファイルが見つかりません: {file_path}")
         raise typer.Exit(code=1)
 
-    if os.path.exists(output_dir):
-        import shutil
-        shutil.rmtree(output_dir)
-        logger.info(f"既存の出力ディレクトリをクリアしました: {output_dir}")
-    os.makedirs(output_dir)
-    logger.info(f"出力ディレクトリを作成しました: {output_dir}")
+    manifest = ExportManifest(output_dir) if incremental else None
+    if manifest is not None and manifest.database and os.path.normcase(manifest.database) != os.path.normcase(file_path):
+        # 別のデータベースのエクスポート結果は差分の基準にできないため、全件をエクスポートし直す
+        console.print(f"[yellow]出力ディレクトリは別のファイルのエクスポート結果のため、全てのオブジェクトをエクスポートします: {manifest.database}[/yellow]")
+        logger.warning(f"マニフェストのデータベースが異なります: {manifest.database}")
+        manifest = None
+    if manifest is None:
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+            logger.info(f"既存の出力ディレクトリをクリアしました: {output_dir}")
+        os.makedirs(output_dir)
+        logger.info(f"出力ディレクトリを作成しました: {output_dir}")
+        manifest = ExportManifest(output_dir)
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+
+    # エクスポートは一時ディレクトリに行い、内容が変わったファイルのみを出力ディレクトリへ移動する
+    staging_dir = os.path.join(output_dir, ".export_staging")
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
 
+    cache = open_export_cache(file_path, use_cache)
     try:
+        tree = Tree(f"[bold cyan]📦 {os.path.basename(file_path)}[/bold cyan] のエクスポート結果", guide_style="bold bright_blue")
+        worker_stats, failed, durations = [], [], {}
         with access_application(file_path) as app:
-            tree = Tree(f"[bold cyan]📦 {os.path.basename(file_path)}[/bold cyan] のエクスポート結果", guide_style="bold bright_blue")
-            exported_files = export_objects(app, output_dir)
+            catalog = list_access_objects(app)
+            to_export, skipped, removed = plan_incremental_export(catalog, manifest, OBJECT_EXTENSIONS)
+            logger.info(f"エクスポート対象: {len(to_export)}件, 変更なし: {len(skipped)}件, 削除: {len(removed)}件")
+            if workers <= 1:
+                durations = export_catalog_entries(app, to_export, staging_dir, cache)
+        if workers > 1 and to_export:
+            with console.status(f"[bold green]{workers}個のAccessインスタンスで並列にエクスポート中...[/]"):
+                _, worker_stats, failed = export_objects_parallel(file_path, staging_dir, workers, retries, cache, entries=to_export)
+            # 並列エクスポートではオブジェクトごとの時間を計測できないため、ワーカー全体の平均を記録する
+            exported_count = sum(stats["objects"] for stats in worker_stats)
+            average = sum(stats["seconds"] for stats in worker_stats) / exported_count if exported_count else None
+            durations = {(category, name): average for category, name, _ in to_export}
 
-            for category, files in exported_files.items():
-                if files:
-                    branch = tree.add(f"[green]{category}[/green] ({len(files)}件)")
-                    for file in files:
-                        branch.add(f"[white]{file}[/white]")
-                        logger.info(f"エクスポート済み: カテゴリ={category}, ファイル={file}")
-            
-            console.print(tree)
-            console.print(f"\n[bold green]✅ エクスポートが完了しました: {os.path.abspath(output_dir)}[/bold green]")
-            logger.info(f"エクスポートが完了しました: {os.path.abspath(output_dir)}")
+        saved_seconds = estimate_saved_seconds(manifest, skipped, OBJECT_EXTENSIONS)
+        failed_keys = {(category, name) for category, name, _ in failed}
+        exported = [entry for entry in to_export if (entry[0], entry[1]) not in failed_keys]
+        written, identical = apply_incremental_export(staging_dir, manifest, exported, OBJECT_EXTENSIONS, durations)
+        remove_exported_files(manifest, removed, keep=written + identical)
+        manifest.save(database=file_path)
 
+        categories = {f"{name}{OBJECT_EXTENSIONS[category]}": category for category, name, _ in catalog}
+        exported_files = {category: [] for category in OBJECT_EXTENSIONS}
+        for filename in written:
+            exported_files[categories[filename]].append(filename)
+        for category, files in exported_files.items():
+            if files:
+                branch = tree.add(f"[green]{category}[/green] ({len(files)}件)")
+                for file in files:
+                    branch.add(f"[white]{file}[/white]")
+                    logger.info(f"エクスポート済み: カテゴリ={category}, ファイル={file}")
+        if removed:
+            branch = tree.add(f"[yellow]削除[/yellow] ({len(removed)}件)")
+            for filename in removed:
+                branch.add(f"[yellow]{filename}[/yellow]")
+                logger.info(f"削除されたオブジェクトのファイルを削除しました: {filename}")
+        if failed:
+            branch = tree.add(f"[red]エクスポート失敗[/red] ({len(failed)}件)")
+            for category, name, error in failed:
+                branch.add(f"[red]{category}/{name}[/red] [dim]{error}[/dim]")
+                logger.error(f"エクスポート失敗: カテゴリ={category}, 名前={name}, エラー={error}")
+
+        console.print(tree)
+        if worker_stats:
+            table = Table(title="ワーカー別の処理速度", title_justify="left", show_header=True, header_style="bold ")
+            table.add_column("ワーカー", style="cyan", justify="right")
+            table.add_column("オブジェクト数", justify="right")
+            table.add_column("失敗", justify="right")
+            table.add_column("処理時間 (秒)", justify="right")
+            table.add_column("オブジェクト/秒", style="yellow", justify="right")
+            for stats in worker_stats:
+                table.add_row(str(stats["worker"]), str(stats["objects"]), str(stats["failed"]),
+                              f"{stats['seconds']:.2f}", f"{stats['objects_per_sec']:.2f}")
+                logger.info(f"ワーカー {stats['worker']}: {stats['objects']}件, {stats['seconds']:.2f}秒, {stats['objects_per_sec']:.2f}件/秒")
+            console.print(table)
+        summary = (f"書き込み: {len(written)}件 / 内容変更なし: {len(identical)}件 / "
+                   f"スキップ: {len(skipped)}件 / 削除: {len(removed)}件")
+        if skipped:
+            summary += f" (短縮時間: 約{saved_seconds:.1f}秒)"
+        console.print(f"[dim]{summary}[/dim]")
+        logger.info(summary)
+        if cache:
+            cache.save()
+            console.print(f"[dim]{cache.summary()}[/dim]")
+            logger.info(cache.summary())
+        if failed:
+            console.print(f"\n[bold red]❌ {len(failed)}件のオブジェクトをエクスポートできませんでした。[/bold red]")
+            raise typer.Exit(code=1)
+        console.print(f"\n[bold green]✅ エクスポートが完了しました: {output_dir}[/bold green]")
+        logger.info(f"エクスポートが完了しました: {output_dir}")
+
+    except typer.Exit:
+        raise
     except Exception as e:
         handle_com_error(e)
         logger.error(f"export コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
-        raise typer.Exit(code=1)
\ No newline at end of file
+        raise typer.Exit(code=1)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
@@ -1,19 +1,27 @@
 # -*- coding: utf-8 -*-
 import os
+import tempfile
 import typer
 from rich.console import Console
 from rich.tree import Tree
 import logging
 
 from src.utils import handle_com_error
-from src.core.access_handler import access_application, import_objects
+from src.core.access_handler import (
+    OBJECT_EXTENSIONS, access_application, list_access_objects, import_object_files, exported_object_hash,
+)
+from src.core.export_cache import open_export_cache
+from src.core.export_manifest import ExportManifest, list_exported_files, plan_incremental_load
 from src.constants import BASE_APP_DIR
 
 console = Console()
 logger = logging.getLogger(__name__)
 
 def load(file_path: str = typer.Argument(..., help="インポート対象のAccessファイルのパス"), 
-          input_dir: str = typer.Option(os.path.join(BASE_APP_DIR, "output", "export"), "--input", "-i", help="インポートするオブジェクトが格納されているディレクトリ。デフォルトは `./output/export` です。")):
+          input_dir: str = typer.Option(os.path.join(BASE_APP_DIR, "output", "export"), "--input", "-i", help="インポートするオブジェクトが格納されているディレクトリ。デフォルトは `./output/export` です。"),
+          force: bool = typer.Option(False, "--force", "-f", help="変更の有無にかかわらず、全てのファイルをインポートします。"),
+          verify: bool = typer.Option(True, "--verify/--no-verify", help="マニフェストに記録がないオブジェクトは、インポート先からエクスポートした内容と比較して変更を判定します。無効にすると記録のないオブジェクトは全てインポートします。"),
+          use_cache: bool = typer.Option(True, "--cache/--no-cache", help="比較のためのエクスポートにエクスポートキャッシュを使用します。")):
     """
     エクスポートされたオブジェクトを、指定のAccessファイル（*.accdbまたは.mdb）にインポートします。
 
@@ -27,6 +35,11 @@ def load(file_path: str = typer.Argument(..., help="インポート対象のAcce
     これにより、バージョン管理システムで管理されたオブジェクトをAccessファイルに反映させたり、
     異なるAccessファイル間でオブジェクトを共有したりすることが可能になります。
 
+    インポートは、モジュール、クエリ、マクロ、レポート、フォームの順に行います。
+    入力ディレクトリのマニフェスト（`.export_manifest.json`）に記録された前回のエクスポート/インポート時の
+    ハッシュ値と比較し、インポート先の内容と異なるファイルのみをインポートします。
+    変更のないオブジェクトを再インポートしないため、Accessファイルの肥大化を防げます。
+
     **注意**: 既存のオブジェクトは上書きされます。実行前にAccessファイルのバックアップを取ることを推奨します。
     """
     file_path = os.path.abspath(file_path)
@@ -41,10 +54,37 @@ def load(file_path: str = typer.Argument(..., help="インポート対象のAcce
         logger.error(f"入力ディレクトリが見つかりません: {input_dir}")
         raise typer.Exit(code=1)
 
+    manifest = ExportManifest(input_dir)
+    files = list_exported_files(input_dir, OBJECT_EXTENSIONS)
+    cache = open_export_cache(file_path, use_cache)
     try:
         with access_application(file_path) as app:
             tree = Tree(f"[bold cyan]📦 {os.path.basename(file_path)}[/bold cyan] へのインポート結果", guide_style="bold bright_blue")
-            imported_files = import_objects(app, input_dir)
+            catalog = list_access_objects(app)
+            to_load, skipped, unverified = plan_incremental_load(files, manifest, file_path, catalog)
+            if force:
+                to_load, skipped, unverified = to_load + skipped + unverified, [], []
+            elif unverified and verify:
+                # 記録のないオブジェクトは、インポート先から一時的にエクスポートした内容と比較する
+                current = {(category, name.casefold()): date_modified for category, name, date_modified in catalog}
+                with tempfile.TemporaryDirectory() as scratch_dir:
+                    for category, name, filename, digest in unverified:
+                        exported_digest = exported_object_hash(app, category, name, current[(category, name.casefold())],
+                                                               os.path.join(scratch_dir, filename), cache)
+                        (skipped if exported_digest == digest else to_load).append((category, name, filename, digest))
+            else:
+                to_load += unverified
+            order = {filename: i for i, (_, _, filename) in enumerate(files)}
+            to_load.sort(key=lambda item: order[item[2]])
+            logger.info(f"インポート対象: {len(to_load)}件, スキップ: {len(skipped)}件")
+
+            imported_files = import_object_files(app, input_dir, to_load)
+
+            # インポート後の DateModified を記録し、次回はこのファイルと同じ内容であればスキップする
+            modified_after = {(category, name.casefold()): date_modified for category, name, date_modified in list_access_objects(app)}
+            for category, name, filename, digest in to_load + skipped:
+                manifest.record_load(file_path, filename, digest, modified_after.get((category, name.casefold())))
+            manifest.save()
 
             for category, files in imported_files.items():
                 if files:
@@ -52,12 +92,16 @@ def load(file_path: str = typer.Argument(..., help="インポート対象のAcce
                     for file in files:
                         branch.add(f"[white]{file}[/white]")
                         logger.info(f"インポート済み: カテゴリ={category}, ファイル={file}")
-            
+
             console.print(tree)
+            console.print(f"[dim]インポート: {sum(len(files) for files in imported_files.values())}件 / 変更なしのためスキップ: {len(skipped)}件[/dim]")
+            logger.info(f"変更なしのためスキップ: {len(skipped)}件")
+            if cache:
+                cache.save()
             console.print(f"\n[bold green]✅ インポートが完了しました。[/bold green]")
             logger.info("インポートが完了しました。")
 
     except Exception as e:
         handle_com_error(e)
         logger.error(f"load コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
-        raise typer.Exit(code=1)
\ No newline at end of file
+        raise typer.Exit(code=1)
@@ -3,10 +3,12 @@ import os
 import shutil
 import typer
 from rich.console import Console
+from rich.table import Table
 import logging
 
 from src.utils import handle_com_error
-from src.core.access_handler import access_application, release_prepare, update_linked_table_paths
+from src.core.access_handler import access_application, release_prepare, relink_linked_tables, release_access_session
+from src.core.export_cache import open_export_cache
 
 console = Console()
 logger = logging.getLogger(__name__)
@@ -18,6 +20,7 @@ def prepare_release(
     prod_conn_str: str = typer.Option(..., "--prod-conn", help="テスト接続文字列が置換される本番環境の接続文字列"),
     old_linked_path: str = typer.Option(None, "--old-linked-path", help="リンクテーブルの古いパス"),
     new_linked_path: str = typer.Option(None, "--new-linked-path", help="リンクテーブルの新しいパス"),
+    use_cache: bool = typer.Option(True, "--cache/--no-cache", help="開発用ファイルのエクスポートキャッシュを使用して、書き換えが必要なモジュールを事前に特定します（キャッシュで対象外のモジュールも Find で確認します）。"),
 ):
     """
     Accessファイルを配布用に最適化し、本番環境へのデプロイを容易にするための準備を行います。
@@ -32,6 +35,9 @@ def prepare_release(
     これにより、開発環境と本番環境で異なる接続情報を使用している場合でも、
     手動でのVBAコード修正なしに、安全かつ効率的にリリース用ファイルを作成できます。
 
+    VBAコードの書き換えは、`CodeModule.Find`（キャッシュで対象と判明しているモジュールは省略）で対象の文字列を含むモジュールを特定し、
+    変更が必要な行だけを置き換えます。モジュールごとの処理時間とCOM呼び出し回数が表示されます。
+
     **注意**: この操作はVBAコードを直接変更します。実行前に必ず元のAccessファイルのバックアップを取ることを推奨します。
     """
     file_path = os.path.abspath(file_path)
@@ -47,6 +53,8 @@ def prepare_release(
     
     # 1. ファイルをコピー
     try:
+        # 対話モードで出力ファイルを開いたままのセッションがあれば終了してから上書きする
+        release_access_session(output_file)
         shutil.copy2(file_path, output_file)
         console.print(f"[green]✓[/green] ファイルをコピーしました。")
         logger.info("ファイルをコピーしました。")
@@ -59,11 +67,28 @@ def prepare_release(
     try:
         with access_application(output_file) as app:
             with console.status("[bold green]VBAコードの最適化中...[/]"):
-                modifications = release_prepare(app, test_conn_str, prod_conn_str)
-            
+                module_stats = release_prepare(app, test_conn_str, prod_conn_str, open_export_cache(file_path, use_cache))
+
             console.print("[green]✓[/green] 最適化処理が完了しました。")
             logger.info("最適化処理が完了しました。")
-            if modifications:
+            candidates = [stats for stats in module_stats if stats["candidate"]]
+            if candidates:
+                table = Table(title="モジュール別の書き換え結果", title_justify="left", show_header=True, header_style="bold")
+                table.add_column("モジュール", style="cyan")
+                table.add_column("変更行数", justify="right")
+                table.add_column("COM呼び出し", justify="right")
+                table.add_column("処理時間 (ms)", style="yellow", justify="right")
+                for stats in candidates:
+                    table.add_row(stats["module"], str(stats["changed_lines"]), str(stats["com_calls"]), f"{stats['seconds'] * 1000:.1f}")
+                console.print(table)
+            for stats in module_stats:
+                logger.info(f"モジュール {stats['module']}: 候補={stats['candidate']}, 変更行数={stats['changed_lines']}, "
+                            f"COM呼び出し={stats['com_calls']}回, {stats['seconds'] * 1000:.1f}ms")
+            total_calls = sum(stats["com_calls"] for stats in module_stats)
+            total_seconds = sum(stats["seconds"] for stats in module_stats)
+            console.print(f"  [dim]- {len(module_stats)}個のモジュールを確認しました（書き換え候補: {len(candidates)}件, "
+                          f"COM呼び出し: {total_calls}回, {total_seconds:.2f}秒）。[/dim]")
+            if any(stats["changed_lines"] for stats in module_stats):
                 console.print("  [dim]- 接続文字列を置換しました。[/dim]")
                 console.print("  [dim]- デバッグコードをコメントアウトしました。[/dim]")
                 logger.info("接続文字列を置換し、デバッグコードをコメントアウトしました。")
@@ -74,9 +99,16 @@ def prepare_release(
             # 3. リンクテーブルパスの更新
             if old_linked_path and new_linked_path:
                 with console.status("[bold green]リンクテーブルパスを更新中...[/]"):
-                    updated_links = update_linked_table_paths(app, old_linked_path, new_linked_path)
+                    relink_results = relink_linked_tables(app, old_linked_path, new_linked_path)
+                updated_links = sum(result["refreshed"] for result in relink_results)
                 console.print(f"[green]✓[/green] リンクテーブルパスを更新しました ({updated_links}件)。")
                 logger.info(f"リンクテーブルパスを更新しました ({updated_links}件)。")
+                for result in relink_results:
+                    console.print(f"  [dim]- {result['new_backend']}: {result['refreshed']}/{result['tables']}件, {result['seconds']:.2f}秒[/dim]")
+                    logger.info(f"バックエンド {result['new_backend']}: {result['refreshed']}/{result['tables']}件, {result['seconds']:.2f}秒")
+                    if result["error"] or result["failed"]:
+                        raise RuntimeError(f"リンクテーブルを更新できませんでした: {result['new_backend']} - "
+                                           f"{result['error'] or ', '.join(name for name, _ in result['failed'])}")
             elif old_linked_path or new_linked_path:
                 console.print("[yellow]警告: リンクテーブルパスの更新には --old-linked-path と --new-linked-path の両方が必要です。スキップしました。[/yellow]")
                 logger.warning("リンクテーブルパスの更新には --old-linked-path と --new-linked-path の両方が必要です。スキップしました。")
@@ -87,6 +119,8 @@ def prepare_release(
             console.print("[green]✓[/green] データベースを最適化しました。")
             logger.info("データベースを最適化しました。")
 
+        # リリース用ファイルは配布されるため、セッションプールに開いたまま残さない
+        release_access_session(output_file)
         console.print(f"\n[bold green]✅ リリース準備が完了しました: {output_file}[/bold green]")
         logger.info(f"リリース準備が完了しました: {output_file}")
 
@@ -94,6 +128,7 @@ def prepare_release(
         handle_com_error(e)
         logger.error(f"prepare-release コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
         # エラーが発生した場合、不完全な出力ファイルを削除
+        release_access_session(output_file)
         if os.path.exists(output_file):
             os.remove(output_file)
             logger.info(f"エラー発生のため、不完全な出力ファイル {output_file} を削除しました。")
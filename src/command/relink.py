@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import os
+import typer
+from rich.console import Console
+from rich.table import Table
+from rich.markup import escape
+import logging
+
+from src.utils import handle_com_error
+from src.core.access_handler import access_application, relink_linked_tables
+
+console = Console()
+logger = logging.getLogger(__name__)
+
+def relink(file_path: str = typer.Argument(..., help="リンクテーブルを更新するAccessファイルのパス"),
+           old_path: str = typer.Option(..., "--old-path", help="置き換え前のバックエンドのパス（前方一致、大文字・小文字は区別しません）"),
+           new_path: str = typer.Option(..., "--new-path", help="置き換え後のバックエンドのパス"),
+           dry_run: bool = typer.Option(False, "--dry-run", help="バックエンドの検証のみを行い、リンクテーブルは変更しません。")):
+    """
+    リンクテーブルのバックエンドのパスを置き換え、バックエンドごとにまとめて再リンクします。
+
+    リンクテーブルを参照先のバックエンドごとにグループ化し、各バックエンドを一度だけ開いて検証します。
+    バックエンドを開いたままグループ内のテーブルを続けて RefreshLink するため、
+    同じバックエンドのテーブルが多い場合でも再接続が繰り返されません。
+    開けないバックエンドのテーブルは変更せず、エラーとして報告します。
+
+    `--dry-run` を指定すると、変更対象のテーブルとバックエンドの検証結果のみを表示します。
+    """
+    file_path = os.path.abspath(file_path)
+    logger.info(f"relink コマンドが実行されました。ファイルパス: {file_path}, 旧パス: {old_path}, 新パス: {new_path}, ドライラン: {dry_run}")
+    if not os.path.exists(file_path):
+        console.print(f"[bold red]エラー: ファイルが見つかりません: {file_path}[/bold red]")
+        logger.error(f"ファイルが見つかりません: {file_path}")
+        raise typer.Exit(code=1)
+
+    try:
+        with access_application(file_path) as app:
+            with console.status("[bold green]リンクテーブルを更新中...[/]"):
+                results = relink_linked_tables(app, old_path, new_path, dry_run)
+
+        if not results:
+            console.print("[yellow]パスの置き換えが必要なリンクテーブルはありませんでした。[/yellow]")
+            logger.info("パスの置き換えが必要なリンクテーブルはありませんでした。")
+            return
+
+        title = "バックエンド別の再リンク結果" + ("（ドライラン）" if dry_run else "")
+        table = Table(title=title, title_justify="left", show_header=True, header_style="bold")
+        table.add_column("バックエンド", style="cyan")
+        table.add_column("テーブル数", justify="right")
+        table.add_column("更新", justify="right")
+        table.add_column("失敗", justify="right")
+        table.add_column("処理時間 (秒)", style="yellow", justify="right")
+        table.add_column("状態")
+        for result in results:
+            failed_count = len(result["failed"]) + (result["tables"] if result["error"] else 0)
+            status = f"[red]{escape(result['error'])}[/red]" if result["error"] else ("[green]検証OK[/green]" if dry_run else "[green]OK[/green]")
+            table.add_row(f"{escape(result['old_backend'])}\n→ {escape(result['new_backend'])}", str(result["tables"]),
+                          str(result["refreshed"]), str(failed_count), f"{result['seconds']:.2f}", status)
+            logger.info(f"バックエンド {result['old_backend']} -> {result['new_backend']}: {result['tables']}件, "
+                        f"更新 {result['refreshed']}件, 失敗 {failed_count}件, {result['seconds']:.2f}秒")
+            for table_name, error in result["failed"]:
+                console.print(f"[red]✗ {escape(table_name)}[/red] [dim]{escape(error)}[/dim]")
+        console.print(table)
+
+        if any(result["error"] or result["failed"] for result in results):
+            console.print("\n[bold red]❌ 一部のリンクテーブルを更新できませんでした。[/bold red]")
+            raise typer.Exit(code=1)
+        if dry_run:
+            console.print(f"\n[bold green]✅ {sum(result['tables'] for result in results)}件のリンクテーブルが更新対象です（変更は行っていません）。[/bold green]")
+        else:
+            console.print(f"\n[bold green]✅ {sum(result['refreshed'] for result in results)}件のリンクテーブルを更新しました。[/bold green]")
+        logger.info("relink コマンドが完了しました。")
+
+    except typer.Exit:
+        raise
+    except Exception as e:
+        handle_com_error(e)
+        logger.error(f"relink コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
+        raise typer.Exit(code=1)
@@ -1,71 +1,122 @@
 # -*- coding: utf-8 -*-
 import os
+import re
+import time
+import itertools
+import contextlib
 import typer
+from typing import List
 from rich.console import Console
-from rich.table import Table
+from rich.markup import escape
 import logging
 
-from src.utils import handle_com_error
-from src.core.access_handler import search_all_access_content
+from src.utils import handle_com_error, is_locked_by_others
+from src.core.access_handler import iter_search_access_content, iter_search_access_content_indexed
+from src.core.export_cache import open_export_cache
+from src.core.search_engine import compile_search_pattern
+from src.core.data_search import iter_search_database
+from src.core.search_index import SearchIndex
+from src.core.session_pool import is_held_by_session_pool
+from src.core.connection_pool import is_held_by_connection_pool
+from src.constants import SEARCH_INDEX_DIR, DATA_SEARCH_WORKERS
 
 console = Console()
 logger = logging.getLogger(__name__)
 
-def search(file_path: str = typer.Argument(..., help="検索対象のAccessファイルのパス"), 
-           pattern: str = typer.Argument(..., help="検索するキーワードまたは正規表現パターン")):
+def _iter_all(*sources):
+    # 上限に達して閉じられた場合は、実行中の検索のみが終了処理される
+    for source in sources:
+        yield from source
+
+def search(file_path: str = typer.Argument(..., help="検索対象のAccessファイルのパス"),
+           pattern: str = typer.Argument(..., help="検索するキーワードまたは正規表現パターン"),
+           keywords: List[str] = typer.Option(None, "--keyword", "-k", help="追加の検索キーワード（複数指定可）。いずれかに一致した行が表示されます。"),
+           regex: bool = typer.Option(False, "--regex", "-e", help="パターンとキーワードを正規表現として扱います。"),
+           limit: int = typer.Option(0, "--limit", "-n", help="表示する検索結果の最大件数。指定した件数に達した時点で検索を終了します（0は無制限）。"),
+           use_cache: bool = typer.Option(True, "--cache/--no-cache", help="変更されていないオブジェクトのエクスポート結果をキャッシュから再利用します。"),
+           use_index: bool = typer.Option(True, "--index/--no-index", help="トライグラム索引を使用して検索します。変更されたオブジェクトのみが再索引されます（キャッシュが有効な場合のみ）。"),
+           search_data: bool = typer.Option(False, "--data/--no-data", help="テーブルのデータも検索します。テキスト型/メモ型の列のみを対象に、検索条件をSQLの LIKE として実行します。"),
+           data_workers: int = typer.Option(DATA_SEARCH_WORKERS, "--data-workers", min=1, help="テーブルのデータを並行して検索する接続の数。")):
     """
     指定されたAccessファイル（.accdbまたは.mdb）内の全てのオブジェクトからキーワードを検索します。
 
     このコマンドは、以下の要素を横断的に検索し、開発者が特定の情報やコードの場所を迅速に見つけるのに役立ちます。
     - **VBAコード**: モジュール、フォーム、レポート、マクロ内のVBAコード。
     - **オブジェクト名**: テーブル、クエリ、フォーム、レポート、マクロ、モジュールの名前。
-    - **テーブルデータ**: データベース内の各テーブルのデータ。
+    - **テーブルデータ**: データベース内の各テーブルのデータ（`--data` を指定した場合）。
 
-    検索結果は、オブジェクトの種類、名前、一致した行番号や列名、そして一致した内容とともにコンソールに表示されます。
+    検索結果は、見つかった順にオブジェクトの種類、名前、一致した行番号や列名、そして一致した内容とともにコンソールに表示されます。
+    `--keyword` で複数のキーワードを同時に検索でき、`--regex` を指定すると正規表現として扱います。
     大文字・小文字は区別されません。
+
+    検索にはオブジェクトのテキストから作成したトライグラム索引が使用されます。
+    Accessファイルが前回の検索から変更されていない場合は、Accessを起動せずに索引とキャッシュから結果を返します。
+
+    `--data` を指定すると、テーブルのテキスト型/メモ型の列を LIKE 条件で検索し、一致した行だけを読み込みます。
+    複数のテーブルは `--data-workers` 個の接続で並行して検索されます（`--regex` の場合はテキスト列を読み込んでから照合します）。
     """
     file_path = os.path.abspath(file_path)
-    logger.info(f"search コマンドが実行されました。ファイルパス: {file_path}, 検索パターン: {pattern}")
+    logger.info(f"search コマンドが実行されました。ファイルパス: {file_path}, 検索パターン: {pattern}, 追加キーワード: {keywords}, 正規表現: {regex}, 上限: {limit}")
     if not os.path.exists(file_path):
         console.print(f"[bold red]エラー: ファイルが見つかりません: {file_path}[/bold red]")
         logger.error(f"ファイルが見つかりません: {file_path}")
         raise typer.Exit(code=1)
 
-    lock_file = file_path.replace('.accdb', '.laccdb').replace('.mdb', '.ldb')
-    if os.path.exists(lock_file):
+    # 対話モードで保持しているAccessセッションや、接続プールの接続がある場合は、他のコンピューターのロックのみを確認する
+    if is_locked_by_others(file_path, is_held_by_session_pool(file_path) or is_held_by_connection_pool(file_path)):
         console.print(f"[bold red]エラー: 対象ファイルは現在開かれているため、検索を実行できません。ファイルを閉じてから再度お試しください。: {file_path}[/bold red]")
         logger.error(f"対象ファイルは現在開かれています: {file_path}")
         raise typer.Exit(code=1)
 
+    patterns = [pattern] + list(keywords or [])
+    try:
+        matcher = compile_search_pattern(patterns, regex=regex)
+    except (re.error, ValueError) as e:
+        console.print(f"[bold red]エラー: 検索パターンが正しくありません: {e}[/bold red]")
+        logger.error(f"検索パターンが正しくありません: {patterns} - {e}")
+        raise typer.Exit(code=1)
+
+    cache = open_export_cache(file_path, use_cache)
+    found = 0
     try:
-        console.print(f"[cyan]検索を実行中... (キーワード: '{pattern}')[/cyan]")
-        logger.info(f"検索を実行中... (キーワード: '{pattern}')")
-        results = search_all_access_content(file_path, pattern)
+        console.print(f"[cyan]検索を実行中... (キーワード: {', '.join(repr(p) for p in patterns)})[/cyan]")
+        logger.info(f"検索を実行中... (キーワード: {patterns})")
+
+        # 結果は見つかった順に表示し、上限に達したら検索を打ち切る（ジェネレーターを閉じるとAccessも終了する）
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            if use_index and cache:
+                index = stack.enter_context(SearchIndex(SEARCH_INDEX_DIR, file_path))
+                results = iter_search_access_content_indexed(file_path, matcher, None if regex else patterns, cache, index)
+            else:
+                results = iter_search_access_content(file_path, matcher, cache)
+            if search_data:
+                results = _iter_all(results, iter_search_database(file_path, matcher, None if regex else patterns, data_workers))
+            results = stack.enter_context(contextlib.closing(results))
+            for result in itertools.islice(results, limit or None):
+                found += 1
+                location = f":{result['line_num']}" if result.get("line_num") else ""
+                column = f" [{result['column_name']}]" if result.get("column_name") else ""
+                console.print(f"[cyan]{escape(result['type'])}[/cyan] [green]{escape(result['name'])}[/green]{location}{escape(column)}  {escape(result['line_content'])}")
+                logger.info(f"検索結果: 種類={result['type']}, 名前={result['name']}, 行/レコード番号={result.get('line_num', 'N/A')}, 列名={result.get('column_name', 'N/A')}, 内容={result['line_content']}")
+
+        if cache:
+            cache.save()
+            console.print(f"[dim]{cache.summary()}[/dim]")
+            logger.info(cache.summary())
 
-        if not results:
+        logger.info(f"検索時間: {time.perf_counter() - start:.3f}秒")
+        if not found:
             console.print("[yellow]キーワードに一致するオブジェクトは見つかりませんでした。[/yellow]")
             logger.info("キーワードに一致するオブジェクトは見つかりませんでした。")
             return
 
-        table = Table(title=f"「{pattern}」の検索結果", title_justify="left", show_header=True, header_style="bold ")
-        table.add_column("オブジェクト種類", style="cyan")
-        table.add_column("オブジェクト名", style="green")
-        table.add_column("行/レコード番号", style="dim")
-        table.add_column("列名", style="dim")
-        table.add_column("一致した内容")
-
-        for result in results:
-            table.add_row(
-                result["type"],
-                result["name"],
-                str(result.get("line_num", "-")),
-                result.get("column_name", "-"),
-                result["line_content"]
-            )
-            logger.info(f"検索結果: 種類={result['type']}, 名前={result['name']}, 行/レコード番号={result.get('line_num', 'N/A')}, 列名={result.get('column_name', 'N/A')}, 内容={result['line_content']}")
-        
-        console.print(table)
+        if limit and found >= limit:
+            console.print(f"\n[bold]{found}件[/bold]の結果を表示しました（上限 {limit}件に達したため検索を終了しました）。")
+        else:
+            console.print(f"\n[bold]{found}件[/bold]の結果が見つかりました。")
+        logger.info(f"{found}件の結果が見つかりました。")
 
     except Exception as e:
         handle_com_error(e)
-        logger.error(f"search コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"search コマンドの実行中にエラーが発生しました: {e}", exc_info=True)
@@ -12,6 +12,28 @@ BASE_APP_DIR = os.path.dirname(sys.argv[0])
 DIFF_REPORT_PATH = os.path.join(BASE_APP_DIR, "output", "reports", "access_diff_report.html")
 UNUSED_OBJECTS_REPORT_PATH = os.path.join(BASE_APP_DIR, "output", "reports", "unused_objects_report.html")
 BENCHMARK_REPORT_PATH = os.path.join(BASE_APP_DIR, "output", "reports", "benchmark_report.html")
+LOAD_TEST_REPORT_PATH = os.path.join(BASE_APP_DIR, "output", "reports", "load_test_report.html")
+
+# Cache Paths (relative to BASE_APP_DIR)
+EXPORT_CACHE_DIR = os.path.join(BASE_APP_DIR, "output", "cache", "exports")
+EXPORT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+EXPORT_CACHE_MAX_AGE_DAYS = 30
+SEARCH_INDEX_DIR = os.path.join(BASE_APP_DIR, "output", "cache", "search")
+TABLE_FINGERPRINT_CACHE_DIR = os.path.join(BASE_APP_DIR, "output", "cache", "fingerprints")
+
+# Benchmark history (one SQLite database shared by every benchmarked file)
+BENCHMARK_HISTORY_PATH = os.path.join(BASE_APP_DIR, "output", "history", "benchmark_history.sqlite3")
+BENCHMARK_TREND_RUNS = 20
+
+# Pipelined table diff (diff --table-mode pipeline)
+TABLE_PIPELINE_MAX_INFLIGHT = 2
+TABLE_PIPELINE_MEMORY_CAP_MB = 512
+
+# Number of connections used to search table data in parallel (search --data)
+DATA_SEARCH_WORKERS = 4
+
+# Import order for load (modules first, so forms/reports referencing them compile)
+OBJECT_IMPORT_ORDER = ("Modules", "Queries", "Macros", "Reports", "Forms")
 
 # Log Output Paths (relative to BASE_APP_DIR)
 LOG_DIR = os.path.join(BASE_APP_DIR, "logs")
@@ -30,6 +52,7 @@ else:
 DIFF_REPORT_TEMPLATE = "report_template.html"
 UNUSED_OBJECTS_REPORT_TEMPLATE = "unused_objects_report_template.html"
 BENCHMARK_REPORT_TEMPLATE = "benchmark_report_template.html"
+LOAD_TEST_REPORT_TEMPLATE = "load_test_report_template.html"
 
 # Absolute path to the templates directory
 TEMPLATES_DIR = os.path.join(RESOURCE_BASE_PATH, 'src', 'templates')
@@ -1,28 +1,93 @@
 # -*- coding: utf-8 -*-
 import os
-import win32com.client
-import win32com.client.gencache
-win32com.client.gencache.EnsureDispatch("Access.Application")
 import contextlib
 import tempfile
 import shutil
-from src.utils import handle_com_error, sanitize_for_excel, is_file_locked
-from src.core.db_operations import db_connection, search_in_tables
+import time
+import logging
+from src.utils import handle_com_error, sanitize_for_excel, is_file_locked, is_locked_by_others
+from src.core.reference_index import ReferenceIndex, extract_public_procedures
+from src.core.session_pool import enable_session_pool, get_session_pool
+from src.core.connection_pool import is_held_by_connection_pool, release_pooled_connections
+from src.core.search_engine import iter_matching_lines
+from src.core.export_manifest import file_hash, list_exported_files
+from src.core.vba_rewrite import component_owner, rewrite_code_module
+from src.core.relink import plan_relink, relink_groups
+from src.core.com_profiler import profile_application
+from src.core.index_advisor import extract_sql_from_query_text
+
+logger = logging.getLogger(__name__)
+
+# Access/DAO の定数（win32com.client.constants を使うとインポート時にタイプライブラリの生成が必要になるため値で定義する）
+AC_QUERY = 1
+AC_FORM = 2
+AC_REPORT = 3
+AC_MACRO = 4
+AC_MODULE = 5
+DB_ATTACHED_TABLE = 1073741824
 
 OBJECT_TYPES = {
-    "Forms": win32com.client.constants.acForm,
-    "Reports": win32com.client.constants.acReport,
-    "Macros": win32com.client.constants.acMacro,
-    "Modules": win32com.client.constants.acModule,
-    "Queries": win32com.client.constants.acQuery,
+    "Forms": AC_FORM,
+    "Reports": AC_REPORT,
+    "Macros": AC_MACRO,
+    "Modules": AC_MODULE,
+    "Queries": AC_QUERY,
 }
 OBJECT_EXTENSIONS = {
     "Forms": ".frm", "Reports": ".rpt", "Macros": ".mcr", "Modules": ".bas", "Queries": ".qry",
 }
 
+def is_system_object_name(name):
+    # 一時クエリやシステムオブジェクトを除外
+    return name.startswith("~") or name.startswith("MSys")
+
+def iter_access_objects(app, categories=None):
+    for category in categories or OBJECT_TYPES:
+        if category == "Queries":
+            collection = app.CurrentDb().QueryDefs
+        else:
+            collection = getattr(app.CurrentProject, f"All{category}")
+        for obj in collection:
+            if obj and obj.Name and not is_system_object_name(obj.Name):
+                yield category, OBJECT_TYPES[category], obj
+
+def read_exported_text(file_path):
+    with open(file_path, 'r', encoding='utf-16-le', errors='ignore') as f: #accessで出力されたァイルはutf-16になる
+        return f.read()
+
+def get_object_date_modified(category, obj):
+    try:
+        # QueryDef は DateModified を持たないため LastUpdated を使う
+        if category == "Queries":
+            return obj.LastUpdated
+        return obj.DateModified
+    except Exception:
+        return None
+
+def list_access_objects(app):
+    return [(category, obj.Name, get_object_date_modified(category, obj)) for category, _, obj in iter_access_objects(app)]
+
+def save_object_as_text(app, category, obj_type, obj, file_path, cache=None):
+    if cache is None:
+        app.SaveAsText(obj_type, obj.Name, file_path)
+        return
+    save_named_object_as_text(app, category, obj.Name, get_object_date_modified(category, obj), file_path, cache)
+
+def save_named_object_as_text(app, category, name, date_modified, file_path, cache=None):
+    data = cache.get(category, name, date_modified) if cache is not None else None
+    if data is not None:
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return
+    app.SaveAsText(OBJECT_TYPES[category], name, file_path)
+    if cache is not None:
+        with open(file_path, 'rb') as f:
+            cache.put(category, name, date_modified, f.read())
+
 @contextlib.contextmanager
 def temporary_access_copy(original_path):
-    if is_file_locked(original_path):
+    # 接続プールの接続がある場合は、他のコンピューターのロックのみを確認する
+    if is_locked_by_others(original_path, is_held_by_connection_pool(original_path)):
         raise IOError("対象のAccessファイルが開かれているため、処理を中断しました。ファイルを閉じてから再実行してください。")
     temp_dir = tempfile.mkdtemp()
     temp_path = os.path.join(temp_dir, os.path.basename(original_path))
@@ -30,15 +95,43 @@ def temporary_access_copy(original_path):
     try:
         yield temp_path, temp_dir
     finally:
+        # 一時コピーを開いたままのセッションが残っていると削除できないため、先に終了する
+        release_access_session(temp_path)
+        release_pooled_connections(temp_path)
         shutil.rmtree(temp_dir)
 
 
+def create_access_application():
+    # win32com はAccessを使用するコマンドの実行時にのみ読み込む
+    import win32com.client.gencache
+    app = win32com.client.gencache.EnsureDispatch("Access.Application")
+    app.Visible = False
+    return app
+
+def start_access_session_pool(idle_timeout=600):
+    return enable_session_pool(create_access_application, idle_timeout=idle_timeout)
+
+def release_access_session(db_path):
+    pool = get_session_pool()
+    if pool is not None:
+        pool.close(db_path)
+
 @contextlib.contextmanager
 def access_application(db_path):
+    # Accessでデザインの変更を行えるよう、接続プールが保持している接続を先に閉じる
+    release_pooled_connections(db_path)
+    pool = get_session_pool()
+    if pool is not None:
+        # セッションプールが有効な場合は、同じデータベースのAccessインスタンスを再利用する
+        if is_locked_by_others(db_path, pool.holds(db_path)):
+            raise IOError("対象のAccessファイルが開かれているため、処理を中断しました。ファイルを閉じてから再実行してください。")
+        with pool.session(db_path) as app:
+            yield profile_application(app)
+        return
+
     if is_file_locked(db_path):
         raise IOError("対象のAccessファイルが開かれているため、処理を中断しました。ファイルを閉じてから再実行してください。")
-    app = win32com.client.Dispatch("Access.Application")
-    app.Visible = False
+    app = profile_application(create_access_application())
     app.OpenCurrentDatabase(db_path)
     try:
         yield app
@@ -46,114 +139,120 @@ def access_application(db_path):
         app.CloseCurrentDatabase()
         app.Quit()
 
-def export_objects(app, export_dir):
+def export_objects(app, export_dir, cache=None):
     exported_files = {category: [] for category in OBJECT_TYPES.keys()}
-    for category, obj_type in OBJECT_TYPES.items():
-        if category == "Queries":
-            collection = app.CurrentDb().QueryDefs
-        else:
-            collection = getattr(app.CurrentProject, f"All{category}")
-        for obj in collection:
-            if obj and obj.Name:
-                # 一時クエリやシステムクエリを除外
-                if category == "Queries" and (obj.Name.startswith("~") or obj.Name.startswith("MSys")):
-                    continue
-                ext = OBJECT_EXTENSIONS[category]
-                filename = f"{obj.Name}{ext}"
-                filepath = os.path.join(export_dir, filename)
-                app.SaveAsText(obj_type, obj.Name, filepath)
-                exported_files[category].append(filename)
+    for category, obj_type, obj in iter_access_objects(app):
+        ext = OBJECT_EXTENSIONS[category]
+        filename = f"{obj.Name}{ext}"
+        filepath = os.path.join(export_dir, filename)
+        save_object_as_text(app, category, obj_type, obj, filepath, cache)
+        exported_files[category].append(filename)
     return exported_files
 
+def export_catalog_entries(app, entries, export_dir, cache=None):
+    durations = {}
+    for category, name, date_modified in entries:
+        filepath = os.path.join(export_dir, f"{name}{OBJECT_EXTENSIONS[category]}")
+        start = time.perf_counter()
+        save_named_object_as_text(app, category, name, date_modified, filepath, cache)
+        durations[(category, name)] = time.perf_counter() - start
+    return durations
+
 def import_objects(app, import_dir):
+    return import_object_files(app, import_dir, list_exported_files(import_dir, OBJECT_EXTENSIONS))
+
+def import_object_files(app, import_dir, entries):
+    # entries は (カテゴリ, 名前, ファイル名, ...) の順序付きリスト（モジュールが先）
     imported_files = {category: [] for category in OBJECT_TYPES.keys()}
-    for filename in os.listdir(import_dir):
-        filepath = os.path.join(import_dir, filename)
-        obj_name, ext = os.path.splitext(filename)
-        for category, ext_type in OBJECT_EXTENSIONS.items():
-            if ext == ext_type:
-                obj_type = OBJECT_TYPES[category]
-                app.LoadFromText(obj_type, obj_name, filepath)
-                imported_files[category].append(filename)
-                break
+    for category, obj_name, filename, *_ in entries:
+        app.LoadFromText(OBJECT_TYPES[category], obj_name, os.path.join(import_dir, filename))
+        imported_files[category].append(filename)
     return imported_files
 
-def search_exported_objects(app, pattern):
-    results = []
-    for category, obj_type in OBJECT_TYPES.items():
-        if category == "Queries":
-            collection = app.CurrentDb().QueryDefs
-        else:
-            collection = getattr(app.CurrentProject, f"All{category}")
-        for obj in collection:
-            if not (obj and obj.Name):
-                continue
-            temp_dir = tempfile.mkdtemp()
-            temp_file_path = os.path.join(temp_dir, "temp_export.txt")
-            try:
-                app.SaveAsText(obj_type, obj.Name, temp_file_path)
-                with open(temp_file_path, 'r', encoding='utf-16-le', errors='ignore') as f: #accessで出力されたァイルはutf-16になる
-                    for i, line in enumerate(f, 1):
-                        if pattern.lower() in line.lower(): # 大文字小文字 区別なし
-                            results.append({
-                                "type": category, "name": obj.Name,
-                                "line_num": i, "line_content": line.strip(),
-                            })
-            finally:
-                shutil.rmtree(temp_dir)
-    return results
+def exported_object_hash(app, category, name, date_modified, scratch_path, cache=None):
+    save_named_object_as_text(app, category, name, date_modified, scratch_path, cache)
+    return file_hash(scratch_path)
 
-def search_object_names(app, pattern):
-    results = []
-    for category, obj_type in OBJECT_TYPES.items():
-        if category == "Queries":
-            collection = app.CurrentDb().QueryDefs
-        else:
-            collection = getattr(app.CurrentProject, f"All{category}")
-        for obj in collection:
-            if obj and obj.Name and pattern.lower() in obj.Name.lower():
-                results.append({
-                    "type": f"{category} Name", "name": obj.Name,
-                    "line_num": None, "line_content": obj.Name,
-                })
-    return results
+def iter_search_access_objects(app, matcher, scratch_dir, cache=None):
+    # 作業ファイルは検索全体で1つを使い回す
+    temp_file_path = os.path.join(scratch_dir, "search_export.txt")
+    for category, obj_type, obj in iter_access_objects(app):
+        if matcher.search(obj.Name):
+            yield {
+                "type": f"{category} Name", "name": obj.Name,
+                "line_num": None, "line_content": obj.Name,
+            }
+        save_object_as_text(app, category, obj_type, obj, temp_file_path, cache)
+        with open(temp_file_path, 'r', encoding='utf-16-le', errors='ignore') as f: #accessで出力されたァイルはutf-16になる
+            for line_num, line in iter_matching_lines(matcher, f):
+                yield {
+                    "type": category, "name": obj.Name,
+                    "line_num": line_num, "line_content": line,
+                }
+
+def iter_search_access_content(db_path, matcher, cache=None):
+    scratch_dir = tempfile.mkdtemp()
+    try:
+        # Search in exported objects (VBA, Forms, Reports, Macros, Queries)
+        with access_application(db_path) as app:
+            yield from iter_search_access_objects(app, matcher, scratch_dir, cache)
+    finally:
+        shutil.rmtree(scratch_dir)
 
-def search_all_access_content(db_path, pattern):
-    all_results = []
-    # Search in exported objects (VBA, Forms, Reports, Macros, Queries)
-    with access_application(db_path) as app:
-        all_results.extend(search_object_names(app, pattern))
-        all_results.extend(search_exported_objects(app, pattern))
+def refresh_search_index(app, index, cache, scratch_dir):
+    catalog = list_access_objects(app)
+    stale = {(category, name) for category, name, _ in index.stale_objects(catalog, cache)}
+    temp_file_path = os.path.join(scratch_dir, "index_export.txt")
+    reindexed = {}
+    for category, obj_type, obj in iter_access_objects(app):
+        if (category, obj.Name) in stale:
+            save_object_as_text(app, category, obj_type, obj, temp_file_path, cache)
+            reindexed[(category, obj.Name)] = read_exported_text(temp_file_path)
+    index.apply(catalog, reindexed)
+    return len(reindexed)
 
-    return all_results
+def iter_search_access_content_indexed(db_path, matcher, literals, cache, index):
+    def read_text(category, name, modified):
+        data = cache.get(category, name, modified)
+        return None if data is None else data.decode('utf-16-le', errors='ignore')
 
-def analyze_usage(app):
-    all_objects = {}
-    for cat in OBJECT_TYPES:
-        if cat == "Queries":
-            all_objects[cat] = [obj.Name for obj in app.CurrentDb().QueryDefs if obj and obj.Name and not (obj.Name.startswith("~") or obj.Name.startswith("MSys"))]
-        else:
-            all_objects[cat] = [obj.Name for obj in getattr(app.CurrentProject, f"All{cat}") if obj and obj.Name and not (obj.Name.startswith("~") or obj.Name.startswith("MSys"))]
+    # データベースファイルが変更されていなければ、Accessを起動せずに索引とキャッシュだけで検索する
+    objects = index.objects()
+    if not index.is_current() or any(not cache.contains(category, name, modified) for _, category, name, modified in objects):
+        scratch_dir = tempfile.mkdtemp()
+        try:
+            with access_application(db_path) as app:
+                reindexed = refresh_search_index(app, index, cache, scratch_dir)
+        finally:
+            shutil.rmtree(scratch_dir)
+        index.mark_current()
+        cache.save()
+        logger.info(f"検索索引を更新しました（再索引: {reindexed}件）。")
+    yield from index.iter_search(matcher, literals, read_text)
 
-    full_source_code = ""
+def build_reference_index(app, cache=None):
+    index = ReferenceIndex()
+    all_objects = []
+    module_symbols = {}
     temp_dir = tempfile.mkdtemp()
+    temp_file = os.path.join(temp_dir, "temp.txt")
     try:
-        for category, obj_type in OBJECT_TYPES.items():
-            if category == "Queries":
-                collection = app.CurrentDb().QueryDefs
-            else:
-                collection = getattr(app.CurrentProject, f"All{category}")
-            for obj in collection:
-                if obj and obj.Name and not (obj.Name.startswith("~") or obj.Name.startswith("MSys")):
-                    temp_file = os.path.join(temp_dir, "temp.txt")
-                    app.SaveAsText(obj_type, obj.Name, temp_file)
-                    with open(temp_file, 'r', encoding='utf-16-le', errors='ignore') as f: #accessで出力されたァイルはutf-16になる
-                        full_source_code += f.read() + '\n'
+        # 各オブジェクトのテキストは一度だけ走査し、識別子の索引に登録する
+        for category, obj_type, obj in iter_access_objects(app):
+            save_object_as_text(app, category, obj_type, obj, temp_file, cache)
+            text = read_exported_text(temp_file)
+            owner = (category, obj.Name)
+            all_objects.append(owner)
+            index.add_source(owner, text)
+            if category == "Modules":
+                module_symbols[obj.Name] = extract_public_procedures(text)
     finally:
         shutil.rmtree(temp_dir)
-    
-    unused = [(cat, name) for cat, names in all_objects.items() for name in names if name not in full_source_code]
-    return unused
+    return index, all_objects, module_symbols
+
+def analyze_usage(app, cache=None):
+    index, all_objects, module_symbols = build_reference_index(app, cache)
+    return index.find_unused(all_objects, module_symbols)
 
 def get_access_query_names(app):
     query_names = []
@@ -163,41 +262,73 @@ def get_access_query_names(app):
             query_names.append(qdef.Name)
     return query_names
 
-def release_prepare(app, test_conn, prod_conn):
-    modified = False
-    for category in ["Modules", "Forms"]:
-        for obj in getattr(app.CurrentProject, f"All{category}"):
-            if obj and obj.Name:
-                module = app.VBE.ActiveVBProject.VBComponents(obj.Name).CodeModule
-                code = module.Lines(1, module.CountOfLines)
-                new_code = []
-                changed = False
-                for line in code.splitlines():
-                    new_line = line
-                    if test_conn in new_line:
-                        new_line = new_line.replace(test_conn, prod_conn)
-                        changed = True
-                    if "debug.print" in new_line.lower() and not new_line.strip().startswith("'"):
-                        new_line = "'" + new_line
-                        changed = True
-                    new_code.append(new_line)
-                if changed:
-                    modified = True
-                    module.DeleteLines(1, module.CountOfLines)
-                    module.AddFromString("\n".join(new_code))
-    return modified
-
-def update_linked_table_paths(app, old_path_prefix, new_path_prefix):
-    updated_count = 0
-    for tdf in app.CurrentDb().TableDefs:
-        # リンクテーブルかどうかをチェック (dbAttachedTable属性)
-        if tdf.Attributes & win32com.client.constants.dbAttachedTable:
-            connect_string = tdf.Connect
-            # Connect文字列が古いパスプレフィックスで始まるかチェック
-            if connect_string.startswith(old_path_prefix):
-                new_connect_string = connect_string.replace(old_path_prefix, new_path_prefix, 1)
-                if new_connect_string != connect_string:
-                    tdf.Connect = new_connect_string
-                    tdf.RefreshLink() # リンクを更新
-                    updated_count += 1
-    return updated_count
+def get_access_form_names(app):
+    return [obj.Name for _, _, obj in iter_access_objects(app, ["Forms"])]
+
+def get_access_query_sql(app):
+    """保存済みクエリの {クエリ名: SQL} を返します（システムクエリや一時クエリは除外）。"""
+    return {qdef.Name: qdef.SQL for qdef in app.CurrentDb().QueryDefs if not is_system_object_name(qdef.Name)}
+
+def read_exported_query_sql(export_dir):
+    """export コマンドで出力された .qry ファイルから {クエリ名: SQL} を返します（Accessを起動せずに使用できます）。"""
+    queries = {}
+    for category, name, filename in list_exported_files(export_dir, OBJECT_EXTENSIONS):
+        if category != "Queries" or is_system_object_name(name):
+            continue
+        sql = extract_sql_from_query_text(read_exported_text(os.path.join(export_dir, filename)))
+        if sql is not None:
+            queries[name] = sql
+    return queries
+
+def release_prepare(app, test_conn, prod_conn, cache=None):
+    """
+    全てのVBAコンポーネントの接続文字列を置換し、Debug.Print をコメントアウトします。
+
+    変更が必要な行のみを書き換え、コンポーネントごとの統計（rewrite_code_module の戻り値）のリストを返します。
+    cache を指定すると、DateModified が一致するオブジェクトはキャッシュのテキストで候補を追加します（対象外の判定は常に Find で確認します）。
+    """
+    modified_dates = {}
+    if cache is not None:
+        for category, _, obj in iter_access_objects(app, ["Forms", "Reports", "Modules"]):
+            modified_dates[(category, obj.Name.casefold())] = get_object_date_modified(category, obj)
+
+    results = []
+    for component in app.VBE.ActiveVBProject.VBComponents:
+        category, name = component_owner(component.Name, component.Type)
+        cached_text = None
+        date_modified = modified_dates.get((category, name.casefold()))
+        if date_modified is not None:
+            data = cache.get(category, name, date_modified)
+            if data is not None:
+                cached_text = data.decode('utf-16-le', errors='ignore')
+        results.append(rewrite_code_module(component.Name, component.CodeModule, test_conn, prod_conn, cached_text))
+    return results
+
+def list_linked_tables(db):
+    return [(tdf.Name, tdf.Connect) for tdf in db.TableDefs
+            if tdf.Attributes & DB_ATTACHED_TABLE and not is_system_object_name(tdf.Name)]
+
+def get_linked_table_names(app):
+    return [name for name, _ in list_linked_tables(app.CurrentDb())]
+
+@contextlib.contextmanager
+def open_backend_database(app, backend_path):
+    # 再リンクの間バックエンドを開いたままにし、RefreshLink ごとの再接続を省く
+    if not os.path.exists(backend_path):
+        raise FileNotFoundError(f"バックエンドが見つかりません: {backend_path}")
+    backend = app.DBEngine.OpenDatabase(backend_path, False, True)
+    try:
+        yield backend
+    finally:
+        backend.Close()
+
+def relink_linked_tables(app, old_path_prefix, new_path_prefix, dry_run=False):
+    db = app.CurrentDb()
+    groups = plan_relink(list_linked_tables(db), old_path_prefix, new_path_prefix)
+
+    def refresh_link(table_name, new_connect):
+        tdf = db.TableDefs(table_name)
+        tdf.Connect = new_connect
+        tdf.RefreshLink()
+
+    return relink_groups(groups, refresh_link, lambda path: open_backend_database(app, path), dry_run)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマークの結果をローカルのSQLiteデータベースに蓄積し、過去の結果と比較するモジュールです。
+
+実行ごとに、Accessファイル・クエリ名・バージョンタグ（git describe など）・マシン名をキーとして
+測定値を保存します。実行には測定対象の種類（クエリまたはフォーム）を記録し、比較と推移は同じ種類の実行に限ります。比較では、ベースラインと今回の測定値（外れ値を除いたもの）に対して
+Welch の t 検定を行い、有意に遅くなり、かつ遅くなった割合がしきい値を超えたクエリを性能の低下として報告します。
+"""
+import os
+import json
+import math
+import sqlite3
+import platform
+import subprocess
+import statistics
+import datetime
+
+from src.core.benchmark_stats import reject_outliers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT NOT NULL,
+    version TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    kind TEXT NOT NULL DEFAULT 'query'
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    query TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    median REAL,
+    mean REAL,
+    p95 REAL,
+    stdev REAL,
+    timings TEXT NOT NULL,
+    PRIMARY KEY (run_id, query)
+);
+CREATE INDEX IF NOT EXISTS runs_by_file ON runs (file, machine, version);
+"""
+
+
+def file_key(file_path):
+    return os.path.normcase(os.path.abspath(file_path))
+
+
+def detect_version(path):
+    """path のあるディレクトリの git describe の結果を返します。取得できない場合は "unknown" を返します。"""
+    directory = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    try:
+        completed = subprocess.run(["git", "describe", "--tags", "--always", "--dirty"], cwd=directory,
+                                   capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return completed.stdout.strip() if completed.returncode == 0 and completed.stdout.strip() else "unknown"
+
+
+def machine_name():
+    return platform.node() or "unknown"
+
+
+class BenchmarkHistory:
+    """ベンチマークの結果の履歴です。コンテキストマネージャーとして使用すると、終了時にデータベースを閉じます。"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        # 種類の列がない以前の履歴は、全てクエリの実行として扱う
+        if "kind" not in [row[1] for row in self.conn.execute("PRAGMA table_info(runs)")]:
+            with self.conn:
+                self.conn.execute("ALTER TABLE runs ADD COLUMN kind TEXT NOT NULL DEFAULT 'query'")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, file_path, version, machine, results, created_at=None, kind="query"):
+        """BenchmarkResult.to_dict() のリストを1回の実行として保存し、実行のIDを返します。kind は測定対象の種類です。"""
+        created_at = created_at or datetime.datetime.now().isoformat(timespec="seconds")
+        with self.conn:
+            run_id = self.conn.execute("INSERT INTO runs (file, version, machine, created_at, kind) VALUES (?, ?, ?, ?, ?)",
+                                       (file_key(file_path), version, machine, created_at, kind)).lastrowid
+            self.conn.executemany(
+                "INSERT INTO results (run_id, query, runs, median, mean, p95, stdev, timings) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, result["name"], result["runs"], result["median"], result["mean"], result["p95"], result["stdev"],
+                  json.dumps(result["timings"])) for result in results if result["runs"]],
+            )
+        return run_id
+
+    def find_run(self, file_path, version, machine=None, before=None, kind="query"):
+        """指定したバージョンと種類の最新の実行のIDを返します。machine を指定した場合は同じマシンの実行に限ります。"""
+        sql = "SELECT id FROM runs WHERE file = ? AND version = ? AND kind = ?"
+        params = [file_key(file_path), version, kind]
+        if machine is not None:
+            sql += " AND machine = ?"
+            params.append(machine)
+        if before is not None:
+            sql += " AND id < ?"
+            params.append(before)
+        row = self.conn.execute(sql + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def run_timings(self, run_id):
+        """実行のクエリ名 -> 測定値（秒）のリストを返します。"""
+        rows = self.conn.execute("SELECT query, timings FROM results WHERE run_id = ?", (run_id,))
+        return {query: json.loads(timings) for query, timings in rows}
+
+    def trends(self, file_path, machine=None, limit=20, kind="query"):
+        """
+        種類が kind の最近の limit 回の実行について、{"runs": [{"id", "version", "created_at"}], "queries": {クエリ名: [中央値 or None]}} を返します。
+        """
+        sql = "SELECT id, version, created_at FROM runs WHERE file = ? AND kind = ?"
+        params = [file_key(file_path), kind]
+        if machine is not None:
+            sql += " AND machine = ?"
+            params.append(machine)
+        runs = self.conn.execute(sql + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()[::-1]
+        queries = {}
+        for index, (run_id, _, _) in enumerate(runs):
+            for query, median in self.conn.execute("SELECT query, median FROM results WHERE run_id = ?", (run_id,)):
+                queries.setdefault(query, [None] * len(runs))[index] = median
+        return {
+            "runs": [{"id": run_id, "version": version, "created_at": created_at} for run_id, version, created_at in runs],
+            "queries": queries,
+        }
+
+
+def _betacf(a, b, x, max_iterations=200, epsilon=3e-14):
+    # 不完全ベータ関数の連分数展開（Numerical Recipes の betacf）
+    qab, qap, qam = a + b, a + 1, a - 1
+    c, d = 1.0, 1 - qab * x / qap
+    d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+    h = d
+    for m in range(1, max_iterations + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1 + aa * d
+        d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+        c = 1 + aa / c if abs(1 + aa / c) > 1e-300 else 1e-300
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1 + aa * d
+        d = 1 / (d if abs(d) > 1e-300 else 1e-300)
+        c = 1 + aa / c if abs(1 + aa / c) > 1e-300 else 1e-300
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < epsilon:
+            break
+    return h
+
+
+def _regularized_beta(a, b, x):
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1 - x))
+    if x < (a + 1) / (a + b + 2):
+        return front * _betacf(a, b, x) / a
+    return 1 - front * _betacf(b, a, 1 - x) / b
+
+
+def t_distribution_sf(t, degrees):
+    """自由度 degrees の t 分布で、T > t となる確率（上側確率）を返します。"""
+    tail = 0.5 * _regularized_beta(degrees / 2, 0.5, degrees / (degrees + t * t))
+    return tail if t >= 0 else 1 - tail
+
+
+def welch_test(baseline, current):
+    """
+    Welch の t 検定で、current の平均が baseline の平均より大きい（遅い）かどうかを検定し、(t値, 自由度, 片側p値) を返します。
+    どちらかの測定値が2件未満の場合は None を返します。
+    """
+    if len(baseline) < 2 or len(current) < 2:
+        return None
+    mean1, mean2 = statistics.fmean(baseline), statistics.fmean(current)
+    var1, var2 = statistics.variance(baseline) / len(baseline), statistics.variance(current) / len(current)
+    if var1 + var2 == 0:
+        # ばらつきがない場合は、平均値の大小だけで判定する
+        return (math.inf, math.inf, 0.0) if mean2 > mean1 else (-math.inf if mean2 < mean1 else 0.0, math.inf, 1.0)
+    t = (mean2 - mean1) / math.sqrt(var1 + var2)
+    degrees = (var1 + var2) ** 2 / (var1 ** 2 / (len(baseline) - 1) + var2 ** 2 / (len(current) - 1))
+    return t, degrees, t_distribution_sf(t, degrees)
+
+
+def compare_runs(baseline_timings, current_timings, threshold=0.10, alpha=0.05):
+    """
+    クエリごとの測定値を比較し、{"name", "baseline_mean", "current_mean", "change", "p_value", "regression", "missing"} のリストを返します。
+
+    regression は、片側p値が alpha 未満で、かつ平均値の増加率（change）が threshold を超えた場合に True になります。
+    ベースラインにあり今回の測定値がないクエリ（エラー、タイムアウト、未実行）は missing が True になり、
+    current_mean、change、p_value は None になります。それ以外は、それぞれの外れ値を除いてから比較します。
+    """
+    comparisons = []
+    for name in sorted(baseline_timings):
+        baseline = reject_outliers(baseline_timings[name])[0]
+        if not baseline:
+            continue
+        baseline_mean = statistics.fmean(baseline)
+        current = reject_outliers(current_timings.get(name) or [])[0]
+        if not current:
+            comparisons.append({
+                "name": name,
+                "baseline_mean": baseline_mean,
+                "current_mean": None,
+                "change": None,
+                "p_value": None,
+                "regression": False,
+                "missing": True,
+            })
+            continue
+        current_mean = statistics.fmean(current)
+        change = current_mean / baseline_mean - 1 if baseline_mean > 0 else 0.0
+        test = welch_test(baseline, current)
+        p_value = test[2] if test else None
+        comparisons.append({
+            "name": name,
+            "baseline_mean": baseline_mean,
+            "current_mean": current_mean,
+            "change": change,
+            "p_value": p_value,
+            "regression": p_value is not None and p_value < alpha and change > threshold,
+            "missing": False,
+        })
+    return comparisons
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマークの測定値を統計的に扱うモジュールです。
+
+ウォームアップの実行は集計から除外し、四分位範囲（IQR）の外側の測定値を外れ値として除外します。
+実行回数は、平均値の95%信頼区間の幅が平均値に対して十分小さくなるまで（上限回数または
+時間の上限に達するまで）増やします。
+"""
+import math
+import time
+import statistics
+import tracemalloc
+
+# 95%信頼区間に使用する t 分布の臨界値（自由度 1〜30）。30を超える場合は正規分布の値を使用する
+_T_CRITICAL_95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+_Z_95 = 1.960
+
+# 外れ値とみなす四分位範囲の倍率（Tukey の基準）
+OUTLIER_IQR_FACTOR = 1.5
+
+# measure() が辞書を返す場合に、中央値を集計する項目
+METRIC_KEYS = ("execute_seconds", "first_row_seconds", "fetch_seconds", "rows", "rows_per_second", "bytes",
+               "affected_rows", "affected_rows_per_second")
+
+
+def percentile(values, p):
+    """values の p パーセンタイル（0〜100）を線形補間で返します。"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def reject_outliers(values, factor=OUTLIER_IQR_FACTOR):
+    """四分位範囲の factor 倍を超えて外れた値を除き、(残った値, 除外した値) を返します。4件未満の場合は除外しません。"""
+    if len(values) < 4:
+        return list(values), []
+    q1, q3 = percentile(values, 25), percentile(values, 75)
+    low, high = q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+    kept = [value for value in values if low <= value <= high]
+    rejected = [value for value in values if not low <= value <= high]
+    return kept, rejected
+
+
+def confidence_half_width(values):
+    """平均値の95%信頼区間の半分の幅を返します。2件未満の場合は None を返します。"""
+    if len(values) < 2:
+        return None
+    degrees = len(values) - 1
+    critical = _T_CRITICAL_95[degrees - 1] if degrees <= len(_T_CRITICAL_95) else _Z_95
+    return critical * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def trace_peak_memory(func):
+    """func() を実行し、(戻り値, 実行中に確保されたPythonのメモリのピーク（バイト）) を返します。"""
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        value = func()
+        return value, max(0, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+class BenchmarkResult:
+    """
+    1つのクエリのベンチマーク結果です。timings は外れ値を含む全ての測定値（秒）です。
+
+    samples は measure() が辞書を返した場合の各実行の測定値、peak_memory は計測用の実行でのメモリのピーク（バイト）です。
+    """
+
+    def __init__(self, name, warmup=0, metric_keys=METRIC_KEYS):
+        self.name = name
+        self.warmup = warmup
+        self._metric_keys = tuple(metric_keys)
+        self.timings = []
+        self.samples = []
+        self.peak_memory = None
+        self.timed_out = False
+        self.error = None
+
+    def metric(self, key):
+        """各実行の測定値 key の中央値を返します。key を含まない測定値は除外します。"""
+        return percentile([sample[key] for sample in self.samples if key in sample], 50)
+
+    @property
+    def metric_keys(self):
+        """集計する測定値の項目です（コンストラクターの metric_keys と、measure() が返す辞書のその他の項目）。"""
+        extra = [key for key in (self.samples[0] if self.samples else {}) if key != "seconds" and key not in self._metric_keys]
+        return list(self._metric_keys) + extra
+
+    @property
+    def kept(self):
+        return reject_outliers(self.timings)[0]
+
+    @property
+    def outliers(self):
+        return reject_outliers(self.timings)[1]
+
+    @property
+    def runs(self):
+        return len(self.timings)
+
+    @property
+    def mean(self):
+        kept = self.kept
+        return statistics.fmean(kept) if kept else None
+
+    @property
+    def stdev(self):
+        kept = self.kept
+        return statistics.stdev(kept) if len(kept) >= 2 else 0.0 if kept else None
+
+    @property
+    def ci_half_width(self):
+        return confidence_half_width(self.kept)
+
+    @property
+    def relative_ci(self):
+        """平均値に対する信頼区間の半分の幅の比率です。"""
+        half_width, mean = self.ci_half_width, self.mean
+        if half_width is None or not mean:
+            return None
+        return half_width / mean
+
+    def to_dict(self):
+        kept = self.kept
+        return {
+            "name": self.name,
+            "warmup": self.warmup,
+            "runs": self.runs,
+            "outliers": len(self.timings) - len(kept),
+            "min": min(kept) if kept else None,
+            "median": percentile(kept, 50),
+            "mean": self.mean,
+            "p95": percentile(kept, 95),
+            "p99": percentile(kept, 99),
+            "stdev": self.stdev,
+            "ci_half_width": self.ci_half_width,
+            "total": sum(self.timings),
+            "timed_out": self.timed_out,
+            "error": self.error,
+            "timings": list(self.timings),
+            "metrics": {key: self.metric(key) for key in self.metric_keys} if self.samples else {},
+            "peak_memory": self.peak_memory,
+        }
+
+
+def run_adaptive(name, measure, warmup=1, min_runs=5, max_runs=30, target_relative_ci=0.05, timeout=None,
+                 clock=time.perf_counter, metric_keys=METRIC_KEYS):
+    """
+    measure() を繰り返し実行し、BenchmarkResult を返します。measure() は1回の実行時間（秒）、または
+    "seconds" と metric_keys の測定値を持つ辞書を返す関数です。
+
+    最初の warmup 回は集計から除外します。min_runs 回以上実行した後は、外れ値を除いた平均値の95%信頼区間の
+    半分の幅が平均値の target_relative_ci 倍以下になった時点、または max_runs 回に達した時点で終了します。
+    timeout（秒）を指定すると、ウォームアップを含む合計時間がそれを超えた時点で打ち切り、timed_out を設定します。
+    measure() が例外を送出した場合は、その時点までの結果と error を返します。
+    metric_keys は measure() が辞書を返す場合に中央値を集計する項目です。
+    """
+    result = BenchmarkResult(name, warmup, metric_keys)
+    start = clock()
+
+    def over_budget():
+        return timeout is not None and clock() - start >= timeout
+
+    try:
+        for _ in range(warmup):
+            measure()
+            if over_budget():
+                result.timed_out = True
+                return result
+        while len(result.timings) < max_runs:
+            value = measure()
+            if isinstance(value, dict):
+                result.samples.append(value)
+                value = value["seconds"]
+            result.timings.append(value)
+            if len(result.timings) >= min_runs:
+                relative_ci = result.relative_ci
+                if relative_ci is not None and relative_ci <= target_relative_ci:
+                    break
+            if over_budget():
+                result.timed_out = len(result.timings) < max_runs
+                return result
+    except Exception as e:
+        result.error = str(e)
+    return result
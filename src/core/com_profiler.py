@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Accessの自動化で行われるCOM呼び出しを計測するためのプロキシです。
+
+access_application が返すアプリケーションオブジェクトをプロキシで包み、
+メソッド呼び出し・プロパティの取得/設定・コレクションの列挙をオブジェクトとメンバーの名前ごとに
+回数と時間で集計します。計測が無効な場合はプロキシを作成しないため、オーバーヘッドはありません。
+
+オブジェクトは Application からのアクセス経路（例: Application.CurrentProject.AllForms[]）で識別されます。
+"""
+import time
+import types
+import datetime
+import threading
+
+# これらの型の値はCOMオブジェクトではないため、プロキシで包まない
+_PLAIN_TYPES = (str, bytes, int, float, bool, complex, type(None), tuple, list, dict, datetime.datetime, datetime.date)
+
+
+class CallStats:
+    __slots__ = ("count", "seconds", "max_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+
+
+class ComProfiler:
+    """(オブジェクト, メンバー) ごとのCOM呼び出しの回数と時間を集計します。"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def wrap(self, target, label="Application"):
+        return ProfiledObject(target, self, label)
+
+    def record(self, owner, member, elapsed):
+        with self._lock:
+            stats = self.stats.get((owner, member))
+            if stats is None:
+                stats = self.stats[(owner, member)] = CallStats()
+            stats.add(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    @property
+    def total_calls(self):
+        return sum(stats.count for stats in self.stats.values())
+
+    @property
+    def total_seconds(self):
+        return sum(stats.seconds for stats in self.stats.values())
+
+    def slowest_calls(self, limit=None):
+        """合計時間の長い順に {"object", "member", "count", "seconds", "max_seconds"} のリストを返します。"""
+        rows = [
+            {"object": owner, "member": member, "count": stats.count,
+             "seconds": stats.seconds, "max_seconds": stats.max_seconds}
+            for (owner, member), stats in self.stats.items()
+        ]
+        rows.sort(key=lambda row: row["seconds"], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def slowest_objects(self, limit=None):
+        """オブジェクトごとの合計を、合計時間の長い順に {"object", "count", "seconds"} のリストで返します。"""
+        totals = {}
+        for (owner, _), stats in self.stats.items():
+            total = totals.setdefault(owner, {"object": owner, "count": 0, "seconds": 0.0})
+            total["count"] += stats.count
+            total["seconds"] += stats.seconds
+        rows = sorted(totals.values(), key=lambda row: row["seconds"], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def to_dict(self):
+        return {
+            "total_calls": self.total_calls,
+            "total_seconds": self.total_seconds,
+            "objects": self.slowest_objects(),
+            "calls": self.slowest_calls(),
+        }
+
+
+def _unwrap(value):
+    return object.__getattribute__(value, "_target") if isinstance(value, ProfiledObject) else value
+
+
+class ProfiledObject:
+    """COMオブジェクトへのアクセスを計測し、戻り値のCOMオブジェクトも同様に包むプロキシです。"""
+
+    __slots__ = ("_target", "_profiler", "_label", "_owner", "_member")
+
+    def __init__(self, target, profiler, label, owner=None, member=None):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_profiler", profiler)
+        object.__setattr__(self, "_label", label)
+        object.__setattr__(self, "_owner", owner)
+        object.__setattr__(self, "_member", member)
+
+    def _wrap(self, value, label, owner=None, member=None):
+        if isinstance(value, _PLAIN_TYPES):
+            return value
+        return ProfiledObject(value, object.__getattribute__(self, "_profiler"), label, owner, member)
+
+    def __getattr__(self, name):
+        target = object.__getattribute__(self, "_target")
+        label = object.__getattribute__(self, "_label")
+        profiler = object.__getattribute__(self, "_profiler")
+        start = profiler._clock()
+        value = getattr(target, name)
+        elapsed = profiler._clock() - start
+        if isinstance(value, types.MethodType):
+            # メソッドは取得ではなく呼び出しを計測する
+            return self._wrap(value, f"{label}.{name}", label, name)
+        profiler.record(label, name, elapsed)
+        return self._wrap(value, f"{label}.{name}")
+
+    def __setattr__(self, name, value):
+        label = object.__getattribute__(self, "_label")
+        profiler = object.__getattribute__(self, "_profiler")
+        start = profiler._clock()
+        setattr(object.__getattribute__(self, "_target"), name, _unwrap(value))
+        profiler.record(label, f"{name}=", profiler._clock() - start)
+
+    def __call__(self, *args, **kwargs):
+        target = object.__getattribute__(self, "_target")
+        label = object.__getattribute__(self, "_label")
+        profiler = object.__getattribute__(self, "_profiler")
+        owner = object.__getattribute__(self, "_owner")
+        member = object.__getattribute__(self, "_member")
+        args = [_unwrap(arg) for arg in args]
+        kwargs = {key: _unwrap(value) for key, value in kwargs.items()}
+        start = profiler._clock()
+        result = target(*args, **kwargs)
+        elapsed = profiler._clock() - start
+        if owner is not None:
+            # メソッド呼び出し（例: Application.SaveAsText()）
+            profiler.record(owner, f"{member}()", elapsed)
+        else:
+            # コレクションの要素の取得（例: VBComponents("Module1")）
+            profiler.record(label, "()", elapsed)
+        return self._wrap(result, f"{label}()")
+
+    def __iter__(self):
+        label = object.__getattribute__(self, "_label")
+        profiler = object.__getattribute__(self, "_profiler")
+        iterator = iter(object.__getattribute__(self, "_target"))
+        while True:
+            start = profiler._clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                profiler.record(label, "__iter__", profiler._clock() - start)
+                return
+            profiler.record(label, "__iter__", profiler._clock() - start)
+            yield self._wrap(item, f"{label}[]")
+
+    def __bool__(self):
+        return bool(object.__getattribute__(self, "_target"))
+
+    def __repr__(self):
+        return f"<ProfiledObject {object.__getattribute__(self, '_label')}>"
+
+
+# --- プロセス全体で共有するプロファイラー（--profile-com 指定時に有効化されます） ---
+_active_profiler = None
+
+
+def enable_com_profiling():
+    global _active_profiler
+    if _active_profiler is None:
+        _active_profiler = ComProfiler()
+    return _active_profiler
+
+
+def get_com_profiler():
+    return _active_profiler
+
+
+def profile_application(app):
+    """計測が有効な場合はアプリケーションオブジェクトをプロキシで包み、無効な場合はそのまま返します。"""
+    if _active_profiler is None:
+        return app
+    return _active_profiler.wrap(app, "Application")
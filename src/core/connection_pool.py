@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import threading
+import contextlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def pool_key(db_path, readonly):
+    return os.path.normcase(os.path.abspath(db_path)), bool(readonly)
+
+
+class PooledConnection:
+    def __init__(self, conn, now):
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+        self.discard = False
+
+
+class ConnectionPool:
+    """
+    データベースのパスと読み取り専用かどうかの組ごとに、ODBC接続を保持して再利用します。
+
+    connect(db_path, readonly) は新しい接続を返す関数です。同じ組の接続は max_size 個までで、
+    全て使用中の場合は返却されるまで待機します。取得時には validate(接続) で接続を検証し、
+    使用できない接続や idle_timeout 秒以上使われていない接続は閉じてから作り直します。
+    返却時にはロールバックして、未確定の変更が次の利用者に残らないようにします。
+    """
+
+    def __init__(self, connect, max_size=4, idle_timeout=300, validate=None, clock=time.monotonic):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._validate = validate or validate_connection
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._idle = {}
+        self._in_use = {}
+        self.opens = 0
+        self.reuses = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.discarded = 0
+
+    def holds(self, db_path):
+        path = pool_key(db_path, False)[0]
+        with self._condition:
+            return any(self._idle.get(key) or self._in_use.get(key)
+                       for key in set(self._idle) | set(self._in_use) if key[0] == path)
+
+    def _close(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception as e:
+            logger.debug(f"ODBC接続のクローズに失敗しました: {e}")
+
+    def evict_idle(self):
+        """idle_timeout を超えて使われていない接続を閉じ、閉じた件数を返します。"""
+        now = self._clock()
+        expired = []
+        with self._condition:
+            for key, idle in self._idle.items():
+                expired.extend(pooled for pooled in idle if now - pooled.last_used > self.idle_timeout)
+                idle[:] = [pooled for pooled in idle if now - pooled.last_used <= self.idle_timeout]
+            if expired:
+                self._condition.notify_all()
+        for pooled in expired:
+            self._close(pooled)
+        return len(expired)
+
+    def _acquire(self, db_path, readonly):
+        key = pool_key(db_path, readonly)
+        self.evict_idle()
+        with self._condition:
+            start = self._clock()
+            waited = False
+            while not self._idle.get(key) and self._in_use.get(key, 0) >= self.max_size:
+                waited = True
+                self._condition.wait()
+            if waited:
+                self.waits += 1
+                self.wait_seconds += self._clock() - start
+            pooled = self._idle[key].pop() if self._idle.get(key) else None
+            # 接続の作成中に上限を超えないよう、先に使用中として数える
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+        try:
+            if pooled is not None and not self._validate(pooled.conn):
+                logger.warning(f"使用できないODBC接続を破棄しました: {db_path}")
+                self.discarded += 1
+                self._close(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = PooledConnection(self._connect(db_path, readonly), self._clock())
+                with self._condition:
+                    self.opens += 1
+                logger.debug(f"ODBC接続を作成しました: {db_path} (読み取り専用: {readonly})")
+            else:
+                with self._condition:
+                    self.reuses += 1
+        except BaseException:
+            with self._condition:
+                self._in_use[key] -= 1
+                self._condition.notify_all()
+            raise
+        return key, pooled
+
+    def _release(self, key, pooled):
+        try:
+            pooled.conn.rollback()
+        except Exception as e:
+            logger.debug(f"ODBC接続のロールバックに失敗したため破棄します: {e}")
+            pooled.discard = True
+        pooled.last_used = self._clock()
+        with self._condition:
+            self._in_use[key] -= 1
+            if not pooled.discard:
+                self._idle.setdefault(key, []).append(pooled)
+            self._condition.notify_all()
+        if pooled.discard:
+            self._close(pooled)
+
+    @contextlib.contextmanager
+    def connection(self, db_path, readonly=False):
+        key, pooled = self._acquire(db_path, readonly)
+        try:
+            yield pooled.conn
+        except BaseException:
+            # エラーが発生した接続は状態が不明なため再利用しない
+            pooled.discard = True
+            raise
+        finally:
+            self._release(key, pooled)
+
+    def close(self, db_path):
+        """指定したデータベースの待機中の接続を閉じます（ファイルをコピー・削除する前に使用します）。"""
+        path = pool_key(db_path, False)[0]
+        with self._condition:
+            closed = []
+            for key in [key for key in self._idle if key[0] == path]:
+                closed.extend(self._idle.pop(key))
+        for pooled in closed:
+            self._close(pooled)
+        return len(closed)
+
+    def close_all(self):
+        with self._condition:
+            closed = [pooled for idle in self._idle.values() for pooled in idle]
+            self._idle.clear()
+        for pooled in closed:
+            self._close(pooled)
+        return len(closed)
+
+    def summary(self):
+        return (f"ODBC接続プール: 新規接続 {self.opens}件 / 再利用 {self.reuses}件 / "
+                f"待機 {self.waits}回 ({self.wait_seconds:.2f}秒) / 破棄 {self.discarded}件")
+
+
+def validate_connection(conn):
+    """接続が使用できるかどうかを、カタログの問い合わせで確認します。"""
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.tables(tableType="TABLE").fetchone()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+# --- プロセス全体で共有する接続プール（コマンドの実行時に有効化されます） ---
+_active_pool = None
+
+
+def enable_connection_pool(connect, max_size=4, idle_timeout=300):
+    global _active_pool
+    if _active_pool is None:
+        _active_pool = ConnectionPool(connect, max_size=max_size, idle_timeout=idle_timeout)
+    return _active_pool
+
+
+def get_connection_pool():
+    return _active_pool
+
+
+def is_held_by_connection_pool(db_path):
+    return _active_pool is not None and _active_pool.holds(db_path)
+
+
+def release_pooled_connections(db_path):
+    if _active_pool is not None:
+        _active_pool.close(db_path)
+
+
+def shutdown_connection_pool():
+    global _active_pool
+    pool, _active_pool = _active_pool, None
+    if pool is not None:
+        pool.close_all()
+        logger.debug(pool.summary())
+    return pool
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+テーブルのデータを、検索条件をSQLに渡して検索するモジュールです。
+
+cursor.columns() で各テーブルのテキスト型/メモ型の列を調べ、それらの列だけを対象に
+LIKE 条件を WHERE 句に組み立てるため、一致しない行や数値・日付・OLEの列はデータベースから読み込まれません。
+一致した行は fetchmany で少しずつ読み込み、複数のテーブルを別々の接続で並行して検索します。
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.db_operations import db_connection, get_table_names, get_table_columns, get_primary_key_columns
+
+logger = logging.getLogger(__name__)
+
+# テキストとして検索する列のデータ型（SQL_CHAR, SQL_VARCHAR, SQL_LONGVARCHAR, SQL_WCHAR, SQL_WVARCHAR, SQL_WLONGVARCHAR）
+TEXT_DATA_TYPES = {1, 12, -1, -8, -9, -10}
+
+# 検索結果に表示する値の最大文字数
+MAX_CONTENT_LENGTH = 200
+
+
+def escape_like(literal):
+    """LIKE のワイルドカード（%, _, [）を、Accessの文字クラス表記でエスケープします。"""
+    return "".join(f"[{char}]" if char in "%_[" else char for char in literal)
+
+
+def build_search_sql(table, columns, key_columns, literals=None):
+    """
+    テキスト列に対する LIKE 条件の検索SQLとパラメーターを返します。
+
+    literals が None の場合（正規表現での検索など）は WHERE 句を付けず、テキスト列とキー列のみを読み込みます。
+    """
+    selected = list(key_columns) + [column for column in columns if column not in key_columns]
+    sql = f"SELECT {', '.join(f'[{column}]' for column in selected)} FROM [{table}]"
+    params = []
+    if literals:
+        conditions = []
+        for column in columns:
+            for literal in literals:
+                conditions.append(f"[{column}] LIKE ?")
+                params.append(f"%{escape_like(literal)}%")
+        sql += " WHERE " + " OR ".join(conditions)
+    return sql, params
+
+
+def _shorten(value):
+    value = value.replace("\r", " ").replace("\n", " ")
+    return value if len(value) <= MAX_CONTENT_LENGTH else value[:MAX_CONTENT_LENGTH] + "..."
+
+
+class TableDataSearch:
+    """
+    複数のテーブルのデータを、スレッドごとの接続で並行して検索します。
+
+    open_connection() は接続を開くコンテキストマネージャーを返す関数で、テーブルごとに呼び出されます
+    （接続プールが有効な場合は、スレッド間で接続が再利用されます）。
+    literals はSQLに渡すリテラルのキーワードで、None の場合は行を読み込んでから matcher で絞り込みます。
+    いずれの場合も、一致した値は matcher で確認してから返します。
+    """
+
+    def __init__(self, open_connection, matcher, literals=None, workers=4, batch_size=1000):
+        self.open_connection = open_connection
+        self.matcher = matcher
+        self.literals = literals
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+
+    def text_columns(self, conn, table):
+        return [name for name, data_type in get_table_columns(conn, table) if data_type in TEXT_DATA_TYPES]
+
+    def key_columns(self, conn, table):
+        return get_primary_key_columns(conn, table)
+
+    def search_table(self, table):
+        """1つのテーブルを検索し、一致した値の検索結果のリストを返します。"""
+        with self.open_connection() as conn:
+            return self._search_table(conn, table)
+
+    def _search_table(self, conn, table):
+        columns = self.text_columns(conn, table)
+        if not columns:
+            return []
+        key_columns = self.key_columns(conn, table)
+        sql, params = build_search_sql(table, columns, key_columns, self.literals)
+        selected = list(key_columns) + [column for column in columns if column not in key_columns]
+        text_indexes = [selected.index(column) for column in columns]
+        results = []
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            row_num = 0
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    row_num += 1
+                    key = ", ".join(f"{column}={row[i]}" for i, column in enumerate(key_columns))
+                    for index in text_indexes:
+                        value = row[index]
+                        if isinstance(value, str) and self.matcher.search(value):
+                            results.append({
+                                "type": "Table Data",
+                                "name": table,
+                                "line_num": None if key_columns else row_num,
+                                "column_name": selected[index],
+                                "line_content": f"{key}: {_shorten(value)}" if key else _shorten(value),
+                            })
+        finally:
+            cursor.close()
+        return results
+
+    def iter_search(self, tables):
+        """テーブル名と各テーブルのデータを検索し、結果を tables の順に返します。"""
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="data-search")
+        try:
+            futures = [(table, executor.submit(self.search_table, table)) for table in tables]
+            for table, future in futures:
+                if self.matcher.search(table):
+                    yield {"type": "Table Name", "name": table, "line_num": None, "column_name": None, "line_content": table}
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    logger.warning(f"テーブル '{table}' の検索中にエラーが発生しました: {e}")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_search_database(db_path, matcher, literals=None, workers=4):
+    """Accessファイルの全てのテーブルのデータを検索し、結果を順に返します。"""
+    with db_connection(db_path, readonly=True) as conn:
+        tables = get_table_names(conn)
+    search = TableDataSearch(lambda: db_connection(db_path, readonly=True), matcher, literals, workers)
+    yield from search.iter_search(tables)
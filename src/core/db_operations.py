@@ -1,19 +1,33 @@
 # -*- coding: utf-8 -*-
-import pyodbc
 import contextlib
 import time
-from rich.console import Console
 import os
-from src.utils import is_file_locked
+from src.utils import is_locked_by_others
+from src.core.session_pool import is_held_by_session_pool
+from src.core.connection_pool import enable_connection_pool, get_connection_pool, is_held_by_connection_pool
 
-console = Console()
+def open_odbc_connection(db_path, readonly=False):
+    import pyodbc
+    conn_str = f'DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={db_path};'
+    if readonly:
+        conn_str += 'ReadOnly=1;'
+    return pyodbc.connect(conn_str)
+
+def start_connection_pool(max_size=4, idle_timeout=300):
+    return enable_connection_pool(open_odbc_connection, max_size=max_size, idle_timeout=idle_timeout)
 
 @contextlib.contextmanager
-def db_connection(db_path):
-    if is_file_locked(db_path):
+def db_connection(db_path, readonly=False):
+    # 対話モードで保持しているAccessセッションや、接続プールの接続がある場合は、他のコンピューターのロックのみを確認する
+    if is_locked_by_others(db_path, is_held_by_session_pool(db_path) or is_held_by_connection_pool(db_path)):
         raise IOError("対象のAccessファイルが開かれているため、処理を中断しました。ファイルを閉じてから再実行してください。")
-    conn_str = f'DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={db_path};'
-    conn = pyodbc.connect(conn_str)
+    pool = get_connection_pool()
+    if pool is not None:
+        # 接続プールが有効な場合は、同じデータベースの接続を再利用する
+        with pool.connection(db_path, readonly) as conn:
+            yield conn
+        return
+    conn = open_odbc_connection(db_path, readonly)
     try:
         yield conn
     finally:
@@ -27,41 +41,157 @@ def get_table_data(conn, table_name):
     cursor.execute(f"SELECT * FROM [{table_name}]")
     return {tuple(row) for row in cursor.fetchall()}
 
-def run_benchmark(conn, query_name, runs):
-    timings = []
+def get_table_columns(conn, table_name):
+    """テーブルの列を (列名, ODBCデータ型) のリストで、定義順に返します。"""
+    rows = conn.cursor().columns(table=table_name).fetchall()
+    rows.sort(key=lambda row: row.ordinal_position)
+    return [(row.column_name, row.data_type) for row in rows]
+
+def get_primary_key_columns(conn, table_name):
+    """主キーの列名のリストを返します。主キーがない場合や取得できない場合は空のリストを返します。"""
+    import pyodbc
+    try:
+        rows = conn.cursor().statistics(table_name, unique=True).fetchall()
+    except pyodbc.Error:
+        return []
+    # Accessでは主キーのインデックス名は PrimaryKey になる
+    keys = [row for row in rows if row.index_name and row.index_name.lower() == "primarykey"]
+    keys.sort(key=lambda row: row.ordinal_position)
+    return [row.column_name for row in keys]
+
+def get_table_indexes(conn, table_name):
+    """テーブルのインデックスを {インデックス名: [列名（順序どおり）]} で返します。取得できない場合は空の辞書を返します。"""
+    import pyodbc
+    try:
+        rows = conn.cursor().statistics(table_name).fetchall()
+    except pyodbc.Error:
+        return {}
+    indexes = {}
+    # index_name が None の行はテーブルの統計情報（SQL_TABLE_STAT）
+    for row in sorted((row for row in rows if row.index_name and row.column_name), key=lambda row: row.ordinal_position):
+        indexes.setdefault(row.index_name, []).append(row.column_name)
+    return indexes
+
+def get_table_row_count(conn, table_name):
     cursor = conn.cursor()
-    for _ in range(runs):
-        start = time.perf_counter()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM [{table_name}]")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def iter_table_rows(conn, table_name, columns, order_by=None, batch_size=5000):
+    """テーブルの行を fetchmany で batch_size 行ずつ読み込み、タプルとして1行ずつ返します。"""
+    cursor = conn.cursor()
+    sql = f"SELECT {', '.join(f'[{column}]' for column in columns)} FROM [{table_name}]"
+    if order_by:
+        sql += f" ORDER BY {', '.join(f'[{column}]' for column in order_by)}"
+    cursor.execute(sql)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield tuple(row)
+    finally:
+        cursor.close()
+
+def run_query(conn, query_name, batch_size=1000):
+    """クエリを実行し、行を保持せずに fetchmany で全て読み込んで、行数を返します。"""
+    cursor = conn.cursor()
+    try:
         cursor.execute(f"SELECT * FROM [{query_name}]")
-        cursor.fetchall()
-        end = time.perf_counter()
-        timings.append(end - start)
-    return timings
-
-def search_in_tables(conn, pattern):
-    results = []
-    table_names = get_table_names(conn)
-    for table_name in table_names:
-        if pattern.lower() in table_name.lower():
-            results.append({
-                "type": "Table Name", "name": table_name,
-                "line_num": None, "column_name": None, "line_content": table_name
-            })
-        try:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM [{table_name}]")
-            columns = [column[0] for column in cursor.description]
-            for row_num, row in enumerate(cursor.fetchall(), 1):
-                for col_num, cell_value in enumerate(row):
-                    if isinstance(cell_value, str) and pattern.lower() in cell_value.lower():
-                        results.append({
-                            "type": "Table Data",
-                            "name": table_name,
-                            "line_num": row_num,
-                            "column_name": columns[col_num],
-                            "line_content": str(row)
-                        })
-        except pyodbc.Error as e:
-            console.print(f"[yellow]警告: テーブル '{table_name}' の読み取り中にエラーが発生しました: {e}[/yellow]")
+        count = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return count
+            count += len(rows)
+    finally:
+        cursor.close()
+
+def approximate_row_bytes(row):
+    """行の値の転送量のおおよそのバイト数を返します（文字列はUTF-16、数値と日付は固定長として数えます）。"""
+    size = 0
+    for value in row:
+        if value is None:
             continue
-    return results
+        if isinstance(value, str):
+            size += len(value) * 2
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            size += len(value)
+        elif isinstance(value, bool):
+            size += 2
+        elif isinstance(value, (int, float)):
+            size += 8
+        else:
+            size += 16
+    return size
+
+def query_call_sql(query_name, param_count=0):
+    """保存済みクエリを ODBC の CALL 構文で実行するSQLを返します（パラメータークエリやアクションクエリに使用します）。"""
+    placeholders = f"({', '.join('?' * param_count)})" if param_count else ""
+    return f"{{CALL [{query_name}]{placeholders}}}"
+
+def measure_query(conn, query_name, batch_size=1000, clock=time.perf_counter, params=None, call=False):
+    """
+    クエリを1回実行し、実行と読み込みの内訳を返します（内訳は measure_statement を参照してください）。
+
+    params（パラメーターの値のタプル）を指定した場合や call が True の場合は、CALL 構文で実行します。
+    """
+    if params is not None or call:
+        sql = query_call_sql(query_name, len(params or ()))
+    else:
+        sql = f"SELECT * FROM [{query_name}]"
+    return measure_statement(conn, sql, params, batch_size, clock)
+
+def measure_statement(conn, sql, params=None, batch_size=1000, clock=time.perf_counter):
+    """
+    SQLを1回実行し、実行と読み込みの内訳を返します。
+
+    結果セットを返さないアクションクエリ（追加・更新・削除）は、影響を受けた行数を記録します。
+    行は fetchmany で batch_size 行ずつ読み込み、保持せずに破棄します。転送量は各バッチの先頭行のサイズから見積もります。
+    戻り値は {"seconds", "execute_seconds", "first_row_seconds", "fetch_seconds", "rows", "rows_per_second", "bytes",
+    "affected_rows", "affected_rows_per_second"} です。
+    """
+    cursor = conn.cursor()
+    try:
+        start = clock()
+        if params:
+            cursor.execute(sql, tuple(params))
+        else:
+            cursor.execute(sql)
+        executed = clock()
+        first_row = None
+        rows = 0
+        size = 0
+        affected = 0
+        if cursor.description is None:
+            # アクションクエリは結果セットを返さない
+            first_row = executed
+            affected = max(cursor.rowcount, 0)
+        else:
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if first_row is None:
+                    first_row = clock()
+                if not batch:
+                    break
+                rows += len(batch)
+                size += approximate_row_bytes(batch[0]) * len(batch)
+        end = clock()
+    finally:
+        cursor.close()
+    fetch_seconds = end - executed
+    return {
+        "seconds": end - start,
+        "execute_seconds": executed - start,
+        "first_row_seconds": first_row - start,
+        "fetch_seconds": fetch_seconds,
+        "rows": rows,
+        "rows_per_second": rows / fetch_seconds if fetch_seconds > 0 else 0.0,
+        "bytes": size,
+        "affected_rows": affected,
+        "affected_rows_per_second": affected / (end - start) if end > start else 0.0,
+    }
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import hashlib
+import logging
+import contextlib
+import collections
+
+from src.constants import EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES, EXPORT_CACHE_MAX_AGE_DAYS
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR_NAME = "index"
+BLOB_DIR_NAME = "blobs"
+# 索引から参照されていない本体を削除するまでの猶予（他のプロセスが索引を保存する前の本体を残すため）
+GARBAGE_GRACE_SECONDS = 60 * 60
+# 索引の書き込み中に作成するロックファイル。異常終了で残った古いロックファイルは削除して取得し直す
+INDEX_LOCK_NAME = "index.lock"
+INDEX_LOCK_STALE_SECONDS = 60
+INDEX_LOCK_POLL_SECONDS = 0.05
+
+
+def database_identity(db_path):
+    """データベースファイルのパスから、キャッシュのキーに使う識別子を作成します。"""
+    normalized = os.path.normcase(os.path.abspath(db_path))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExportCache:
+    """
+    SaveAsText の出力をディスクに保存し、変更されていないオブジェクトの再エクスポートを省略するキャッシュです。
+
+    エントリはデータベース識別子、オブジェクト種類、名前、DateModified をキーとし、
+    テキスト本体は内容のハッシュ値ごとに一度だけ保存されます（同じ内容は複数のデータベースで共有されます）。
+    max_bytes と max_age_days は、全てのデータベースで共有する本体の保存領域全体に適用されます。
+    """
+
+    def __init__(self, cache_dir, db_path, max_bytes=512 * 1024 * 1024, max_age_days=30):
+        self.cache_dir = cache_dir
+        self.db_id = database_identity(db_path)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.hits = 0
+        self.misses = 0
+        self._index_dir = os.path.join(cache_dir, INDEX_DIR_NAME)
+        self._blob_dir = os.path.join(cache_dir, BLOB_DIR_NAME)
+        self._index_path = os.path.join(self._index_dir, f"{self.db_id}.json")
+        self._entries = self._load_index(self._index_path)
+        self._released_hashes = set()
+        self._foreign_removals = {}
+
+    @staticmethod
+    def _load_index(index_path):
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"エクスポートキャッシュの索引を読み込めませんでした。キャッシュを作り直します: {index_path} - {e}")
+            return {}
+
+    @staticmethod
+    def _entry_key(category, name):
+        return f"{category}/{name}"
+
+    def _blob_path(self, digest):
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    def contains(self, category, name, date_modified):
+        """ヒット/ミスの件数を変えずに、キャッシュに有効なエントリがあるかを確認します。"""
+        entry = self._entries.get(self._entry_key(category, name))
+        return (date_modified is not None and entry is not None and entry["modified"] == str(date_modified)
+                and os.path.exists(self._blob_path(entry["hash"])))
+
+    def get(self, category, name, date_modified):
+        """キャッシュされたエクスポート内容（bytes）を返します。存在しないか古い場合は None を返します。"""
+        if date_modified is None:
+            self.misses += 1
+            return None
+        entry = self._entries.get(self._entry_key(category, name))
+        if entry and entry["modified"] == str(date_modified):
+            try:
+                with open(self._blob_path(entry["hash"]), "rb") as f:
+                    data = f.read()
+                entry["accessed"] = time.time()
+                self.hits += 1
+                return data
+            except OSError:
+                logger.debug(f"キャッシュ本体が見つかりません: {category}/{name}")
+        self.misses += 1
+        return None
+
+    def put(self, category, name, date_modified, data):
+        """エクスポート内容をキャッシュに登録し、内容のハッシュ値を返します。"""
+        digest = content_hash(data)
+        if date_modified is None:
+            return digest
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = blob_path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, blob_path)
+        previous = self._entries.get(self._entry_key(category, name))
+        if previous and previous["hash"] != digest:
+            self._released_hashes.add(previous["hash"])
+        self._entries[self._entry_key(category, name)] = {
+            "modified": str(date_modified),
+            "hash": digest,
+            "size": len(data),
+            "accessed": time.time(),
+        }
+        return digest
+
+    def _index_paths(self):
+        if not os.path.isdir(self._index_dir):
+            return []
+        return [os.path.join(self._index_dir, filename) for filename in os.listdir(self._index_dir) if filename.endswith(".json")]
+
+    def evict(self, now=None):
+        """
+        全てのデータベースの索引を対象に、期限切れのエントリを削除し、本体の合計サイズが上限を超える場合は古い順に削除します。
+
+        本体は複数のデータベースで共有されるため、サイズは内容のハッシュ値ごとに1回だけ数えます。
+        他のデータベースの索引から削除するエントリは記録しておき、save() で索引を読み込み直してから削除します。
+        """
+        now = now or time.time()
+        indexes = {path: self._load_index(path) for path in self._index_paths() if path != self._index_path}
+        indexes[self._index_path] = self._entries
+        removed = 0
+
+        def remove(path, key):
+            entry = indexes[path].pop(key)
+            self._released_hashes.add(entry["hash"])
+            if path != self._index_path:
+                self._foreign_removals.setdefault(path, {})[key] = entry
+
+        for path, entries in indexes.items():
+            for key, entry in list(entries.items()):
+                if now - entry["accessed"] > self.max_age_seconds:
+                    remove(path, key)
+                    removed += 1
+
+        references = collections.Counter()
+        sizes = {}
+        for entries in indexes.values():
+            for entry in entries.values():
+                references[entry["hash"]] += 1
+                sizes[entry["hash"]] = entry["size"]
+        total_size = sum(sizes.values())
+        candidates = sorted((entry["accessed"], path, key) for path, entries in indexes.items() for key, entry in entries.items())
+        for _, path, key in candidates:
+            if total_size <= self.max_bytes:
+                break
+            digest = indexes[path][key]["hash"]
+            remove(path, key)
+            removed += 1
+            references[digest] -= 1
+            if references[digest] == 0:
+                total_size -= sizes[digest]
+        return removed
+
+    def _apply_foreign_removals(self):
+        # 他のプロセスが evict() の後に索引を保存している場合があるため、最新の索引を読み込み直し、
+        # 削除すると決めた時点から変わっていないエントリのみを削除する
+        for path, removals in self._foreign_removals.items():
+            entries = self._load_index(path)
+            changed = False
+            for key, entry in removals.items():
+                current = entries.get(key)
+                if current is not None and current["hash"] == entry["hash"] and current["modified"] == entry["modified"]:
+                    del entries[key]
+                    changed = True
+            if changed:
+                self._write_index(path, entries)
+        self._foreign_removals.clear()
+
+    def _collect_garbage(self, now=None):
+        # どの索引からも参照されていない本体を削除する。他のプロセスが put() してから索引を保存するまでの間の本体を
+        # 消さないよう、このインスタンスが参照しなくなったもの以外は一定時間経過したものに限る
+        now = now or time.time()
+        referenced = {entry["hash"] for entry in self._entries.values()}
+        for path in self._index_paths():
+            if path != self._index_path:
+                referenced.update(entry["hash"] for entry in self._load_index(path).values())
+        if not os.path.isdir(self._blob_dir):
+            return
+        for dirpath, _, filenames in os.walk(self._blob_dir):
+            for filename in filenames:
+                digest = filename[:-len(".tmp")] if filename.endswith(".tmp") else filename
+                if digest in referenced and filename == digest:
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    released = filename == digest and digest in self._released_hashes
+                    if released or now - os.path.getmtime(path) > GARBAGE_GRACE_SECONDS:
+                        os.remove(path)
+                except OSError as e:
+                    logger.debug(f"キャッシュ本体の削除に失敗しました: {filename} - {e}")
+        self._released_hashes.clear()
+
+    @contextlib.contextmanager
+    def _index_lock(self):
+        """全てのデータベースの索引の読み込み直し・書き込みと本体の削除を、プロセス間で排他的に行います。"""
+        os.makedirs(self._index_dir, exist_ok=True)
+        lock_path = os.path.join(self.cache_dir, INDEX_LOCK_NAME)
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > INDEX_LOCK_STALE_SECONDS:
+                        logger.warning(f"古いエクスポートキャッシュのロックファイルを削除します: {lock_path}")
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(INDEX_LOCK_POLL_SECONDS)
+        try:
+            os.close(fd)
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError as e:
+                logger.debug(f"エクスポートキャッシュのロックファイルを削除できませんでした: {e}")
+
+    @staticmethod
+    def _write_index(index_path, entries):
+        temp_path = index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": entries}, f, ensure_ascii=False)
+        os.replace(temp_path, index_path)
+
+    def save(self):
+        """
+        エビクションを行い、索引をディスクに書き込んで、参照されなくなった本体を削除します。
+
+        同じキャッシュディレクトリを使用する他のプロセスと同時に索引を書き換えないよう、ロックファイルを保持して行います。
+        """
+        with self._index_lock():
+            self.evict()
+            self._write_index(self._index_path, self._entries)
+            self._apply_foreign_removals()
+            self._collect_garbage()
+
+    def summary(self):
+        return f"エクスポートキャッシュ: ヒット {self.hits}件 / ミス {self.misses}件"
+
+
+def open_export_cache(db_path, enabled=True):
+    """コマンドから使用する既定の設定のキャッシュを返します。無効な場合は None を返します。"""
+    if not enabled:
+        return None
+    return ExportCache(EXPORT_CACHE_DIR, db_path, EXPORT_CACHE_MAX_BYTES, EXPORT_CACHE_MAX_AGE_DAYS)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import hashlib
+import logging
+
+from src.constants import OBJECT_IMPORT_ORDER
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = ".export_manifest.json"
+
+
+def file_hash(file_path, block_size=65536):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _database_key(db_path):
+    return os.path.normcase(os.path.abspath(db_path))
+
+
+def _file_state(file_path):
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class ExportManifest:
+    """
+    エクスポート先ディレクトリに保存する、オブジェクトごとの DateModified と内容のハッシュ値の記録です。
+
+    エントリはファイル名をキーとし、種類、名前、DateModified、ハッシュ値、ファイルのサイズと更新日時、
+    エクスポートに要した時間（秒）を保持します。
+    また、load でインポートしたファイルのハッシュ値とインポート後の DateModified をインポート先ごとに記録します。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE_NAME)
+        self.database = None
+        self.entries = {}
+        self.loaded = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.database = data.get("database")
+                self.entries = data.get("entries", {})
+                self.loaded = data.get("loaded", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"マニフェストを読み込めませんでした。全てのオブジェクトを対象とします: {self.path} - {e}")
+
+    def is_unchanged(self, filename):
+        """ファイルがマニフェストに記録された内容から変更されていない場合に True を返します。"""
+        entry = self.entries.get(filename)
+        file_path = os.path.join(self.directory, filename)
+        if entry is None or not os.path.exists(file_path):
+            return False
+        # サイズと更新日時が記録と同じであれば、ハッシュ値の計算を省略する
+        if entry.get("file_state") == _file_state(file_path):
+            return True
+        return file_hash(file_path) == entry["hash"]
+
+    def record(self, filename, category, name, date_modified, digest=None, seconds=None):
+        file_path = os.path.join(self.directory, filename)
+        previous = self.entries.get(filename, {})
+        self.entries[filename] = {
+            "category": category,
+            "name": name,
+            "modified": None if date_modified is None else str(date_modified),
+            "hash": digest or file_hash(file_path),
+            "file_state": _file_state(file_path),
+            "seconds": previous.get("seconds") if seconds is None else seconds,
+        }
+
+    def remove(self, filename):
+        self.entries.pop(filename, None)
+
+    def load_baselines(self, database, filename):
+        """インポート先 database のオブジェクトが filename と同じ内容であることを示す (ハッシュ値, DateModified) の一覧を返します。"""
+        baselines = []
+        entry = self.entries.get(filename)
+        if entry is not None and self.database and _database_key(self.database) == _database_key(database):
+            baselines.append((entry["hash"], entry["modified"]))
+        loaded = self.loaded.get(_database_key(database), {}).get(filename)
+        if loaded is not None:
+            baselines.append((loaded["hash"], loaded["modified"]))
+        return baselines
+
+    def record_load(self, database, filename, digest, date_modified):
+        self.loaded.setdefault(_database_key(database), {})[filename] = {
+            "hash": digest,
+            "modified": None if date_modified is None else str(date_modified),
+        }
+
+    def save(self, database=None):
+        if database is not None:
+            self.database = database
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"database": self.database, "entries": self.entries, "loaded": self.loaded}, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+
+def plan_incremental_export(catalog, manifest, extensions):
+    """
+    オブジェクト一覧（(カテゴリ, 名前, DateModified) のリスト）とマニフェストを比較し、
+    (エクスポートが必要なもの, スキップできるもの, 削除されたオブジェクトのファイル名) を返します。
+
+    Accessのオブジェクト名とWindowsのファイル名は大文字小文字を区別しないため、
+    大文字小文字だけが変わった名前変更（frmA → FrmA）は削除として扱いません。
+    """
+    to_export, skipped = [], []
+    current_files = set()
+    for category, name, date_modified in catalog:
+        filename = f"{name}{extensions[category]}"
+        current_files.add(filename.casefold())
+        entry = manifest.entries.get(filename)
+        if (date_modified is not None and entry is not None and entry["modified"] == str(date_modified)
+                and manifest.is_unchanged(filename)):
+            skipped.append((category, name, date_modified))
+        else:
+            to_export.append((category, name, date_modified))
+    removed = sorted(filename for filename in manifest.entries if filename.casefold() not in current_files)
+    return to_export, skipped, removed
+
+
+def apply_incremental_export(staging_dir, manifest, exported, extensions, durations=None):
+    """
+    staging_dir にエクスポートしたファイルを、内容が変わったものだけマニフェストのディレクトリへ移動します。
+
+    exported は staging_dir にエクスポート済みの (カテゴリ, 名前, DateModified) のリストです。
+    内容が同じファイルは上書きせず（更新日時を変えず）、マニフェストの DateModified のみを更新します。
+    大文字小文字だけが異なる古いファイル名のエントリはマニフェストから取り除きます。
+    戻り値は (書き込んだファイル名のリスト, 内容が同じだったファイル名のリスト) です。
+    """
+    durations = durations or {}
+    written, identical = [], []
+    for category, name, date_modified in exported:
+        filename = f"{name}{extensions[category]}"
+        staged_path = os.path.join(staging_dir, filename)
+        target_path = os.path.join(manifest.directory, filename)
+        digest = file_hash(staged_path)
+        if os.path.exists(target_path) and file_hash(target_path) == digest:
+            os.remove(staged_path)
+            identical.append(filename)
+        else:
+            os.replace(staged_path, target_path)
+            written.append(filename)
+        for stale in [key for key in manifest.entries if key != filename and key.casefold() == filename.casefold()]:
+            # 大文字小文字を区別しないファイルシステムでは同じファイルを指すため、書き込んだファイルは削除しない
+            stale_path = os.path.join(manifest.directory, stale)
+            if os.path.exists(stale_path) and not os.path.samefile(stale_path, target_path):
+                os.remove(stale_path)
+            manifest.remove(stale)
+        manifest.record(filename, category, name, date_modified, digest, durations.get((category, name)))
+    return written, identical
+
+
+def remove_exported_files(manifest, filenames, keep=()):
+    """
+    削除されたオブジェクトのファイルを、マニフェストに記録されているものに限り削除します。
+
+    keep には同じ実行で書き込んだファイル名を渡します。大文字小文字を区別せずに一致するファイルは、
+    マニフェストのエントリのみを取り除き、ファイルは削除しません。
+    """
+    kept = {filename.casefold() for filename in keep}
+    for filename in filenames:
+        file_path = os.path.join(manifest.directory, filename)
+        if filename.casefold() not in kept and os.path.exists(file_path):
+            os.remove(file_path)
+        manifest.remove(filename)
+
+
+def estimate_saved_seconds(manifest, skipped, extensions):
+    """スキップしたオブジェクトについて、前回記録されたエクスポート時間の合計を返します。"""
+    known = [entry["seconds"] for entry in manifest.entries.values() if entry.get("seconds")]
+    fallback = sum(known) / len(known) if known else 0.0
+    total = 0.0
+    for category, name, _ in skipped:
+        entry = manifest.entries.get(f"{name}{extensions[category]}", {})
+        total += entry.get("seconds") or fallback
+    return total
+
+
+def list_exported_files(directory, extensions):
+    """
+    ディレクトリ内のエクスポートファイルを (カテゴリ, 名前, ファイル名) のリストで返します。
+
+    モジュールを参照するフォーム/レポートより先にモジュールがインポートされるよう、OBJECT_IMPORT_ORDER の順に並べます。
+    """
+    categories = {extension: category for category, extension in extensions.items()}
+    order = {category: i for i, category in enumerate(OBJECT_IMPORT_ORDER)}
+    files = []
+    for filename in os.listdir(directory):
+        name, ext = os.path.splitext(filename)
+        category = categories.get(ext)
+        if category is not None and os.path.isfile(os.path.join(directory, filename)):
+            files.append((category, name, filename))
+    files.sort(key=lambda item: (order.get(item[0], len(order)), item[1].lower()))
+    return files
+
+
+def plan_incremental_load(files, manifest, database, target_catalog):
+    """
+    インポート対象のファイルを、インポート先の現在の状態と比較して分類します。
+
+    target_catalog はインポート先の (カテゴリ, 名前, DateModified) のリストです。
+    戻り値は (インポートが必要なもの, スキップできるもの, 記録がなく内容の比較が必要なもの) で、
+    各要素は (カテゴリ, 名前, ファイル名, ハッシュ値) のタプルです。
+    インポート先に同名のオブジェクトがない場合は常にインポートします。
+    """
+    current = {(category, name.casefold()): date_modified for category, name, date_modified in target_catalog}
+    to_load, skipped, unverified = [], [], []
+    for category, name, filename in files:
+        digest = file_hash(os.path.join(manifest.directory, filename))
+        item = (category, name, filename, digest)
+        key = (category, name.casefold())
+        if key not in current or current[key] is None:
+            to_load.append(item)
+            continue
+        baselines = manifest.load_baselines(database, filename)
+        if (digest, str(current[key])) in baselines:
+            skipped.append(item)
+        elif baselines:
+            to_load.append(item)
+        else:
+            unverified.append(item)
+    return to_load, skipped, unverified
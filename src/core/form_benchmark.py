@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Accessのオートメーションでフォームを開く時間を測定するモジュールです。
+
+フォームは DoCmd.OpenForm で非表示で開き、RecordsetClone の MoveLast で全てのレコードが
+読み込まれるまでの時間を測定してから閉じます。フォームを開く時間（OpenForm）とレコードの読み込みの時間を
+分けて記録し、レコードソース（RecordSource）をODBCで単独で実行した時間と比較できるようにします。
+"""
+import re
+import time
+
+from src.core.benchmark_stats import run_adaptive
+
+# Access の定数
+AC_FORM = 2
+AC_NORMAL = 0
+AC_HIDDEN = 1
+AC_FORM_PROPERTY_SETTINGS = -1
+AC_SAVE_NO = 2
+
+# フォームの測定値のうち、中央値を集計する項目
+FORM_METRIC_KEYS = ("open_seconds", "populate_seconds", "close_seconds", "records")
+
+
+def measure_form_open(app, form_name, clock=time.perf_counter):
+    """
+    フォームを非表示で開いてレコードを全て読み込み、閉じるまでを1回測定します。
+
+    戻り値は {"seconds"（開いてからレコードを読み込むまで）, "open_seconds", "populate_seconds", "close_seconds",
+    "records", "record_source"} です。レコードソースのないフォームは records が 0 になります。
+    """
+    start = clock()
+    app.DoCmd.OpenForm(form_name, AC_NORMAL, "", "", AC_FORM_PROPERTY_SETTINGS, AC_HIDDEN)
+    try:
+        opened = clock()
+        form = app.Forms(form_name)
+        record_source = form.RecordSource or ""
+        records = 0
+        if record_source:
+            # フォームに表示される最初の画面分だけでなく、全てのレコードが読み込まれるまで待つ
+            clone = form.RecordsetClone
+            if not (clone.BOF and clone.EOF):
+                clone.MoveLast()
+            records = clone.RecordCount
+        populated = clock()
+    finally:
+        app.DoCmd.Close(AC_FORM, form_name, AC_SAVE_NO)
+    closed = clock()
+    return {
+        "seconds": populated - start,
+        "open_seconds": opened - start,
+        "populate_seconds": populated - opened,
+        "close_seconds": closed - populated,
+        "records": records,
+        "record_source": record_source,
+    }
+
+
+def benchmark_form(app, form_name, warmup=1, min_runs=5, max_runs=30, target_relative_ci=0.05, timeout=None,
+                   clock=time.perf_counter):
+    """フォームを開く時間を run_adaptive で繰り返し測定し、(BenchmarkResult, レコードソース) を返します。"""
+    info = {"record_source": None}
+
+    def measure():
+        sample = measure_form_open(app, form_name, clock)
+        info["record_source"] = sample.pop("record_source")
+        return sample
+
+    result = run_adaptive(form_name, measure, warmup=warmup, min_runs=min_runs, max_runs=max_runs,
+                          target_relative_ci=target_relative_ci, timeout=timeout, clock=clock, metric_keys=FORM_METRIC_KEYS)
+    return result, info["record_source"]
+
+
+def record_source_sql(record_source):
+    """レコードソース（テーブル名・クエリ名・SQL文）を、ODBCで実行できるSELECT文に変換します。"""
+    record_source = record_source.strip().rstrip(";").strip()
+    if re.match(r"(SELECT|TRANSFORM|PARAMETERS)\b", record_source, re.IGNORECASE):
+        return record_source
+    return f"SELECT * FROM [{record_source.strip('[]')}]"
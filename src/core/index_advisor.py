@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+保存済みクエリのSQLから、インデックスを追加すると効果がありそうな列を推定するモジュールです。
+
+SQLは簡易的に字句解析し、JOIN の ON 句・WHERE 句・ORDER BY 句で使用されている列を
+FROM/JOIN 句の別名を解決したうえで (テーブル, 列) として集計します。既存のインデックスの
+先頭列になっていない列を、使用しているクエリの数・句の種類・テーブルの行数から算出したスコアの順に提案します。
+解析と順位付けはデータベースに依存しないため、SQLの文字列だけでテストできます。
+"""
+import re
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 句の種類ごとの重み（結合条件は結合の度に参照されるため最も重くする）
+CLAUSE_WEIGHTS = {"join": 3.0, "where": 2.0, "order": 1.0}
+
+# 角括弧の名前・文字列リテラル・日付リテラル
+_LITERAL_RE = re.compile(r"\[([^\]\r\n]*)\]|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|#[^#\r\n]*#")
+_PLACEHOLDER_RE = re.compile(r"__b(\d+)__")
+_CLAUSE_RE = re.compile(
+    r"\b(SELECT|FROM|WHERE|HAVING|UNION|GROUP\s+BY|ORDER\s+BY|ON|"
+    r"(?:INNER|CROSS|(?:LEFT|RIGHT|FULL)(?:\s+OUTER)?)?\s*JOIN)\b",
+    re.IGNORECASE,
+)
+# 関数呼び出し（名前の直後の括弧）や Forms!frm!ctl 形式の参照は列として扱わない
+_QUALIFIED_RE = re.compile(r"(?<![\w.!])(\w+)\s*\.\s*(\w+)(?![\w.!]|\s*\()")
+_NAME_RE = re.compile(r"(?<![\w.!])(\w+)(?![\w.!]|\s*\()")
+_KEYWORDS = {
+    "and", "or", "not", "in", "is", "null", "like", "between", "as", "asc", "desc", "true", "false", "yes", "no",
+    "exists", "distinct", "distinctrow", "top", "percent", "all", "any", "some", "select", "by", "mod", "xor", "eqv", "imp",
+}
+# SaveAsText で出力された .qry ファイルのSQL（改行は \015\012、引用符は \" にエスケープされる）
+_QRY_SQL_RE = re.compile(r'^\s*dbMemo\s+"SQL"\s*=\s*"(.*)"\s*$', re.MULTILINE)
+_QRY_ESCAPE_RE = re.compile(r"\\(\d{3}|.)")
+
+
+def extract_sql_from_query_text(text):
+    """SaveAsText で出力されたクエリのテキストからSQLを取り出します。見つからない場合は None を返します。"""
+    match = _QRY_SQL_RE.search(text)
+    if not match:
+        return None
+    return _QRY_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8)) if m.group(1).isdigit() else m.group(1), match.group(1))
+
+
+def _mask(sql):
+    """角括弧の名前をプレースホルダーに、リテラルを ? に置き換え、(置き換えたSQL, 名前のリスト) を返します。"""
+    names = []
+
+    def replace(match):
+        if match.group(1) is None:
+            return " ? "
+        names.append(match.group(1))
+        return f"__b{len(names) - 1}__"
+
+    return _LITERAL_RE.sub(replace, sql), names
+
+
+def _segments(masked):
+    """SQLを句のキーワードで区切り、(句の種類, テキスト) を順に返します。"""
+    matches = list(_CLAUSE_RE.finditer(masked))
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(masked)
+        keyword = re.sub(r"\s+", " ", match.group(1).strip().lower())
+        kind = "join" if keyword.endswith("join") else keyword
+        yield kind, masked[match.end():end]
+
+
+def parse_query_sql(sql, table_columns=None):
+    """
+    SQLを解析し、{"tables": [テーブル名], "columns": [(テーブル名, 列名, 句の種類)]} を返します。
+
+    句の種類は "join"（ON 句）、"where"、"order" のいずれかです。テーブル名で修飾されていない列は、
+    FROM 句のテーブルが1つの場合はそのテーブルの列とみなします。複数の場合は table_columns
+    （テーブル名 -> 列名の集合）で列を持つテーブルが1つに決まる場合のみ採用します。
+    """
+    if re.match(r"\s*PARAMETERS\b", sql, re.IGNORECASE):
+        sql = sql.split(";", 1)[1] if ";" in sql else ""
+    masked, names = _mask(sql)
+    restore = lambda token: names[int(_PLACEHOLDER_RE.fullmatch(token).group(1))] if _PLACEHOLDER_RE.fullmatch(token) else token
+
+    tables, aliases, clauses = [], {}, []
+    for kind, text in _segments(masked):
+        if kind in ("from", "join"):
+            for part in text.replace("(", " ").replace(")", " ").split(","):
+                tokens = [token for token in part.split() if token.lower() != "as"]
+                if not tokens or not re.fullmatch(r"\w+", tokens[0]):
+                    continue
+                table = restore(tokens[0])
+                if table not in tables:
+                    tables.append(table)
+                aliases[table.casefold()] = table
+                if len(tokens) > 1 and re.fullmatch(r"\w+", tokens[1]):
+                    aliases[restore(tokens[1]).casefold()] = table
+        elif kind in ("on", "where", "order by"):
+            clauses.append(("join" if kind == "on" else "order" if kind == "order by" else "where", text))
+
+    lookup = {table.casefold(): {column.casefold() for column in columns} for table, columns in (table_columns or {}).items()}
+    columns = []
+
+    def add(table, column, clause):
+        entry = (table, column, clause)
+        if entry not in columns:
+            columns.append(entry)
+
+    for clause, text in clauses:
+        for qualifier, column in _QUALIFIED_RE.findall(text):
+            table = aliases.get(restore(qualifier).casefold())
+            if table is not None:
+                add(table, restore(column), clause)
+        for token in _NAME_RE.findall(_QUALIFIED_RE.sub(" ", text)):
+            column = restore(token)
+            if column.casefold() in _KEYWORDS or column[0].isdigit():
+                continue
+            if len(tables) == 1:
+                add(tables[0], column, clause)
+                continue
+            owners = [table for table in tables if column.casefold() in lookup.get(table.casefold(), ())]
+            if len(owners) == 1:
+                add(owners[0], column, clause)
+    return {"tables": tables, "columns": columns}
+
+
+def rank_index_suggestions(query_sql, existing_indexes=None, row_counts=None, table_columns=None):
+    """
+    クエリ名 -> SQL の辞書から、インデックスの候補をスコアの高い順に返します。
+
+    existing_indexes はテーブル名 -> [インデックスの列名のリスト] で、先頭列が一致する列は候補から除外します。
+    table_columns を指定した場合、そこにない列（パラメーターや演算列など）も除外します。
+    スコアは、クエリごとに使用された句の最大の重みの合計に、log2(行数 + 2) を掛けた値です。
+    戻り値は {"table", "column", "score", "rows", "queries", "clauses"} のリストです。
+    """
+    existing_indexes = existing_indexes or {}
+    row_counts = {table.casefold(): rows for table, rows in (row_counts or {}).items()}
+    known_columns = {table.casefold(): {column.casefold(): column for column in columns}
+                     for table, columns in (table_columns or {}).items()}
+    leading = {(table.casefold(), columns[0].casefold())
+               for table, indexes in existing_indexes.items() for columns in indexes if columns}
+
+    usages = {}
+    for query_name, sql in query_sql.items():
+        try:
+            parsed = parse_query_sql(sql, table_columns)
+        except Exception as e:
+            logger.warning(f"クエリ '{query_name}' のSQLを解析できませんでした: {e}")
+            continue
+        for table, column, clause in parsed["columns"]:
+            if table_columns is not None:
+                column = known_columns.get(table.casefold(), {}).get(column.casefold())
+                if column is None:
+                    continue
+            key = (table.casefold(), column.casefold())
+            if key in leading:
+                continue
+            usage = usages.setdefault(key, {"table": table, "column": column, "queries": {}, "clauses": set()})
+            usage["queries"][query_name] = max(usage["queries"].get(query_name, 0.0), CLAUSE_WEIGHTS[clause])
+            usage["clauses"].add(clause)
+
+    suggestions = []
+    for (table_key, _), usage in usages.items():
+        rows = row_counts.get(table_key)
+        score = sum(usage["queries"].values()) * math.log2((rows or 0) + 2)
+        suggestions.append({
+            "table": usage["table"],
+            "column": usage["column"],
+            "score": score,
+            "rows": rows,
+            "queries": sorted(usage["queries"]),
+            "clauses": sorted(usage["clauses"], key=list(CLAUSE_WEIGHTS).index),
+        })
+    suggestions.sort(key=lambda suggestion: (-suggestion["score"], suggestion["table"].casefold(), suggestion["column"].casefold()))
+    return suggestions
+
+
+def index_name_for(suggestion):
+    return f"advise_{suggestion['table']}_{suggestion['column']}"[:64]
+
+
+def validate_suggestion(conn, suggestion, benchmark):
+    """
+    インデックスを追加する前後で、候補を使用しているクエリの実行時間を測定し、{クエリ名: (追加前, 追加後)} を返します。
+
+    benchmark(接続, クエリ名) は実行時間（秒）を返す関数です。測定できなかったクエリは None になります。
+    追加したインデックスは測定後に削除するため、候補ごとに独立して評価されます（一時コピーに対して使用してください）。
+    """
+    def measure():
+        timings = {}
+        for query_name in suggestion["queries"]:
+            try:
+                timings[query_name] = benchmark(conn, query_name)
+            except Exception as e:
+                logger.warning(f"クエリ '{query_name}' を測定できませんでした: {e}")
+                timings[query_name] = None
+        return timings
+
+    before = measure()
+    name = index_name_for(suggestion)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"CREATE INDEX [{name}] ON [{suggestion['table']}] ([{suggestion['column']}])")
+        conn.commit()
+        after = measure()
+        cursor.execute(f"DROP INDEX [{name}] ON [{suggestion['table']}]")
+        conn.commit()
+    finally:
+        cursor.close()
+    return {query_name: (before[query_name], after[query_name]) for query_name in suggestion["queries"]}
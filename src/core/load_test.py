@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+複数のユーザーが同じデータベースを同時に使用する状況を再現する負荷テストのモジュールです。
+
+各ユーザーは専用のスレッドと専用の接続を持ち、重み付けされたクエリの組み合わせから
+ランダムにクエリを選んで、指定された時間だけ繰り返し実行します（pyodbc は実行中に GIL を解放するため、
+スレッドでもデータベース側では同時に実行されます）。実行するクエリは関数として渡されるため、
+データベースの種類に依存しません。
+"""
+import re
+import time
+import random
+import threading
+import contextlib
+
+from src.core.benchmark_stats import percentile
+
+# ロックの競合によるエラーとみなすメッセージ（Accessのエラー番号 3008, 3050, 3218, 3260 を含む）
+LOCK_ERROR_PATTERN = re.compile(r"lock|ロック|使用中|already in use|\b(3008|3050|3218|3260)\b", re.IGNORECASE)
+
+
+def parse_query_mix(text):
+    """"クエリ名=重み,クエリ名=重み" 形式の文字列を [(クエリ名, 重み)] に変換します。重みを省略した場合は1になります。"""
+    mix = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, sep, weight = part.rpartition("=") if "=" in part else (part, "", "1")
+        weight = float(weight)
+        if weight <= 0:
+            raise ValueError(f"重みは正の数で指定してください: {part.strip()}")
+        mix.append((name.strip(), weight))
+    if not mix:
+        raise ValueError("実行するクエリが指定されていません。")
+    return mix
+
+
+def is_lock_error(error):
+    return bool(LOCK_ERROR_PATTERN.search(str(error)))
+
+
+class LoadTestResult:
+    """
+    負荷テストの結果です。samples は (開始からの経過秒数, ユーザー番号, クエリ名, 所要時間, エラーの種類) のリストで、
+    エラーの種類は成功した場合は None、ロックの競合の場合は "lock"、それ以外のエラーの場合は "error" です。
+    """
+
+    def __init__(self, users, duration):
+        self.users = users
+        self.duration = duration
+        self.elapsed = 0.0
+        self.samples = []
+        self.connect_errors = []
+        self.error_messages = {}
+
+    def _successful(self, query=None):
+        return [sample[3] for sample in self.samples if sample[4] is None and (query is None or sample[2] == query)]
+
+    @property
+    def completed(self):
+        return len(self._successful())
+
+    @property
+    def errors(self):
+        return sum(1 for sample in self.samples if sample[4] == "error")
+
+    @property
+    def lock_errors(self):
+        return sum(1 for sample in self.samples if sample[4] == "lock")
+
+    @property
+    def throughput(self):
+        """1秒あたりに成功したクエリの数です。"""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def latency(self, query=None):
+        latencies = self._successful(query)
+        return {
+            "count": len(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        }
+
+    def per_query(self):
+        """クエリごとの {"name", "count", "p50", "p95", "p99", "max", "errors", "lock_errors"} のリストを返します。"""
+        names = sorted({sample[2] for sample in self.samples})
+        rows = []
+        for name in names:
+            row = {"name": name, **self.latency(name)}
+            row["errors"] = sum(1 for sample in self.samples if sample[2] == name and sample[4] == "error")
+            row["lock_errors"] = sum(1 for sample in self.samples if sample[2] == name and sample[4] == "lock")
+            rows.append(row)
+        return rows
+
+    def timeline(self, interval=1.0):
+        """interval 秒ごとの {"start", "throughput", "p50", "p95", "errors", "lock_errors"} のリストを返します。"""
+        buckets = {}
+        for offset, _, _, seconds, kind in self.samples:
+            buckets.setdefault(int(offset // interval), []).append((seconds, kind))
+        rows = []
+        for index in range(int(self.elapsed // interval) + 1 if self.samples else 0):
+            entries = buckets.get(index, [])
+            latencies = [seconds for seconds, kind in entries if kind is None]
+            rows.append({
+                "start": index * interval,
+                "throughput": len(latencies) / interval,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "errors": sum(1 for _, kind in entries if kind == "error"),
+                "lock_errors": sum(1 for _, kind in entries if kind == "lock"),
+            })
+        return rows
+
+
+def run_load_test(open_connection, execute, mix, users, duration, seed=None, clock=time.perf_counter):
+    """
+    users 個のスレッドで、mix（[(クエリ名, 重み)]）から選んだクエリを duration 秒間繰り返し実行し、LoadTestResult を返します。
+
+    open_connection() は新しい接続を開くコンテキストマネージャーを返す関数で、ユーザーごとに呼び出されます。
+    execute(接続, クエリ名) は1つのクエリを実行して結果を読み込む関数です。
+    全てのユーザーの接続が開かれてから、同時に実行を開始します。
+    """
+    result = LoadTestResult(users, duration)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    lock = threading.Lock()
+    ready = threading.Barrier(users + 1)
+    go = threading.Event()
+    state = {}
+
+    def user(index):
+        rng = random.Random(None if seed is None else seed + index)
+        samples = []
+        with contextlib.ExitStack() as stack:
+            try:
+                conn = stack.enter_context(open_connection())
+            except Exception as e:
+                with lock:
+                    result.connect_errors.append(str(e))
+                ready.wait()
+                return
+            ready.wait()
+            go.wait()
+            start = state["start"]
+            deadline = start + duration
+            while clock() < deadline:
+                name = rng.choices(names, weights)[0]
+                query_start = clock()
+                kind = None
+                try:
+                    execute(conn, name)
+                except Exception as e:
+                    kind = "lock" if is_lock_error(e) else "error"
+                    with lock:
+                        result.error_messages[str(e)] = result.error_messages.get(str(e), 0) + 1
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+                samples.append((query_start - start, index, name, clock() - query_start, kind))
+        with lock:
+            result.samples.extend(samples)
+
+    threads = [threading.Thread(target=user, args=(index,), name=f"load-user-{index}", daemon=True) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    state["start"] = clock()
+    go.set()
+    for thread in threads:
+        thread.join()
+    result.elapsed = clock() - state["start"]
+    result.samples.sort(key=lambda sample: sample[0])
+    return result
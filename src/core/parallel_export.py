@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import logging
+import concurrent.futures
+
+from src.core.access_handler import (
+    OBJECT_TYPES, OBJECT_EXTENSIONS, access_application, temporary_access_copy, release_access_session,
+    list_access_objects,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def split_into_shards(entries, worker_count):
+    """オブジェクト一覧を種類・名前順に並べ、ラウンドロビンで worker_count 個のシャードに分割します。"""
+    category_order = {category: i for i, category in enumerate(OBJECT_TYPES)}
+    ordered = sorted(entries, key=lambda entry: (category_order[entry[0]], entry[1].lower()))
+    shards = [ordered[i::worker_count] for i in range(worker_count)]
+    return [shard for shard in shards if shard]
+
+
+def _save_with_retries(app, category, name, export_dir, retries):
+    filepath = os.path.join(export_dir, f"{name}{OBJECT_EXTENSIONS[category]}")
+    last_error = None
+    for _ in range(retries + 1):
+        try:
+            app.SaveAsText(OBJECT_TYPES[category], name, filepath)
+            return None
+        except Exception as e:
+            last_error = e
+    return str(last_error)
+
+
+def export_shard(worker_id, db_path, shard, export_dir, retries):
+    """
+    ワーカープロセスで実行され、ファイルの一時コピーを専用のAccessインスタンスで開いてシャードをエクスポートします。
+    """
+    import pythoncom
+    pythoncom.CoInitialize()
+    start = time.perf_counter()
+    exported, failed = [], []
+    try:
+        with temporary_access_copy(db_path) as (copy_path, _):
+            with access_application(copy_path) as app:
+                for category, name in shard:
+                    error = _save_with_retries(app, category, name, export_dir, retries)
+                    if error is None:
+                        exported.append((category, name))
+                    else:
+                        failed.append((category, name, error))
+    finally:
+        pythoncom.CoUninitialize()
+    return {
+        "worker": worker_id,
+        "exported": exported,
+        "failed": failed,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def export_objects_parallel(db_path, export_dir, workers=2, retries=2, cache=None, entries=None):
+    """
+    オブジェクトを複数のAccessインスタンスで並列にエクスポートし、export_objects と同じ形式の結果を返します。
+
+    キャッシュにあるオブジェクトは呼び出し元のプロセスで出力し、残りのみをワーカーに割り当てます。
+    ワーカー内で retries 回再試行しても失敗したオブジェクトは、全ワーカー終了後に名前順で1件ずつ再実行します。
+    戻り値は (exported_files, worker_stats, failed) のタプルです。
+    """
+    if entries is None:
+        with access_application(db_path) as app:
+            entries = list_access_objects(app)
+    # ワーカーは元ファイルをコピーするため、対話モードで開いているセッションを先に終了する
+    release_access_session(db_path)
+
+    done = set()
+    pending = []
+    for category, name, date_modified in entries:
+        data = cache.get(category, name, date_modified) if cache is not None else None
+        if data is not None:
+            with open(os.path.join(export_dir, f"{name}{OBJECT_EXTENSIONS[category]}"), "wb") as f:
+                f.write(data)
+            done.add((category, name))
+        else:
+            # COMの日付型はプロセス間で受け渡せないため、ワーカーには種類と名前のみを渡す
+            pending.append((category, name))
+
+    worker_stats = []
+    failed = []
+    shards = split_into_shards(pending, max(1, workers))
+    if shards:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            futures = {
+                executor.submit(export_shard, worker_id, db_path, shard, export_dir, retries): (worker_id, shard)
+                for worker_id, shard in enumerate(shards, 1)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                worker_id, shard = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # ワーカー自体が失敗した場合は、シャード内の全オブジェクトを失敗として扱う
+                    logger.error(f"エクスポートワーカー {worker_id} が異常終了しました: {e}", exc_info=True)
+                    result = {"worker": worker_id, "exported": [],
+                              "failed": [(category, name, str(e)) for category, name in shard], "seconds": 0.0}
+                done.update(result["exported"])
+                failed.extend(result["failed"])
+                worker_stats.append({
+                    "worker": worker_id,
+                    "objects": len(result["exported"]),
+                    "failed": len(result["failed"]),
+                    "seconds": result["seconds"],
+                    "objects_per_sec": len(result["exported"]) / result["seconds"] if result["seconds"] else 0.0,
+                })
+
+    if failed:
+        failed.sort(key=lambda item: (item[0], item[1].lower()))
+        logger.warning(f"{len(failed)}件のオブジェクトのエクスポートに失敗したため、順番に再実行します。")
+        still_failed = []
+        with access_application(db_path) as app:
+            for category, name, _ in failed:
+                error = _save_with_retries(app, category, name, export_dir, retries)
+                if error is None:
+                    done.add((category, name))
+                else:
+                    still_failed.append((category, name, error))
+        release_access_session(db_path)
+        failed = still_failed
+
+    pending_keys = set(pending)
+    exported_files = {category: [] for category in OBJECT_TYPES.keys()}
+    for category, name, date_modified in entries:
+        if (category, name) not in done:
+            continue
+        filename = f"{name}{OBJECT_EXTENSIONS[category]}"
+        exported_files[category].append(filename)
+        if cache is not None and (category, name) in pending_keys:
+            with open(os.path.join(export_dir, filename), "rb") as f:
+                cache.put(category, name, date_modified, f.read())
+
+    worker_stats.sort(key=lambda stats: stats["worker"])
+    return exported_files, worker_stats, failed
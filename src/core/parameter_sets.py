@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+ベンチマークでパラメータークエリに渡すパラメーターの値を、JSONまたはCSVのファイルから読み込むモジュールです。
+
+JSON: {"クエリ名": [[値1, 値2], [値1, 値2], ...]} の形式で、1つのパラメーターの場合は [値, 値, ...] とも書けます。
+CSV: 1列目がクエリ名、2列目以降がパラメーターの値で、1行が1組です（1行目が "query" または "クエリ名" で始まる場合は見出しとして読み飛ばします）。
+値はクエリのパラメーターの宣言順に指定します。
+"""
+import os
+import csv
+import json
+
+CSV_HEADER_NAMES = {"query", "クエリ名"}
+
+
+def _as_tuple(value):
+    if isinstance(value, dict):
+        raise ValueError("パラメーターの値は名前ではなく、宣言順のリストで指定してください。")
+    return tuple(value) if isinstance(value, list) else (value,)
+
+
+def load_parameter_sets(path):
+    """ファイルから {クエリ名: [パラメーターの値のタプル]} を読み込みます。"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("JSONはクエリ名をキーとするオブジェクトで指定してください。")
+        return {name: [_as_tuple(value) for value in (values if isinstance(values, list) else [values])]
+                for name, values in data.items()}
+    if extension == ".csv":
+        parameter_sets = {}
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for index, row in enumerate(csv.reader(f)):
+                if not row or not row[0].strip() or (index == 0 and row[0].strip().casefold() in CSV_HEADER_NAMES):
+                    continue
+                values = list(row[1:])
+                # Excelで保存したCSVの末尾の空のセルは値として扱わない
+                while values and values[-1] == "":
+                    values.pop()
+                parameter_sets.setdefault(row[0].strip(), []).append(tuple(values))
+        return parameter_sets
+    raise ValueError(f"パラメーターのファイルは .json または .csv で指定してください: {path}")
+
+
+class ParameterCycle:
+    """クエリごとのパラメーターの組を、実行のたびに順番に（最後の組の次は最初の組に戻って）返します。"""
+
+    def __init__(self, parameter_sets):
+        self.parameter_sets = parameter_sets
+        self._positions = {}
+
+    def __contains__(self, query_name):
+        return bool(self.parameter_sets.get(query_name))
+
+    def next(self, query_name):
+        sets = self.parameter_sets.get(query_name)
+        if not sets:
+            return None
+        position = self._positions.get(query_name, 0)
+        self._positions[query_name] = (position + 1) % len(sets)
+        return sets[position]
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+エクスポートされたAccessオブジェクトのテキストから識別子の索引を作成し、
+オブジェクト間の参照関係を解決するモジュールです。
+
+各オブジェクトのテキストは一度だけ走査され、識別子・[角括弧名]・"文字列" を
+トークンとしてハッシュ索引に登録します。候補名の解決は索引の参照のみで行うため、
+処理時間はソースの総量に対して線形になります。
+"""
+import re
+
+# 識別子（日本語名を含む）、[角括弧で囲まれた名前]、"文字列リテラル" をトークンとして扱う
+_IDENTIFIER_RE = re.compile(r"\w+")
+_BRACKETED_RE = re.compile(r"\[([^\[\]\r\n]+)\]")
+_QUOTED_RE = re.compile(r'"([^"\r\n]+)"')
+
+# フォーム/レポートのクラスモジュール名（Form_xxx, Report_xxx）は本体への参照として扱う
+_CLASS_MODULE_RE = re.compile(r"\b(?:form|report)_(\w+)")
+
+# 標準モジュールで公開されるプロシージャの宣言
+_PUBLIC_PROCEDURE_RE = re.compile(
+    r"^[ \t]*(?:(Public|Friend|Private)[ \t]+)?(?:Static[ \t]+)?"
+    r"(?:Sub|Function|Property[ \t]+(?:Get|Let|Set))[ \t]+(\w+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def normalize_name(name):
+    """Accessのオブジェクト名は大文字・小文字を区別しないため、比較用に正規化します。"""
+    return name.strip().casefold()
+
+
+def reference_tokens(text):
+    """テキストから参照候補となるトークン（正規化済み）の集合を返します。"""
+    folded = text.casefold()
+    tokens = set(_IDENTIFIER_RE.findall(folded))
+    tokens.update(_CLASS_MODULE_RE.findall(folded))
+    for regex in (_BRACKETED_RE, _QUOTED_RE):
+        tokens.update(token.strip() for token in regex.findall(folded))
+    tokens.discard("")
+    return tokens
+
+
+def extract_public_procedures(module_text):
+    """標準モジュールのソースから、Private以外で宣言されたプロシージャ名を抽出します。"""
+    return sorted({
+        match.group(2)
+        for match in _PUBLIC_PROCEDURE_RE.finditer(module_text)
+        if (match.group(1) or "").lower() != "private"
+    })
+
+
+class ReferenceIndex:
+    """トークン -> 参照元オブジェクトの集合 を保持する転置索引です。"""
+
+    def __init__(self):
+        self._postings = {}
+        self._sources = set()
+
+    def add_source(self, owner, text):
+        """owner（(カテゴリ, 名前) のタプル）のテキストを索引に登録します。"""
+        self._sources.add(owner)
+        for token in reference_tokens(text):
+            self._postings.setdefault(token, set()).add(owner)
+
+    @property
+    def source_count(self):
+        return len(self._sources)
+
+    @property
+    def token_count(self):
+        return len(self._postings)
+
+    def referrers(self, name, exclude=None):
+        """name を参照しているオブジェクトの集合を返します。exclude は結果から除外されます。"""
+        owners = self._postings.get(normalize_name(name), set())
+        if exclude is None:
+            return set(owners)
+        return {owner for owner in owners if owner != exclude}
+
+    def resolve_references(self, objects, module_symbols=None):
+        """
+        各オブジェクトについて、参照に使われた識別子と参照元を識別子単位で返します。
+
+        戻り値は {(カテゴリ, 名前): {識別子: set(参照元)}} の辞書です。
+        モジュールは、モジュール名に加えて公開プロシージャ名（module_symbols）でも参照を解決します。
+        自分自身からの参照（VB_Name属性など）は数えません。
+        """
+        module_symbols = module_symbols or {}
+        references = {}
+        for owner in objects:
+            category, name = owner
+            identifiers = [name]
+            if category == "Modules":
+                identifiers.extend(module_symbols.get(name, []))
+            found = {}
+            for identifier in identifiers:
+                owners = self.referrers(identifier, exclude=owner)
+                if owners:
+                    found[identifier] = owners
+            references[owner] = found
+        return references
+
+    def find_unused(self, objects, module_symbols=None):
+        """どのオブジェクトからも参照されていないオブジェクトを、入力順のリストで返します。"""
+        references = self.resolve_references(objects, module_symbols)
+        return [owner for owner in objects if not references[owner]]
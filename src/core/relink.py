@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+リンクテーブルをバックエンドごとにまとめて再リンクするモジュールです。
+
+RefreshLink はテーブルごとにバックエンドへ接続し直すため、同じバックエンドの
+テーブルが多いとネットワーク共有上で非常に時間がかかります。ここではリンクテーブルを
+バックエンドごとにグループ化し、各バックエンドを一度だけ検証して開いたまま
+そのグループの RefreshLink をまとめて実行します（接続とロックファイルの作成が一度で済みます）。
+"""
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATABASE_KEY = "DATABASE"
+
+
+def _split_connect(connect):
+    return connect.split(";")
+
+
+def backend_path(connect):
+    """リンクテーブルの Connect 文字列から DATABASE= のパスを返します。ODBCリンクなどでは None を返します。"""
+    if not connect or connect.upper().startswith("ODBC;"):
+        return None
+    for part in _split_connect(connect):
+        key, sep, value = part.partition("=")
+        if sep and key.strip().upper() == DATABASE_KEY:
+            return value
+    return None
+
+
+def replace_backend(connect, new_path):
+    """Connect 文字列の DATABASE= のパスを new_path に置き換えた文字列を返します。"""
+    parts = []
+    for part in _split_connect(connect):
+        key, sep, _ = part.partition("=")
+        parts.append(f"{key}={new_path}" if sep and key.strip().upper() == DATABASE_KEY else part)
+    return ";".join(parts)
+
+
+def remap_path(path, old_prefix, new_prefix):
+    """path が old_prefix で始まる場合（大文字・小文字は区別しない）、new_prefix に置き換えたパスを返します。"""
+    if not path.lower().startswith(old_prefix.lower()):
+        return None
+    return new_prefix + path[len(old_prefix):]
+
+
+class BackendGroup:
+    """同じバックエンドを参照するリンクテーブルのグループです。"""
+
+    def __init__(self, old_backend, new_backend):
+        self.old_backend = old_backend
+        self.new_backend = new_backend
+        self.tables = []
+
+    def add(self, table_name, new_connect):
+        self.tables.append((table_name, new_connect))
+
+
+def plan_relink(linked_tables, old_prefix, new_prefix):
+    """
+    (テーブル名, Connect文字列) のリストから、パスの置き換えが必要なテーブルをバックエンドごとにまとめます。
+
+    戻り値は BackendGroup のリストで、バックエンドの出現順に並びます。
+    """
+    groups = {}
+    for table_name, connect in linked_tables:
+        old_backend = backend_path(connect)
+        if old_backend is None:
+            continue
+        new_backend = remap_path(old_backend, old_prefix, new_prefix)
+        if new_backend is None or new_backend == old_backend:
+            continue
+        key = os.path.normcase(old_backend)
+        if key not in groups:
+            groups[key] = BackendGroup(old_backend, new_backend)
+        groups[key].add(table_name, replace_backend(connect, new_backend))
+    return list(groups.values())
+
+
+def relink_groups(groups, refresh_link, open_backend, dry_run=False, clock=time.perf_counter):
+    """
+    バックエンドごとに検証と再リンクを行い、バックエンドごとの結果のリストを返します。
+
+    open_backend(パス) はバックエンドを開くコンテキストマネージャーを返す関数で、開けない場合は例外を送出します。
+    refresh_link(テーブル名, 新しいConnect文字列) は1つのテーブルの再リンクを行う関数です。
+    dry_run の場合はバックエンドの検証のみを行い、リンクは変更しません。
+    検証に失敗したバックエンドのテーブルは変更しません（リンクが切れた状態にしないため）。
+    """
+    results = []
+    for group in groups:
+        start = clock()
+        result = {
+            "old_backend": group.old_backend,
+            "new_backend": group.new_backend,
+            "tables": len(group.tables),
+            "refreshed": 0,
+            "failed": [],
+            "error": None,
+            "seconds": 0.0,
+        }
+        try:
+            with open_backend(group.new_backend):
+                if not dry_run:
+                    for table_name, new_connect in group.tables:
+                        try:
+                            refresh_link(table_name, new_connect)
+                            result["refreshed"] += 1
+                        except Exception as e:
+                            logger.error(f"リンクテーブルの更新に失敗しました: {table_name} - {e}")
+                            result["failed"].append((table_name, str(e)))
+        except Exception as e:
+            logger.error(f"バックエンドを開けないため、{len(group.tables)}件のテーブルをスキップしました: {group.new_backend} - {e}")
+            result["error"] = str(e)
+        result["seconds"] = clock() - start
+        results.append(result)
+    return results
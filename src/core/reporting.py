@@ -3,12 +3,15 @@ import os
 import sys
 import re
 import json
+import html
 from src.constants import (
     DIFF_REPORT_TEMPLATE,
     UNUSED_OBJECTS_REPORT_TEMPLATE,
     BENCHMARK_REPORT_TEMPLATE,
+    LOAD_TEST_REPORT_TEMPLATE,
     TEMPLATES_DIR
 )
+from src.core.table_diff import as_table_diff
 
 class ReportGenerator:
     def __init__(self):
@@ -31,9 +34,8 @@ class ReportGenerator:
             html_template = f.read()
 
         # サマリー情報の計算
-        total_table_changes = 0
-        for table, (only1, only2) in table_diffs.items():
-            total_table_changes += len(only1) + len(only2)
+        table_diffs = {table: as_table_diff(table, value) for table, value in table_diffs.items()}
+        total_table_changes = sum(table_diff.total_changes for table_diff in table_diffs.values())
         
         total_vba_changes = len(vba_diffs)
 
@@ -42,13 +44,20 @@ class ReportGenerator:
         if not table_diffs:
             table_diffs_html = "<tr><td colspan=\"3\" class=\"no-changes\">テーブルの変更は見つかりませんでした。</td></tr>"
         else:
-            for table, (only1, only2) in sorted(table_diffs.items()):
-                if only1:
-                    for row in list(only1)[:100]:
-                        table_diffs_html += f"<tr class=\"removed\"><td>REMOVED</td><td>{table}</td><td>{' '.join(map(str, row))}</td></tr>\n"
-                if only2:
-                    for row in list(only2)[:100]:
-                        table_diffs_html += f"<tr class=\"added\"><td>ADDED</td><td>{table}</td><td>{' '.join(map(str, row))}</td></tr>\n"
+            for table, table_diff in sorted(table_diffs.items()):
+                if table_diff.note:
+                    table_diffs_html += f"<tr><td>NOTE</td><td>{table}</td><td>{html.escape(table_diff.note)}</td></tr>\n"
+                for row in table_diff.removed:
+                    table_diffs_html += f"<tr class=\"removed\"><td>REMOVED</td><td>{table}</td><td>{' '.join(map(str, row))}</td></tr>\n"
+                for row in table_diff.added:
+                    table_diffs_html += f"<tr class=\"added\"><td>ADDED</td><td>{table}</td><td>{' '.join(map(str, row))}</td></tr>\n"
+                for key, changes in table_diff.updated:
+                    key_text = ", ".join(f"{column}={value}" for column, value in zip(table_diff.key_columns, key))
+                    changes_text = "<br>".join(html.escape(f"{column}: {old} → {new}") for column, old, new in changes)
+                    table_diffs_html += f"<tr class=\"updated\"><td>UPDATED</td><td>{table}</td><td>{html.escape(key_text)}<br>{changes_text}</td></tr>\n"
+                omitted = table_diff.total_changes - len(table_diff.removed) - len(table_diff.added) - len(table_diff.updated)
+                if omitted > 0:
+                    table_diffs_html += f"<tr><td>...</td><td>{table}</td><td>ほか {omitted}件の差分は省略されました（追加 {table_diff.added_count}件 / 削除 {table_diff.removed_count}件 / 変更 {table_diff.updated_count}件）</td></tr>\n"
 
         # VBA差分のHTML生成
         vba_diffs_html = ""
@@ -116,27 +125,133 @@ class ReportGenerator:
 
         self._write_html_report(output_path, html_report)
 
-    def create_benchmark_report(self, benchmark_results, output_path, report_datetime, file_path):
+    def create_benchmark_report(self, benchmark_results, output_path, report_datetime, file_path, trends=None,
+                                comparisons=None, baseline_label=""):
         html_template = ""
         template_path = self._get_template_path(BENCHMARK_REPORT_TEMPLATE)
         with open(template_path, 'r', encoding='utf-8') as f:
             html_template = f.read()
 
+        # benchmark_results は BenchmarkResult.to_dict() のリスト
+        format_seconds = lambda value: "-" if value is None else f"{value:.4f}"
+        measured = [result for result in benchmark_results if result["runs"]]
         benchmark_results_html = ""
         if not benchmark_results:
-            benchmark_results_html = "<tr><td colspan=\"3\" class=\"no-changes\">ベンチマーク結果は見つかりませんでした。</td></tr>"
+            benchmark_results_html = "<tr><td colspan=\"20\" class=\"no-changes\">ベンチマーク結果は見つかりませんでした。</td></tr>"
         else:
-            for query_name, avg_time, total_time in benchmark_results:
-                benchmark_results_html += f"<tr><td>{query_name}</td><td>{avg_time:.4f}</td><td>{total_time:.4f}</td></tr>\n"
+            for result in benchmark_results:
+                notes = []
+                if result["timed_out"]:
+                    notes.append("時間の上限に達しました")
+                if result["error"]:
+                    notes.append(result["error"])
+                if result.get("record_source"):
+                    # フォームのベンチマークでは、レコードソースとその単独での実行時間を表示する
+                    seconds = result.get("record_source_seconds")
+                    notes.append(f"RecordSource: {result['record_source']}" + ("" if seconds is None else f" ({seconds:.4f}秒)"))
+                ci = "-" if result["ci_half_width"] is None else f"±{result['ci_half_width']:.4f}"
+                metrics = result.get("metrics") or {}
+                metric = lambda key, pattern: "-" if metrics.get(key) is None else pattern.format(metrics[key])
+                peak = "-" if result.get("peak_memory") is None else f"{result['peak_memory'] / 1024:,.1f}"
+                benchmark_results_html += (
+                    f"<tr><td>{html.escape(result['name'])}</td><td>{result['runs']} (+{result['warmup']})</td>"
+                    f"<td>{format_seconds(result['min'])}</td><td>{format_seconds(result['median'])}</td>"
+                    f"<td>{format_seconds(result['mean'])}</td><td>{format_seconds(result['p95'])}</td>"
+                    f"<td>{format_seconds(result['p99'])}</td><td>{format_seconds(result['stdev'])}</td>"
+                    f"<td>{ci}</td><td>{result['outliers']}</td>"
+                    f"<td>{metric('execute_seconds', '{:.4f}')}</td><td>{metric('first_row_seconds', '{:.4f}')}</td>"
+                    f"<td>{metric('fetch_seconds', '{:.4f}')}</td><td>{metric('rows', '{:,.0f}')}</td>"
+                    f"<td>{metric('rows_per_second', '{:,.0f}')}</td><td>{metric('bytes', '{:,.0f}')}</td><td>{peak}</td>"
+                    f"<td>{metric('affected_rows', '{:,.0f}')}</td><td>{metric('affected_rows_per_second', '{:,.0f}')}</td>"
+                    f"<td>{html.escape(' / '.join(notes))}</td></tr>\n"
+                )
 
         # グラフデータ用にJSON形式でデータを渡す
-        chart_labels = json.dumps([res[0] for res in benchmark_results])
-        chart_data = json.dumps([res[1] for res in benchmark_results])
+        chart_labels = json.dumps([result["name"] for result in measured])
+        chart_data = json.dumps({key: [result[key] for result in measured] for key in ("min", "median", "p95", "p99")})
+        breakdown_data = json.dumps({key: [(result.get("metrics") or {}).get(key) for result in measured]
+                                     for key in ("execute_seconds", "fetch_seconds")})
 
         html_report = html_template.replace('{{benchmark_results_html}}', benchmark_results_html)
         html_report = html_report.replace('{{report_datetime}}', report_datetime)
         html_report = html_report.replace('{{file_path}}', file_path)
         html_report = html_report.replace('{{chart_labels}}', chart_labels)
         html_report = html_report.replace('{{chart_data}}', chart_data)
+        html_report = html_report.replace('{{breakdown_data}}', breakdown_data)
 
-        self._write_html_report(output_path, html_report)
\ No newline at end of file
+        # 履歴の推移（BenchmarkHistory.trends() の結果）とベースラインとの比較（compare_runs() の結果）
+        trends = trends or {"runs": [], "queries": {}}
+        trend_data = json.dumps({
+            "labels": [f"#{run['id']} {run['version']}" for run in trends["runs"]],
+            "queries": trends["queries"],
+        })
+        if comparisons is None:
+            comparison_html = "<tr><td colspan=\"6\" class=\"no-changes\">ベースラインとの比較は行われませんでした。</td></tr>"
+        elif not comparisons:
+            comparison_html = "<tr><td colspan=\"6\" class=\"no-changes\">ベースラインに比較できるクエリはありませんでした。</td></tr>"
+        else:
+            comparison_html = ""
+            for comparison in comparisons:
+                if comparison["missing"]:
+                    comparison_html += (
+                        f"<tr><td>{html.escape(comparison['name'])}</td><td>{comparison['baseline_mean']:.4f}</td>"
+                        f"<td>-</td><td>-</td><td>-</td><td><span class=\"regression\">測定失敗</span></td></tr>\n"
+                    )
+                    continue
+                p_value = "-" if comparison["p_value"] is None else f"{comparison['p_value']:.4f}"
+                verdict = "<span class=\"regression\">性能低下</span>" if comparison["regression"] else "OK"
+                comparison_html += (
+                    f"<tr><td>{html.escape(comparison['name'])}</td><td>{comparison['baseline_mean']:.4f}</td>"
+                    f"<td>{comparison['current_mean']:.4f}</td><td>{comparison['change']:+.1%}</td>"
+                    f"<td>{p_value}</td><td>{verdict}</td></tr>\n"
+                )
+        html_report = html_report.replace('{{trend_data}}', trend_data)
+        html_report = html_report.replace('{{comparison_html}}', comparison_html)
+        html_report = html_report.replace('{{baseline_label}}', html.escape(baseline_label))
+
+        self._write_html_report(output_path, html_report)
+
+    def create_load_test_report(self, load_result, output_path, report_datetime, file_path, interval=1.0):
+        html_template = ""
+        template_path = self._get_template_path(LOAD_TEST_REPORT_TEMPLATE)
+        with open(template_path, 'r', encoding='utf-8') as f:
+            html_template = f.read()
+
+        format_seconds = lambda value: "-" if value is None else f"{value:.4f}"
+        query_results_html = ""
+        per_query = load_result.per_query()
+        if not per_query:
+            query_results_html = "<tr><td colspan=\"8\" class=\"no-changes\">実行されたクエリはありませんでした。</td></tr>"
+        for row in per_query:
+            query_results_html += (
+                f"<tr><td>{html.escape(row['name'])}</td><td>{row['count']}</td><td>{format_seconds(row['p50'])}</td>"
+                f"<td>{format_seconds(row['p95'])}</td><td>{format_seconds(row['p99'])}</td><td>{format_seconds(row['max'])}</td>"
+                f"<td>{row['errors']}</td><td>{row['lock_errors']}</td></tr>\n"
+            )
+
+        error_results_html = ""
+        messages = sorted(load_result.error_messages.items(), key=lambda item: item[1], reverse=True)
+        messages += [(f"接続エラー: {message}", 1) for message in load_result.connect_errors]
+        if not messages:
+            error_results_html = "<tr><td colspan=\"2\" class=\"no-changes\">エラーはありませんでした。</td></tr>"
+        for message, count in messages:
+            error_results_html += f"<tr><td>{html.escape(message)}</td><td>{count}</td></tr>\n"
+
+        replacements = {
+            '{{report_datetime}}': report_datetime,
+            '{{file_path}}': file_path,
+            '{{users}}': str(load_result.users),
+            '{{duration}}': f"{load_result.elapsed:.1f}",
+            '{{throughput}}': f"{load_result.throughput:.2f}",
+            '{{completed}}': str(load_result.completed),
+            '{{errors}}': str(load_result.errors),
+            '{{lock_errors}}': str(load_result.lock_errors),
+            '{{query_results_html}}': query_results_html,
+            '{{error_results_html}}': error_results_html,
+            '{{timeline_data}}': json.dumps(load_result.timeline(interval)),
+        }
+        html_report = html_template
+        for placeholder, value in replacements.items():
+            html_report = html_report.replace(placeholder, value)
+
+        self._write_html_report(output_path, html_report)
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import re
+
+
+def compile_search_pattern(patterns, regex=False, ignore_case=True):
+    """
+    複数のキーワード（または正規表現）を、一度の走査でいずれかに一致する1つの正規表現にコンパイルします。
+
+    regex が False の場合、各キーワードはリテラルとして扱われます。
+    """
+    parts = [pattern if regex else re.escape(pattern) for pattern in patterns if pattern]
+    if not parts:
+        raise ValueError("検索パターンが指定されていません。")
+    flags = re.IGNORECASE if ignore_case else 0
+    return re.compile("|".join(f"(?:{part})" for part in parts), flags)
+
+
+def iter_matching_lines(matcher, lines):
+    """一致した行を (行番号, 行の内容) として順に返します。"""
+    search = matcher.search
+    for line_num, line in enumerate(lines, 1):
+        if search(line):
+            yield line_num, line.strip()
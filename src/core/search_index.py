@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import sqlite3
+import logging
+
+from src.core.export_cache import database_identity
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS objects (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    modified TEXT,
+    position INTEGER NOT NULL,
+    UNIQUE (category, name)
+);
+CREATE TABLE IF NOT EXISTS postings (trigram TEXT PRIMARY KEY, bitmap BLOB NOT NULL) WITHOUT ROWID;
+"""
+
+
+def text_trigrams(text):
+    """大文字・小文字を区別しない検索のため、小文字化したテキストのトライグラム集合を返します。"""
+    lowered = text.lower()
+    return {lowered[i:i + NGRAM_SIZE] for i in range(len(lowered) - NGRAM_SIZE + 1)}
+
+
+def _to_bitmap(value):
+    return value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+
+def _from_bitmap(data):
+    return int.from_bytes(data, "little")
+
+
+class SearchIndex:
+    """
+    エクスポートされたオブジェクトのテキストから作成する、永続的なトライグラム索引です。
+
+    各トライグラムには、そのトライグラムを含むオブジェクトIDのビットマップを保存します。
+    キーワード検索ではキーワードの全トライグラムを含むオブジェクトのみを候補とし、
+    候補はエクスポートキャッシュのテキストで検証します。索引はオブジェクトの DateModified ごとに管理され、
+    変更されたオブジェクトのみが再索引されます。
+    """
+
+    def __init__(self, index_dir, db_path):
+        os.makedirs(index_dir, exist_ok=True)
+        self.db_path = db_path
+        self.index_path = os.path.join(index_dir, f"{database_identity(db_path)}.sqlite")
+        self._conn = sqlite3.connect(self.index_path)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- データベースファイルの状態 ---
+    @staticmethod
+    def _file_state(db_path):
+        stat = os.stat(db_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def is_current(self):
+        """前回の索引作成以降、データベースファイルが変更されていない場合に True を返します。"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'file_state'").fetchone()
+        return row is not None and row[0] == self._file_state(self.db_path)
+
+    def mark_current(self):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('file_state', ?)",
+                               (self._file_state(self.db_path),))
+
+    # --- 索引の更新 ---
+    def objects(self):
+        """索引済みのオブジェクトを (id, カテゴリ, 名前, DateModified) のリストとして一覧順に返します。"""
+        return self._conn.execute("SELECT id, category, name, modified FROM objects ORDER BY position").fetchall()
+
+    def stale_objects(self, catalog, cache):
+        """catalog（(カテゴリ, 名前, DateModified) のリスト）のうち、再索引が必要なものを返します。"""
+        indexed = {(category, name): modified for _, category, name, modified in self.objects()}
+        stale = []
+        for category, name, date_modified in catalog:
+            modified = None if date_modified is None else str(date_modified)
+            if (modified is None or indexed.get((category, name)) != modified
+                    or not cache.contains(category, name, date_modified)):
+                stale.append((category, name, date_modified))
+        return stale
+
+    def apply(self, catalog, reindexed):
+        """
+        catalog に合わせて索引を更新します。
+
+        reindexed は {(カテゴリ, 名前): テキスト} の辞書で、再エクスポートしたオブジェクトのテキストです。
+        catalog に存在しないオブジェクトは索引から削除されます。
+        """
+        existing = {(category, name): object_id for object_id, category, name, _ in self.objects()}
+        catalog_keys = {(category, name) for category, name, _ in catalog}
+
+        clear_mask = 0
+        for key, object_id in existing.items():
+            if key not in catalog_keys or key in reindexed:
+                clear_mask |= 1 << object_id
+
+        with self._conn:
+            for key, object_id in existing.items():
+                if key not in catalog_keys:
+                    self._conn.execute("DELETE FROM objects WHERE id = ?", (object_id,))
+
+            used_ids = {object_id for key, object_id in existing.items() if key in catalog_keys}
+            next_id = 0
+            add_bits = {}
+            for position, (category, name, date_modified) in enumerate(catalog):
+                key = (category, name)
+                object_id = existing.get(key)
+                if object_id is None:
+                    # 削除されたオブジェクトのIDを再利用し、ビットマップが大きくなり続けないようにする
+                    while next_id in used_ids:
+                        next_id += 1
+                    object_id = next_id
+                    used_ids.add(object_id)
+                modified = None if date_modified is None else str(date_modified)
+                if key in reindexed or object_id != existing.get(key):
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO objects (id, category, name, modified, position) VALUES (?, ?, ?, ?, ?)",
+                        (object_id, category, name, modified, position))
+                else:
+                    self._conn.execute("UPDATE objects SET position = ? WHERE id = ?", (position, object_id))
+                if key in reindexed:
+                    bit = 1 << object_id
+                    for trigram in text_trigrams(reindexed[key]):
+                        add_bits[trigram] = add_bits.get(trigram, 0) | bit
+
+            if clear_mask:
+                for trigram, bitmap in self._conn.execute("SELECT trigram, bitmap FROM postings").fetchall():
+                    old_value = _from_bitmap(bitmap)
+                    new_value = (old_value & ~clear_mask) | add_bits.pop(trigram, 0)
+                    if new_value == old_value:
+                        continue
+                    if new_value:
+                        self._conn.execute("UPDATE postings SET bitmap = ? WHERE trigram = ?", (_to_bitmap(new_value), trigram))
+                    else:
+                        self._conn.execute("DELETE FROM postings WHERE trigram = ?", (trigram,))
+            for trigram, bits in add_bits.items():
+                row = self._conn.execute("SELECT bitmap FROM postings WHERE trigram = ?", (trigram,)).fetchone()
+                value = bits | (_from_bitmap(row[0]) if row else 0)
+                self._conn.execute("INSERT OR REPLACE INTO postings (trigram, bitmap) VALUES (?, ?)", (trigram, _to_bitmap(value)))
+
+    # --- 検索 ---
+    def candidate_ids(self, literals):
+        """
+        literals（キーワードのリスト）のいずれかを含む可能性のあるオブジェクトIDの集合を返します。
+
+        literals が None の場合（正規表現検索など）や、3文字未満のキーワードを含む場合は全オブジェクトを返します。
+        """
+        all_ids = {row[0] for row in self.objects()}
+        if literals is None:
+            return all_ids
+        candidates = 0
+        for literal in literals:
+            trigrams = text_trigrams(literal)
+            if not trigrams:
+                return all_ids
+            placeholders = ",".join("?" * len(trigrams))
+            rows = self._conn.execute(f"SELECT bitmap FROM postings WHERE trigram IN ({placeholders})", list(trigrams)).fetchall()
+            if len(rows) < len(trigrams):
+                continue
+            matched = -1
+            for (bitmap,) in rows:
+                matched &= _from_bitmap(bitmap)
+            candidates |= matched
+        return {object_id for object_id in all_ids if candidates >> object_id & 1}
+
+    def iter_search(self, matcher, literals, read_text):
+        """
+        索引から検索結果を順に返します。read_text(カテゴリ, 名前, DateModified) は候補オブジェクトのテキストを返す関数です。
+        """
+        candidates = self.candidate_ids(literals)
+        for object_id, category, name, modified in self.objects():
+            if matcher.search(name):
+                yield {
+                    "type": f"{category} Name", "name": name,
+                    "line_num": None, "line_content": name,
+                }
+            if object_id not in candidates:
+                continue
+            text = read_text(category, name, modified)
+            if text is None:
+                logger.warning(f"索引に対応するテキストが見つからないため、スキップしました: {category}/{name}")
+                continue
+            for line_num, line in enumerate(io.StringIO(text, newline=None), 1):
+                if matcher.search(line):
+                    yield {
+                        "type": category, "name": name,
+                        "line_num": line_num, "line_content": line.strip(),
+                    }
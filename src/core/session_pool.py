@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import threading
+import contextlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+AC_FORM = 2
+AC_REPORT = 3
+AC_SAVE_NO = 2
+
+
+def session_key(db_path):
+    return os.path.normcase(os.path.abspath(db_path))
+
+
+class AccessSession:
+    def __init__(self, db_path, app, now):
+        self.db_path = db_path
+        self.app = app
+        self.created_at = now
+        self.last_used = now
+        self.ref_count = 0
+        self.use_count = 0
+
+
+class AccessSessionPool:
+    """
+    データベースのパスごとに起動済みのAccessインスタンスを保持し、連続するコマンド間で再利用します。
+
+    app_factory は可視状態を設定済みの Access.Application（またはその代替オブジェクト）を返す関数です。
+    取得時にはヘルスチェックを行い、応答しないインスタンスや idle_timeout 秒以上使われていない
+    インスタンスは終了してから作り直します。返却時には開いているフォーム/レポートを閉じて状態をリセットします。
+    """
+
+    def __init__(self, app_factory, idle_timeout=600, clock=time.monotonic):
+        self._app_factory = app_factory
+        self.idle_timeout = idle_timeout
+        self._clock = clock
+        self._sessions = {}
+        self._lock = threading.RLock()
+        self.launches = 0
+        self.reuses = 0
+
+    def holds(self, db_path):
+        with self._lock:
+            return session_key(db_path) in self._sessions
+
+    def _is_healthy(self, session):
+        try:
+            return session_key(session.app.CurrentProject.FullName) == session_key(session.db_path)
+        except Exception as e:
+            logger.warning(f"Accessセッションが応答しません。再起動します: {session.db_path} - {e}")
+            return False
+
+    def _quit(self, session):
+        try:
+            session.app.CloseCurrentDatabase()
+        except Exception as e:
+            logger.debug(f"CloseCurrentDatabase に失敗しました: {session.db_path} - {e}")
+        try:
+            session.app.Quit()
+        except Exception as e:
+            logger.debug(f"Quit に失敗しました: {session.db_path} - {e}")
+
+    def _reset(self, app):
+        # コマンド実行中に開かれたフォーム/レポートを保存せずに閉じ、警告表示を元に戻す
+        for collection_name, object_type in (("Forms", AC_FORM), ("Reports", AC_REPORT)):
+            collection = getattr(app, collection_name)
+            for index in reversed(range(collection.Count)):
+                app.DoCmd.Close(object_type, collection(index).Name, AC_SAVE_NO)
+        app.DoCmd.SetWarnings(True)
+
+    def evict_idle(self):
+        """idle_timeout を超えて使われていないセッションを終了し、終了した件数を返します。"""
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, session in self._sessions.items()
+                       if session.ref_count == 0 and now - session.last_used > self.idle_timeout]
+            for key in expired:
+                logger.info(f"アイドル状態のAccessセッションを終了します: {self._sessions[key].db_path}")
+                self._quit(self._sessions.pop(key))
+        return len(expired)
+
+    def _acquire(self, db_path):
+        key = session_key(db_path)
+        with self._lock:
+            self.evict_idle()
+            session = self._sessions.get(key)
+            if session is not None and session.ref_count == 0 and not self._is_healthy(session):
+                self._quit(self._sessions.pop(key))
+                session = None
+            if session is None:
+                app = self._app_factory()
+                app.OpenCurrentDatabase(db_path)
+                session = AccessSession(db_path, app, self._clock())
+                self._sessions[key] = session
+                self.launches += 1
+                logger.info(f"Accessセッションを起動しました: {db_path}")
+            else:
+                self.reuses += 1
+                logger.info(f"Accessセッションを再利用します: {db_path}")
+            session.ref_count += 1
+            session.use_count += 1
+            return session
+
+    def _release(self, session):
+        with self._lock:
+            session.ref_count -= 1
+            session.last_used = self._clock()
+            if session.ref_count > 0:
+                return
+            try:
+                self._reset(session.app)
+            except Exception as e:
+                logger.warning(f"Accessセッションのリセットに失敗したため終了します: {session.db_path} - {e}")
+                key = session_key(session.db_path)
+                if self._sessions.get(key) is session:
+                    del self._sessions[key]
+                self._quit(session)
+
+    @contextlib.contextmanager
+    def session(self, db_path):
+        session = self._acquire(db_path)
+        try:
+            yield session.app
+        finally:
+            self._release(session)
+
+    def close(self, db_path):
+        """指定したデータベースのセッションを終了します（ファイルをコピー・削除する前に使用します）。"""
+        with self._lock:
+            session = self._sessions.pop(session_key(db_path), None)
+        if session is not None:
+            self._quit(session)
+            return True
+        return False
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            self._quit(session)
+        return len(sessions)
+
+
+# --- プロセス全体で共有するセッションプール（対話モードで有効化されます） ---
+_active_pool = None
+
+
+def enable_session_pool(app_factory, idle_timeout=600):
+    global _active_pool
+    if _active_pool is None:
+        _active_pool = AccessSessionPool(app_factory, idle_timeout=idle_timeout)
+    return _active_pool
+
+
+def get_session_pool():
+    return _active_pool
+
+
+def is_held_by_session_pool(db_path):
+    return _active_pool is not None and _active_pool.holds(db_path)
+
+
+def shutdown_session_pool():
+    global _active_pool
+    pool, _active_pool = _active_pool, None
+    if pool is not None:
+        pool.close_all()
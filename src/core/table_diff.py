@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+"""
+2つのデータベースのテーブルを、主キー順に読み込んだ行のマージジョインで比較するモジュールです。
+
+両方のテーブルを主キー（主キーがない場合はメモ型/OLE型以外の全列）で ORDER BY し、
+fetchmany で少しずつ読み込みながら比較するため、テーブルの大きさに関係なく使用メモリは一定です。
+同じキーの行が両方にある場合は、削除と追加の組ではなく、列単位の差分を持つ UPDATED として報告します。
+
+ダイジェスト方式では、各行を固定長のハッシュ値に変換し、ハッシュ値の多重集合として比較します。
+差分のあったハッシュ値の行だけを読み込み直すため、1行あたりの使用メモリは数十バイトになります。
+"""
+import collections
+import datetime
+import decimal
+import hashlib
+import itertools
+
+from src.core.db_operations import get_table_columns, get_primary_key_columns, iter_table_rows
+
+# ORDER BY に使用できない長いデータ型（SQL_LONGVARCHAR, SQL_LONGVARBINARY, SQL_WLONGVARCHAR）
+LONG_DATA_TYPES = {-1, -4, -10}
+
+# レポートに保持する行の最大数（件数は全件を数える）
+MAX_REPORTED_ROWS = 100
+
+ROW_DIGEST_SIZE = 16
+
+
+class OrderMismatchError(Exception):
+    """データベースの並び順とPythonでの比較順が一致しない場合に送出されます。"""
+
+
+class TableDiff:
+    """
+    1つのテーブルの差分です。
+
+    added / removed は行のタプル、updated は (キーの値のタプル, [(列名, 変更前, 変更後), ...]) のリストで、
+    それぞれ max_rows 件までを保持します。件数は added_count / removed_count / updated_count に全件が数えられます。
+    """
+
+    def __init__(self, table, columns=None, key_columns=None, max_rows=MAX_REPORTED_ROWS):
+        self.table = table
+        self.columns = list(columns or [])
+        self.key_columns = list(key_columns or [])
+        self.max_rows = max_rows
+        self.added = []
+        self.removed = []
+        self.updated = []
+        self.added_count = 0
+        self.removed_count = 0
+        self.updated_count = 0
+        self.note = None
+
+    def add_added(self, row):
+        self.added_count += 1
+        if len(self.added) < self.max_rows:
+            self.added.append(row)
+
+    def add_removed(self, row):
+        self.removed_count += 1
+        if len(self.removed) < self.max_rows:
+            self.removed.append(row)
+
+    def add_updated(self, key, changes):
+        self.updated_count += 1
+        if len(self.updated) < self.max_rows:
+            self.updated.append((key, changes))
+
+    @property
+    def total_changes(self):
+        return self.added_count + self.removed_count + self.updated_count
+
+    def has_changes(self):
+        return bool(self.total_changes or self.note)
+
+
+def as_table_diff(table, value):
+    """従来の (ファイル1のみの行, ファイル2のみの行) 形式の差分を TableDiff に変換します。"""
+    if isinstance(value, TableDiff):
+        return value
+    only1, only2 = value
+    result = TableDiff(table)
+    for rows, add in ((only1, result.add_removed), (only2, result.add_added)):
+        for row in rows:
+            if isinstance(row, str):
+                result.note = row
+            else:
+                add(row)
+    return result
+
+
+def _sort_value(value):
+    # Accessの並び順に合わせ、NULLを先頭にし、文字列は大文字・小文字を区別しない
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        # Yes/No 型は True が -1 として並ぶ
+        return (1, -int(value))
+    if isinstance(value, str):
+        return (1, value.casefold())
+    return (1, value)
+
+
+def _iter_key_groups(rows, key_indexes):
+    """同じキーの行をまとめて (キー, 行のリスト) を返します。キーが昇順でない場合は OrderMismatchError を送出します。"""
+    previous = None
+    for key, group in itertools.groupby(rows, key=lambda row: tuple(_sort_value(row[i]) for i in key_indexes)):
+        if previous is not None and key < previous:
+            raise OrderMismatchError(f"行がキーの昇順に並んでいません: {key} < {previous}")
+        previous = key
+        yield key, list(group)
+
+
+def _diff_group(result, columns, key_indexes, rows1, rows2):
+    if len(rows1) == 1 and len(rows2) == 1:
+        row1, row2 = rows1[0], rows2[0]
+        if row1 != row2:
+            changes = [(column, old, new) for column, old, new in zip(columns, row1, row2) if old != new]
+            result.add_updated(tuple(row1[i] for i in key_indexes), changes)
+        return
+    # 主キーがなく同じキーの行が複数ある場合は、行の多重集合として比較する
+    counts1 = collections.Counter(rows1)
+    counts2 = collections.Counter(rows2)
+    for row in (counts1 - counts2).elements():
+        result.add_removed(row)
+    for row in (counts2 - counts1).elements():
+        result.add_added(row)
+
+
+def merge_join_diff(result, rows1, rows2, key_indexes):
+    """
+    キーの昇順に並んだ2つの行のイテレーターを比較し、差分を result（TableDiff）に追加します。
+    """
+    groups1 = _iter_key_groups(rows1, key_indexes)
+    groups2 = _iter_key_groups(rows2, key_indexes)
+    group1 = next(groups1, None)
+    group2 = next(groups2, None)
+    while group1 is not None or group2 is not None:
+        if group2 is None or (group1 is not None and group1[0] < group2[0]):
+            for row in group1[1]:
+                result.add_removed(row)
+            group1 = next(groups1, None)
+        elif group1 is None or group2[0] < group1[0]:
+            for row in group2[1]:
+                result.add_added(row)
+            group2 = next(groups2, None)
+        else:
+            _diff_group(result, result.columns, key_indexes, group1[1], group2[1])
+            group1 = next(groups1, None)
+            group2 = next(groups2, None)
+    return result
+
+
+def _set_diff(result, rows1, rows2):
+    # 並び順を利用できない場合の比較（両方の行をメモリに読み込む）
+    counts1 = collections.Counter(rows1)
+    counts2 = collections.Counter(rows2)
+    for row in (counts1 - counts2).elements():
+        result.add_removed(row)
+    for row in (counts2 - counts1).elements():
+        result.add_added(row)
+    return result
+
+
+def choose_comparison_columns(columns1, columns2, key_columns1, key_columns2):
+    """
+    両方の (列名, ODBCデータ型) のリストと主キーの列名のリストから、比較に使用する (列名のリスト, キー列のリスト) を返します。
+    両方の列構成が異なる場合は (None, None) を返します。
+    """
+    if [name.lower() for name, _ in columns1] != [name.lower() for name, _ in columns2]:
+        return None, None
+    columns = [name for name, _ in columns1]
+    key_columns = list(key_columns1)
+    if not key_columns or [key.lower() for key in key_columns] != [key.lower() for key in key_columns2]:
+        long_columns = {name for name, data_type in columns1 + columns2 if data_type in LONG_DATA_TYPES}
+        key_columns = [name for name in columns if name not in long_columns]
+    return columns, key_columns
+
+
+def plan_table_comparison(conn1, conn2, table):
+    """
+    比較に使用する (列名のリスト, キー列のリスト) を返します。両方の列構成が異なる場合は (None, None) を返します。
+    """
+    return choose_comparison_columns(get_table_columns(conn1, table), get_table_columns(conn2, table),
+                                     get_primary_key_columns(conn1, table), get_primary_key_columns(conn2, table))
+
+
+def diff_table_streaming(conn1, conn2, table, batch_size=5000, logger=None):
+    """
+    1つのテーブルをマージジョインで比較し、TableDiff を返します。
+
+    列構成が異なる場合や、データベースの並び順がPythonでの比較順と一致しない場合（日本語のキーなど）は、
+    そのテーブルのみ全件を読み込んで比較します。
+    """
+    columns, key_columns = plan_table_comparison(conn1, conn2, table)
+    if columns is None:
+        if logger:
+            logger.warning(f"テーブル {table} の列構成が異なるため、全件を読み込んで比較します。")
+        result = TableDiff(table)
+        result.note = "列構成が異なります"
+        return _set_diff(result, iter_table_rows(conn1, table, _all_columns(conn1, table), batch_size=batch_size),
+                         iter_table_rows(conn2, table, _all_columns(conn2, table), batch_size=batch_size))
+
+    key_indexes = [columns.index(key) for key in key_columns]
+    result = TableDiff(table, columns, key_columns)
+    try:
+        return merge_join_diff(
+            result,
+            iter_table_rows(conn1, table, columns, key_columns, batch_size),
+            iter_table_rows(conn2, table, columns, key_columns, batch_size),
+            key_indexes,
+        )
+    except (OrderMismatchError, TypeError) as e:
+        if logger:
+            logger.warning(f"テーブル {table} の並び順を比較に利用できないため、全件を読み込んで比較します: {e}")
+        result = TableDiff(table, columns, key_columns)
+        return _set_diff(result, iter_table_rows(conn1, table, columns, batch_size=batch_size),
+                         iter_table_rows(conn2, table, columns, batch_size=batch_size))
+
+
+def _all_columns(conn, table):
+    return [name for name, _ in get_table_columns(conn, table)]
+
+
+def _encode_value(value):
+    # 値の型を区別しつつ、同じ値は同じバイト列になるように正規化する
+    if value is None:
+        return b"N"
+    if isinstance(value, bool):
+        return b"B1" if value else b"B0"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int):
+        return b"I" + str(value).encode("ascii")
+    if isinstance(value, float):
+        return b"F" + repr(value).encode("ascii")
+    if isinstance(value, decimal.Decimal):
+        normalized = value.normalize()
+        if normalized == normalized.to_integral_value():
+            return b"I" + str(int(normalized)).encode("ascii")
+        return b"D" + str(normalized).encode("ascii")
+    if isinstance(value, str):
+        return b"S" + value.encode("utf-8")
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return b"X" + bytes(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return b"T" + value.isoformat().encode("ascii")
+    return b"R" + repr(value).encode("utf-8")
+
+
+def row_digest(row):
+    """行の値を正規化したバイト列から、固定長（ROW_DIGEST_SIZE バイト）の blake2b ハッシュ値を返します。"""
+    digest = hashlib.blake2b(digest_size=ROW_DIGEST_SIZE)
+    for value in row:
+        encoded = _encode_value(value)
+        # 値の境界が曖昧にならないよう、長さを前置する
+        digest.update(len(encoded).to_bytes(4, "little"))
+        digest.update(encoded)
+    return digest.digest()
+
+
+def digest_counts(rows):
+    """行のイテレーターから、ハッシュ値ごとの行数（多重集合）を返します。"""
+    counts = collections.Counter()
+    for row in rows:
+        counts[row_digest(row)] += 1
+    return counts
+
+
+def collect_rows_by_digest(rows, wanted):
+    """wanted（ハッシュ値 -> 件数）に含まれる行を、件数分だけ読み込み順に返します。"""
+    remaining = collections.Counter(wanted)
+    found = []
+    for row in rows:
+        if not remaining:
+            break
+        digest = row_digest(row)
+        if remaining[digest] > 0:
+            remaining[digest] -= 1
+            if remaining[digest] == 0:
+                del remaining[digest]
+            found.append(row)
+    return found
+
+
+def diff_rows_by_key(result, removed_rows, added_rows, key_indexes):
+    """
+    差分のあった行をキーで突き合わせ、同じキーの行が1行ずつあるものを UPDATED、それ以外を削除/追加として result に追加します。
+    """
+    if not key_indexes:
+        for row in removed_rows:
+            result.add_removed(row)
+        for row in added_rows:
+            result.add_added(row)
+        return result
+    key_of = lambda row: tuple(_sort_value(row[i]) for i in key_indexes)
+    removed_groups = collections.defaultdict(list)
+    added_groups = collections.defaultdict(list)
+    for row in removed_rows:
+        removed_groups[key_of(row)].append(row)
+    for row in added_rows:
+        added_groups[key_of(row)].append(row)
+    for key in list(removed_groups) + [key for key in added_groups if key not in removed_groups]:
+        rows1, rows2 = removed_groups.get(key, []), added_groups.get(key, [])
+        if len(rows1) == 1 and len(rows2) == 1:
+            _diff_group(result, result.columns, key_indexes, rows1, rows2)
+            continue
+        for row in rows1:
+            result.add_removed(row)
+        for row in rows2:
+            result.add_added(row)
+    return result
+
+
+def diff_table_digest(conn1, conn2, table, batch_size=5000, logger=None):
+    """
+    1つのテーブルを行のハッシュ値の多重集合で比較し、TableDiff を返します。
+
+    1回目の読み込みではハッシュ値のみを保持し、差分のあったハッシュ値の行だけを2回目の読み込みで取得します。
+    重複した行も件数として区別されます。主キーがある場合は、同じキーの行を UPDATED として報告します。
+    """
+    columns, key_columns = plan_table_comparison(conn1, conn2, table)
+    if columns is None:
+        if logger:
+            logger.warning(f"テーブル {table} の列構成が異なります。")
+        result = TableDiff(table)
+        result.note = "列構成が異なります"
+        columns1, columns2 = _all_columns(conn1, table), _all_columns(conn2, table)
+    else:
+        result = TableDiff(table, columns, key_columns)
+        columns1 = columns2 = columns
+    counts1 = digest_counts(iter_table_rows(conn1, table, columns1, batch_size=batch_size))
+    counts2 = digest_counts(iter_table_rows(conn2, table, columns2, batch_size=batch_size))
+    only1 = counts1 - counts2
+    only2 = counts2 - counts1
+    del counts1, counts2
+    if not only1 and not only2:
+        return result
+
+    removed_rows = collect_rows_by_digest(iter_table_rows(conn1, table, columns1, batch_size=batch_size), only1) if only1 else []
+    added_rows = collect_rows_by_digest(iter_table_rows(conn2, table, columns2, batch_size=batch_size), only2) if only2 else []
+    key_indexes = [columns.index(key) for key in key_columns] if columns is not None else []
+    return diff_rows_by_key(result, removed_rows, added_rows, key_indexes)
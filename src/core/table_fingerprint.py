@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+テーブルの内容を比較する前に、行数と行の順序に依存しない集約ハッシュ値（フィンガープリント）で
+同一のテーブルを判定するモジュールです。
+
+集約ハッシュ値は各行のハッシュ値（row_digest）の総和（2^128 を法とする）で、重複行も区別されます。
+フィンガープリントの計算では行を保持しないため、全件を比較するよりも少ないメモリと時間で済みます。
+値はファイルのパス・サイズ・更新日時をキーとしてキャッシュされるため、変更されていない比較元のファイルは
+2回目以降の読み込みが省略され、変更されたファイルの側だけを読み込んで比較できます。
+"""
+import os
+import json
+import hashlib
+import logging
+
+from src.core.db_operations import get_table_columns, iter_table_rows
+from src.core.export_cache import database_identity
+from src.core.table_diff import row_digest, ROW_DIGEST_SIZE
+from src.constants import TABLE_FINGERPRINT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+_MODULUS = 1 << (ROW_DIGEST_SIZE * 8)
+
+
+def compute_fingerprint(columns, rows):
+    """列名のリストと行のイテレーターから {"columns", "rows", "hash"} のフィンガープリントを返します。"""
+    total = 0
+    count = 0
+    for row in rows:
+        total = (total + int.from_bytes(row_digest(row), "little")) % _MODULUS
+        count += 1
+    columns_hash = hashlib.blake2b("\0".join(column.lower() for column in columns).encode("utf-8"), digest_size=8).hexdigest()
+    return {"columns": columns_hash, "rows": count, "hash": f"{total:0{ROW_DIGEST_SIZE * 2}x}"}
+
+
+def table_fingerprint(conn, table, batch_size=5000):
+    """テーブルを fetchmany で少しずつ読み込み、行を保持せずにフィンガープリントを計算します。"""
+    columns = [name for name, _ in get_table_columns(conn, table)]
+    return compute_fingerprint(columns, iter_table_rows(conn, table, columns, batch_size=batch_size))
+
+
+class FingerprintCache:
+    """
+    データベースファイルごとのフィンガープリントのキャッシュです。
+
+    ファイルのサイズまたは更新日時が記録と異なる場合は、全てのエントリを無効とします。
+    """
+
+    def __init__(self, cache_dir, db_path):
+        self.db_path = db_path
+        self.path = os.path.join(cache_dir, f"{database_identity(db_path)}.json")
+        self.hits = 0
+        self.misses = 0
+        stat = os.stat(db_path)
+        self._state = [stat.st_size, stat.st_mtime_ns]
+        self._tables = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("state") == self._state:
+                    self._tables = data.get("tables", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"フィンガープリントのキャッシュを読み込めませんでした: {self.path} - {e}")
+
+    def get(self, table):
+        fingerprint = self._tables.get(table)
+        if fingerprint is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return fingerprint
+
+    def put(self, table, fingerprint):
+        self._tables[table] = fingerprint
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"database": self.db_path, "state": self._state, "tables": self._tables}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def summary(self):
+        return f"フィンガープリントキャッシュ: ヒット {self.hits}件 / ミス {self.misses}件"
+
+
+def open_fingerprint_cache(db_path, enabled=True):
+    """コマンドから使用する既定の設定のキャッシュを返します。無効な場合は None を返します。"""
+    if not enabled:
+        return None
+    return FingerprintCache(TABLE_FINGERPRINT_CACHE_DIR, db_path)
+
+
+def get_table_fingerprint(conn, table, cache=None, batch_size=5000):
+    """キャッシュにあればその値を、なければテーブルを読み込んで計算したフィンガープリントを返します。"""
+    fingerprint = cache.get(table) if cache is not None else None
+    if fingerprint is None:
+        fingerprint = table_fingerprint(conn, table, batch_size)
+        if cache is not None:
+            cache.put(table, fingerprint)
+    return fingerprint
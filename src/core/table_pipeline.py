@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+2つのデータベースのテーブルを、接続ごとの専用スレッドで同時に読み込みながら比較するモジュールです。
+
+各接続は1つのスレッドからのみ使用されます（pyodbc は接続をスレッド間で共有できませんが、
+fetch の間は GIL を解放するため、2つの接続の読み込みは並行して進みます）。
+テーブル N を比較している間に、両方のスレッドがテーブル N+1 以降を先読みします。
+先読みするテーブル数と、読み込み中・読み込み済み・比較中のデータのおおよその合計サイズには上限を設けます。
+フィンガープリントを使用する場合は、先に全てのテーブルの値を各接続のスレッドで計算し、一致しないテーブルのみを読み込みます。
+"""
+import sys
+import time
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.core.db_operations import get_table_columns, get_primary_key_columns, iter_table_rows
+from src.core.table_diff import TableDiff, choose_comparison_columns, diff_rows_by_key
+from src.core.table_fingerprint import compute_fingerprint
+
+# 行のサイズを見積もる間隔（全ての行を計測すると読み込みが遅くなるため）
+SIZE_SAMPLE_INTERVAL = 256
+
+
+def estimate_row_size(row):
+    """行のタプルとその値が使用するおおよそのバイト数を返します。"""
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+
+class FetchedTable:
+    """1つの接続から読み込んだテーブルの列定義と、行ごとの件数です。"""
+
+    def __init__(self, table, columns, key_columns):
+        self.table = table
+        self.columns = columns
+        self.key_columns = key_columns
+        self.counts = collections.Counter()
+        self.rows = 0
+        self.bytes = 0
+
+
+class BufferedBytes:
+    """
+    読み込み中・読み込み済みで未比較・比較中のテーブルが保持しているおおよそのバイト数です。
+
+    両方の接続の読み込みスレッドから加算され、比較を終えたテーブルの分は release() で差し引かれます。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    @property
+    def value(self):
+        with self._lock:
+            return self._value
+
+    def add(self, size):
+        with self._lock:
+            self._value += size
+
+    def release(self, size):
+        self.add(-size)
+
+
+class SideFetcher:
+    """
+    1つの接続を専用のスレッド（ワーカー1つのスレッドプール）で使用して、テーブルを読み込みます。
+
+    rows / rows_per_second は読み込み中も更新されるため、進捗の表示に使用できます。
+    """
+
+    def __init__(self, conn, batch_size=5000, clock=time.perf_counter):
+        self.conn = conn
+        self.batch_size = batch_size
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="table-fetch")
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.busy_seconds = 0.0
+        self._busy_since = None
+
+    def describe(self, table):
+        """(列名, ODBCデータ型) のリストと主キーの列名のリストを返します。"""
+        return get_table_columns(self.conn, table), get_primary_key_columns(self.conn, table)
+
+    def submit(self, table, buffered=None):
+        """テーブルの読み込みを開始し、FetchedTable の Future を返します。buffered には読み込んだバイト数が加算されます。"""
+        return self._executor.submit(self._fetch, table, buffered)
+
+    def submit_fingerprint(self, table, cache=None):
+        """キャッシュにないテーブルのフィンガープリントを、行を保持せずに計算する Future を返します。"""
+        return self._executor.submit(self._fingerprint, table, cache)
+
+    def _fingerprint(self, table, cache=None):
+        # キャッシュもこのスレッドからのみ使用する
+        fingerprint = cache.get(table) if cache is not None else None
+        if fingerprint is None:
+            columns = [name for name, _ in self.describe(table)[0]]
+            fingerprint = compute_fingerprint(columns, iter_table_rows(self.conn, table, columns, batch_size=self.batch_size))
+            if cache is not None:
+                cache.put(table, fingerprint)
+        return fingerprint
+
+    def _fetch(self, table, buffered=None):
+        with self._lock:
+            self._busy_since = self._clock()
+        try:
+            columns, key_columns = self.describe(table)
+            fetched = FetchedTable(table, columns, key_columns)
+            row_size = 0
+            unreported = 0
+            for row in iter_table_rows(self.conn, table, [name for name, _ in columns], batch_size=self.batch_size):
+                if fetched.rows % SIZE_SAMPLE_INTERVAL == 0:
+                    row_size = estimate_row_size(row)
+                    # 共有のカウンターはロックを伴うため、行のサイズを見積もる間隔でまとめて加算する
+                    if buffered is not None and unreported:
+                        buffered.add(unreported)
+                        unreported = 0
+                fetched.counts[row] += 1
+                fetched.rows += 1
+                fetched.bytes += row_size
+                unreported += row_size
+                self.rows += 1
+            if buffered is not None:
+                buffered.add(unreported)
+            return fetched
+        finally:
+            with self._lock:
+                self.busy_seconds += self._clock() - self._busy_since
+                self._busy_since = None
+
+    @property
+    def rows_per_second(self):
+        """読み込みに要した時間あたりの行数です。"""
+        with self._lock:
+            seconds = self.busy_seconds
+            if self._busy_since is not None:
+                seconds += self._clock() - self._busy_since
+        return self.rows / seconds if seconds > 0 else 0.0
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def compare_fetched_tables(table, fetched1, fetched2):
+    """両方の接続から読み込んだテーブルを行の多重集合として比較し、TableDiff を返します。"""
+    columns, key_columns = choose_comparison_columns(fetched1.columns, fetched2.columns,
+                                                     fetched1.key_columns, fetched2.key_columns)
+    if columns is None:
+        result = TableDiff(table)
+        result.note = "列構成が異なります"
+        key_indexes = []
+    else:
+        result = TableDiff(table, columns, key_columns)
+        key_indexes = [columns.index(key) for key in key_columns]
+    removed_rows = list((fetched1.counts - fetched2.counts).elements())
+    added_rows = list((fetched2.counts - fetched1.counts).elements())
+    return diff_rows_by_key(result, removed_rows, added_rows, key_indexes)
+
+
+def pipelined_table_diffs(fetcher1, fetcher2, tables, max_inflight=2, memory_cap=512 * 1024 * 1024,
+                          use_fingerprints=False, fingerprint_caches=(None, None), on_wait=None, poll_interval=0.2):
+    """
+    tables の各テーブルを両方の接続で同時に読み込み、(テーブル名, TableDiff) を tables の順に返します。
+
+    比較中のテーブルとは別に最大 max_inflight 件のテーブルを先読みします。読み込み中・読み込み済みで未比較・比較中の
+    テーブルのデータの合計が memory_cap バイトを超えている間は、新しいテーブルの読み込みを開始しません
+    （メモリに何も保持していない場合は、memory_cap より大きなテーブルでも1件ずつ読み込みます）。
+    use_fingerprints を指定すると、比較の前に全てのテーブルのフィンガープリントを求め（fingerprint_caches にない側のみ読み込んで
+    計算し、キャッシュに追加します）、一致するテーブルは読み込まずに TableDiff の代わりに None を返します。
+    on_wait は読み込みの完了を待つ間に poll_interval 秒ごとに呼び出されます（進捗の表示用）。
+    """
+    unchanged = set()
+    if use_fingerprints:
+        futures = [(table, fetcher1.submit_fingerprint(table, fingerprint_caches[0]),
+                    fetcher2.submit_fingerprint(table, fingerprint_caches[1])) for table in tables]
+        try:
+            for table, future1, future2 in futures:
+                while wait((future1, future2), timeout=poll_interval).not_done:
+                    if on_wait:
+                        on_wait()
+                if future1.result() == future2.result():
+                    unchanged.add(table)
+        finally:
+            for _, future1, future2 in futures:
+                future1.cancel()
+                future2.cancel()
+
+    queue = collections.deque(tables)
+    pending = collections.deque()
+    buffered = BufferedBytes()
+
+    def submit_more():
+        while queue and len(pending) < max_inflight and buffered.value < memory_cap:
+            table = queue.popleft()
+            if table in unchanged:
+                pending.append((table, None, None))
+            else:
+                pending.append((table, fetcher1.submit(table, buffered), fetcher2.submit(table, buffered)))
+
+    try:
+        while queue or pending:
+            submit_more()
+            table, future1, future2 = pending.popleft()
+            # 比較を始める前に次のテーブルの読み込みを開始する（比較中のテーブルもサイズの上限に含める）
+            submit_more()
+            if future1 is None:
+                yield table, None
+                continue
+            while wait((future1, future2), timeout=poll_interval).not_done:
+                if on_wait:
+                    on_wait()
+            fetched1, fetched2 = future1.result(), future2.result()
+            result = compare_fetched_tables(table, fetched1, fetched2)
+            buffered.release(fetched1.bytes + fetched2.bytes)
+            del fetched1, fetched2, future1, future2
+            yield table, result
+    finally:
+        for _, future1, future2 in pending:
+            for future in (future1, future2):
+                if future is not None:
+                    future.cancel()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+prepare-release で使用する、VBAコードの差分書き換えを行うモジュールです。
+
+モジュール全体を読み込んで DeleteLines + AddFromString で書き戻す代わりに、
+CodeModule.Find で書き換えが必要なモジュールを絞り込み（エクスポートキャッシュのテキストは候補の追加にのみ使用）、
+変更が必要な行だけを ReplaceLine で置き換えます。COM呼び出しの回数と処理時間はモジュールごとに記録されます。
+"""
+import re
+import time
+
+DEBUG_PRINT = "debug.print"
+
+# vbext_ComponentType.vbext_ct_Document（フォーム・レポートのモジュール）
+VBEXT_CT_DOCUMENT = 100
+
+_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+
+def rewrite_line(line, test_conn, prod_conn):
+    """1行分のコードに接続文字列の置換とDebug.Printのコメントアウトを適用した結果を返します。"""
+    new_line = line
+    if test_conn and test_conn in new_line:
+        new_line = new_line.replace(test_conn, prod_conn)
+    if DEBUG_PRINT in new_line.lower() and not new_line.strip().startswith("'"):
+        new_line = "'" + new_line
+    return new_line
+
+
+def needs_rewrite(text, test_conn):
+    """テキストに書き換え対象の文字列が含まれている場合に True を返します。"""
+    return bool(test_conn and test_conn in text) or DEBUG_PRINT in text.lower()
+
+
+def plan_line_changes(text, test_conn, prod_conn):
+    """CodeModule.Lines で取得したテキストから、変更が必要な (行番号, 新しい行) のリストを返します。"""
+    lines = _LINE_BREAK_RE.split(text)
+    if lines and lines[-1] == "":
+        lines.pop()
+    changes = []
+    for line_no, line in enumerate(lines, 1):
+        new_line = rewrite_line(line, test_conn, prod_conn)
+        if new_line != line:
+            changes.append((line_no, new_line))
+    return changes
+
+
+def component_owner(component_name, component_type):
+    """
+    VBComponent の名前と種類から、対応するオブジェクトの (カテゴリ, 名前) を返します。
+
+    "Form_"/"Report_" の接頭辞はドキュメントモジュールの場合のみ取り除きます（標準モジュール "Form_Utils" はモジュールのまま扱います）。
+    """
+    if component_type == VBEXT_CT_DOCUMENT:
+        for prefix, category in (("Form_", "Forms"), ("Report_", "Reports")):
+            if component_name.startswith(prefix):
+                return category, component_name[len(prefix):]
+    return "Modules", component_name
+
+
+def _find(code_module, target, match_case):
+    # Find(対象, 開始行, 開始列, 終了行, 終了列, 単語単位, 大文字小文字, パターン)。
+    # 事前バインディングでは ByRef 引数を含むタプルが返されるため、先頭の結果のみを使う
+    result = code_module.Find(target, 1, 1, -1, -1, False, match_case, False)
+    return bool(result[0] if isinstance(result, tuple) else result)
+
+
+def rewrite_code_module(name, code_module, test_conn, prod_conn, cached_text=None):
+    """
+    1つのコードモジュールを書き換え、処理結果の統計を返します。
+
+    cached_text にエクスポート済みのテキストが渡され、書き換え対象の文字列を含む場合は Find を省略して候補とします。
+    キャッシュの DateModified はVBEでの編集後に更新されないことがあるため、キャッシュで対象外と判定されても必ず Find で確認します。
+    戻り値は {"module", "candidate", "changed_lines", "com_calls", "seconds"} の辞書です。
+    """
+    start = time.perf_counter()
+    com_calls = 0
+    candidate = cached_text is not None and needs_rewrite(cached_text, test_conn)
+    if not candidate:
+        targets = ([(test_conn, True)] if test_conn else []) + [(DEBUG_PRINT, False)]
+        for target, match_case in targets:
+            com_calls += 1
+            if _find(code_module, target, match_case):
+                candidate = True
+                break
+
+    changes = []
+    if candidate:
+        line_count = code_module.CountOfLines
+        com_calls += 1
+        if line_count:
+            text = code_module.Lines(1, line_count)
+            com_calls += 1
+            changes = plan_line_changes(text, test_conn, prod_conn)
+            for line_no, new_line in changes:
+                code_module.ReplaceLine(line_no, new_line)
+                com_calls += 1
+
+    return {
+        "module": name,
+        "candidate": candidate,
+        "changed_lines": len(changes),
+        "com_calls": com_calls,
+        "seconds": time.perf_counter() - start,
+    }
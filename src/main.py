@@ -12,6 +12,8 @@ if project_root not in sys.path:
 
 import typer
 import inspect
+import importlib
+import json
 import sys
 import logging
 import traceback
@@ -22,15 +24,9 @@ from rich.text import Text
 from rich.table import Table
 from rich.align import Align
 
-# --- コマンドのインポート ---
-from src.command.diff import diff
-from src.command.deploy import deploy
-from src.command.export import export
-from src.command.load import load
-from src.command.analyze_usage import analyze_usage
-from src.command.benchmark import benchmark
-from src.command.prepare_release import prepare_release
-from src.command.search import search
+from src.core.session_pool import shutdown_session_pool
+from src.core.connection_pool import get_connection_pool, shutdown_connection_pool
+from src.core.com_profiler import enable_com_profiling, get_com_profiler
 
 # --- アプリケーションのセットアップ ---
 app = typer.Typer(
@@ -45,23 +41,82 @@ console = Console()
 from src.constants import LOG_DIR, LOG_FILE_NAME_ALL
 from src.utils import setup_logging
 
-# --- ロギング設定 ---
-logger = setup_logging(logging.DEBUG, console)
-logger.debug("Application started.")
-logger.debug(f"Log file path: {os.path.join(LOG_DIR, LOG_FILE_NAME_ALL.format(datetime=datetime.now().strftime('%Y%m%d_%H%M%S')))}")
+logger = logging.getLogger(__name__)
 
 # --- コマンド登録 ---
-app.command(name="diff")(diff)
-app.command(name="deploy")(deploy)
-app.command(name="export")(export)
-app.command(name="load")(load)
-app.command(name="analyze-usage")(analyze_usage)
-app.command(name="benchmark")(benchmark)
-app.command(name="prepare-release")(prepare_release)
-app.command(name="search")(search)
+# コマンド名 -> (モジュール, 関数名)。起動時間を短くするため、モジュールは実行するコマンドのものだけを読み込む
+COMMANDS = {
+    "diff": ("src.command.diff", "diff"),
+    "deploy": ("src.command.deploy", "deploy"),
+    "export": ("src.command.export", "export"),
+    "load": ("src.command.load", "load"),
+    "analyze-usage": ("src.command.analyze_usage", "analyze_usage"),
+    "benchmark": ("src.command.benchmark", "benchmark"),
+    "prepare-release": ("src.command.prepare_release", "prepare_release"),
+    "search": ("src.command.search", "search"),
+    "relink": ("src.command.relink", "relink"),
+    "advise-indexes": ("src.command.advise_indexes", "advise_indexes"),
+}
+
+# 値を取るグローバルオプション（コマンド名の特定時に値を読み飛ばす）
+GLOBAL_VALUE_OPTIONS = {"--profile-com-json"}
+
+def register_commands(names=None):
+    """指定されたコマンド（省略時は全てのコマンド）のモジュールを読み込み、アプリケーションに登録します。"""
+    registered = {cmd.name for cmd in app.registered_commands}
+    for name in names or COMMANDS:
+        if name in registered:
+            continue
+        module_name, function_name = COMMANDS[name]
+        module = importlib.import_module(module_name)
+        app.command(name=name)(getattr(module, function_name))
+
+def requested_commands(argv):
+    """コマンドライン引数から実行するコマンドを返します。コマンドが特定できない場合（ヘルプや対話モード）は None を返します。"""
+    args = iter(argv)
+    for arg in args:
+        if arg in GLOBAL_VALUE_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return [arg] if arg in COMMANDS else None
+    return None
+
+# --- COM呼び出しの計測結果 ---
+def report_com_profile(command_name, json_path=None, limit=15):
+    """計測したCOM呼び出しの集計を表示し、json_path が指定されていればJSONとして保存した後、集計をリセットします。"""
+    profiler = get_com_profiler()
+    if profiler is None or command_name is None:
+        return
+    console.print(f"\n[bold]COM呼び出しの計測結果 ({command_name}): {profiler.total_calls}回, {profiler.total_seconds:.3f}秒[/bold]")
+    objects = Table(title="時間のかかったオブジェクト", title_justify="left", show_header=True, header_style="bold")
+    objects.add_column("オブジェクト", style="cyan")
+    objects.add_column("回数", justify="right")
+    objects.add_column("合計 (ms)", style="yellow", justify="right")
+    for row in profiler.slowest_objects(limit):
+        objects.add_row(row["object"], str(row["count"]), f"{row['seconds'] * 1000:.1f}")
+    calls = Table(title="時間のかかった呼び出し", title_justify="left", show_header=True, header_style="bold")
+    calls.add_column("オブジェクト", style="cyan")
+    calls.add_column("メンバー", style="green")
+    calls.add_column("回数", justify="right")
+    calls.add_column("合計 (ms)", style="yellow", justify="right")
+    calls.add_column("平均 (ms)", justify="right")
+    calls.add_column("最大 (ms)", justify="right")
+    for row in profiler.slowest_calls(limit):
+        calls.add_row(row["object"], row["member"], str(row["count"]), f"{row['seconds'] * 1000:.1f}",
+                      f"{row['seconds'] / row['count'] * 1000:.2f}", f"{row['max_seconds'] * 1000:.2f}")
+    console.print(objects)
+    console.print(calls)
+    logger.info(f"COM呼び出しの計測結果 ({command_name}): {profiler.total_calls}回, {profiler.total_seconds:.3f}秒")
+    if json_path:
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"command": command_name, **profiler.to_dict()}, f, ensure_ascii=False, indent=2)
+        console.print(f"[dim]計測結果をJSONで保存しました: {json_path}[/dim]")
+        logger.info(f"COM呼び出しの計測結果を保存しました: {json_path}")
+    profiler.reset()
 
 # --- 対話モード ---
-def run_interactive_mode(ctx: typer.Context):
+def run_interactive_mode(ctx: typer.Context, profile_json: str = None):
     console.rule("[bold blue]対話モード[/bold blue]")
     ascii_art = """
     _                         ____             _  ___ _   
@@ -71,13 +126,21 @@ def run_interactive_mode(ctx: typer.Context):
 /_/   \_\___\___\___||___/___/____/ \___| \_/ |_|\_\_|\__|
                                                           
 """
+    register_commands()
     all_commands = [cmd for cmd in app.registered_commands if cmd.name != 'interactive']
     sorted_commands = sorted(all_commands, key=lambda cmd: cmd.name)
 
     clear_command = 'cls' if os.name == 'nt' else 'clear'
 
+    # 対話モードでは同じファイルに対する連続したコマンドでAccessインスタンスを再利用する
+    from src.core.access_handler import start_access_session_pool
+    session_pool = start_access_session_pool()
+
     try:
         while True:
+            session_pool.evict_idle()
+            if get_connection_pool() is not None:
+                get_connection_pool().evict_idle()
             os.system(clear_command)
 
             title = Align(Text(ascii_art, style="bold"), align="left")
@@ -115,13 +178,20 @@ def run_interactive_mode(ctx: typer.Context):
                         if not Confirm.ask(f"[bold yellow]警告: コマンド '{selected_cmd.name}' は、展開先のディレクトリにある同名のファイルを上書きします。続行しますか？[/bold yellow]"):
                             console.print("[bold red]コマンドの実行がキャンセルされました。[/bold red]")
                             continue # 次のループへ
+                    elif selected_cmd.name == "relink" and not collected_args.get("dry_run"):
+                        if not Confirm.ask(f"[bold yellow]警告: コマンド '{selected_cmd.name}' は、指定されたファイルのリンクテーブルの接続先を変更します。続行しますか？[/bold yellow]"):
+                            console.print("[bold red]コマンドの実行がキャンセルされました。[/bold red]")
+                            continue # 次のループへ
                     elif selected_cmd.name == "prepare-release":
                         if not Confirm.ask(f"[bold yellow]警告: コマンド '{selected_cmd.name}' は、指定されたファイルに接続文字列の置換やデバッグコードの除去を行い、新しいファイルを生成します。続行しますか？[/bold yellow]"):
                             console.print("[bold red]コマンドの実行がキャンセルされました。[/bold red]")
                             continue # 次のループへ
                     
                     console.print("") # コマンド実行前に改行
-                    ctx.invoke(selected_cmd.callback, **collected_args)
+                    try:
+                        ctx.invoke(selected_cmd.callback, **collected_args)
+                    finally:
+                        report_com_profile(selected_cmd.name, profile_json)
                     console.print(f"[bold green]コマンド '{selected_cmd.name}' が実行されました。[/bold green]")
             except (ValueError, TypeError) as e:
                 console.print(f"[bold red]エラー: {e}[/bold red]")
@@ -135,6 +205,13 @@ def run_interactive_mode(ctx: typer.Context):
     except KeyboardInterrupt:
         #os.system(clear_command)
         console.print("[bold yellow]Ctrl+Cが押されました。[/bold yellow]")
+    finally:
+        shutdown_session_pool()
+        logger.debug(f"セッションプールを終了しました。起動: {session_pool.launches}回, 再利用: {session_pool.reuses}回")
+        connection_pool = shutdown_connection_pool()
+        if connection_pool is not None:
+            console.print(f"[dim]{connection_pool.summary()}[/dim]")
+            logger.info(connection_pool.summary())
 
     console.print("対話モードを終了します。")
 
@@ -163,7 +240,7 @@ def collect_args(command_name: str, params: list[typer.models.ParameterInfo]) ->
             prompt_parts.append(f"[dim]（デフォルト: {display_default}）[/dim]")
         prompt_text = " ".join(prompt_parts)
 
-        value_str = Prompt.ask('\n'+prompt_text, default=str(display_default) if display_default is not ... else None)
+        value_str = Prompt.ask('\n'+prompt_text, default=str(display_default) if display_default not in (..., None) else None)
 
         try:
             # If the parameter is required and no value was provided
@@ -196,17 +273,41 @@ def collect_args(command_name: str, params: list[typer.models.ParameterInfo]) ->
 
 # --- メインコールバック ---
 @app.callback(invoke_without_command=True)
-def main(ctx: typer.Context, debug: bool = typer.Option(False, "--debug", help="デバッグモードを有効にし、詳細なエラー情報を表示します。")):
+def main(ctx: typer.Context, debug: bool = typer.Option(False, "--debug", help="デバッグモードを有効にし、詳細なエラー情報を表示します。"),
+         profile_com: bool = typer.Option(False, "--profile-com", help="AccessのCOM呼び出しの回数と時間を計測し、コマンドの終了時に集計を表示します。"),
+         profile_com_json: str = typer.Option(None, "--profile-com-json", help="COM呼び出しの計測結果を保存するJSONファイルのパス（指定すると計測が有効になります）。")):
+    # ログファイルはコマンドを実行するときにのみ作成する（ヘルプの表示では作成しない）
+    if "--help" not in sys.argv[1:]:
+        setup_logging(logging.DEBUG, console)
+        logger.debug("Application started.")
+        logger.debug(f"Log file path: {os.path.join(LOG_DIR, LOG_FILE_NAME_ALL.format(datetime=datetime.now().strftime('%Y%m%d_%H%M%S')))}")
+
     if debug:
         console.print("[bold yellow]デバッグモードが有効です。[/bold yellow]")
         # You can set a global variable or a context object attribute here
         # e.g., ctx.obj = {"debug": True}
 
+    # ODBC接続は1つのプロセス内の全てのコマンドで共有する（対話モードでは連続するコマンド間で再利用される）
+    if "--help" not in sys.argv[1:]:
+        from src.core.db_operations import start_connection_pool
+        start_connection_pool()
+        if ctx.invoked_subcommand is not None:
+            ctx.call_on_close(shutdown_connection_pool)
+
+    if profile_com or profile_com_json:
+        enable_com_profiling()
+        if ctx.invoked_subcommand is not None:
+            ctx.call_on_close(lambda: report_com_profile(ctx.invoked_subcommand, profile_com_json))
+
     if ctx.invoked_subcommand is None:
-        run_interactive_mode(ctx)
+        run_interactive_mode(ctx, profile_com_json)
 
 # --- エントリーポイント ---
 if __name__ == "__main__":
+    # 並列エクスポートのワーカープロセスを実行ファイル（exe）からも起動できるようにする
+    import multiprocessing
+    multiprocessing.freeze_support()
+    register_commands(requested_commands(sys.argv[1:]))
     try:
         app()
     except KeyboardInterrupt:
@@ -217,3 +318,8 @@ if __name__ == "__main__":
         if "--debug" in sys.argv:
             console.print("[bold yellow]デバッグモードのため、詳細なトレースバックを表示します。[/bold yellow]")
             traceback.print_exc()
+elif __name__ != "__mp_main__":
+    # モジュールとして読み込まれた場合（テストなど）は全てのコマンドを登録する。
+    # spawn で起動された並列エクスポートのワーカープロセスは、このファイルを __mp_main__ として読み込み直すため、
+    # コマンドのモジュールを読み込まないよう登録しない
+    register_commands()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 import shutil
+import socket
 import tempfile
 import logging
 from datetime import datetime
@@ -16,8 +17,17 @@ VBA_DIFF_SHEET = "VBA・フォーム差分"
 TABLE_DIFF_HEADERS = ["差分タイプ", "テーブル名", "列1", "列2", "列3", "列4", "列5", "列6", "列7", "列8", "列9", "列10"]
 VBA_DIFF_HEADERS = ["差分マーカー", "差分内容"]
 MAX_DIFF_ROWS = 100
+LOCK_ENTRY_SIZE = 64
 
 # --- Utility Functions ---
+def lock_file_path(db_path):
+    """Returns the path of the lock file (.laccdb or .ldb) for an Access database, or None."""
+    if db_path.lower().endswith('.accdb'):
+        return db_path[:-6] + '.laccdb'
+    elif db_path.lower().endswith('.mdb'):
+        return db_path[:-4] + '.ldb'
+    return None
+
 def is_file_locked(db_path):
     """
     Checks if the Access database file is locked.
@@ -27,11 +37,7 @@ def is_file_locked(db_path):
     if not os.path.exists(db_path):
         return False
     
-    lock_file = None
-    if db_path.lower().endswith('.accdb'):
-        lock_file = db_path[:-6] + '.laccdb'
-    elif db_path.lower().endswith('.mdb'):
-        lock_file = db_path[:-4] + '.ldb'
+    lock_file = lock_file_path(db_path)
 
     if lock_file and os.path.exists(lock_file):
         return True
@@ -43,6 +49,46 @@ def is_file_locked(db_path):
     except PermissionError:
         return True
 
+def read_lock_file_entries(lock_file):
+    """
+    Reads the user entries of an Access lock file as a list of (computer name, user name) tuples.
+    Each entry is 64 bytes: a 32-byte computer name followed by a 32-byte security name, both null-padded.
+    """
+    with open(lock_file, 'rb') as f:
+        data = f.read()
+    entries = []
+    for offset in range(0, len(data) - LOCK_ENTRY_SIZE + 1, LOCK_ENTRY_SIZE):
+        entry = data[offset:offset + LOCK_ENTRY_SIZE]
+        computer = entry[:32].split(b'\0', 1)[0].decode('ascii', errors='replace').strip()
+        user = entry[32:].split(b'\0', 1)[0].decode('ascii', errors='replace').strip()
+        if computer:
+            entries.append((computer, user))
+    return entries
+
+def local_computer_name():
+    # Access records the NetBIOS computer name in the lock file
+    return (os.environ.get('COMPUTERNAME') or socket.gethostname().split('.')[0]).upper()
+
+def is_locked_by_others(db_path, held_by_this_process=False):
+    """
+    Checks if the Access database file is locked by someone other than this process.
+    If this process holds the file open (pooled connections or Access sessions), the lock file alone cannot tell
+    who else has it open, so the lock file entries are compared with this computer instead: the file counts as
+    locked if any entry belongs to another computer, or if it is locked without a readable lock file.
+    Another program on this same computer cannot be told apart from this process by its lock file entry.
+    """
+    if not held_by_this_process:
+        return is_file_locked(db_path)
+    lock_file = lock_file_path(db_path)
+    try:
+        entries = read_lock_file_entries(lock_file) if lock_file else None
+    except OSError:
+        entries = None
+    if entries is None:
+        return is_file_locked(db_path)
+    computer = local_computer_name()
+    return any(entry_computer.upper() != computer for entry_computer, _ in entries)
+
 def sanitize_for_excel(text, is_sheet_name=False):
     if not isinstance(text, str):
         return text
@@ -70,6 +116,11 @@ def handle_com_error(e):
     else:
         console.print(f"[red]エラー詳細: {e}[/red]")
 
+def open_in_browser(path):
+    # webbrowser はレポートを表示するときにのみ読み込む
+    import webbrowser
+    webbrowser.open(path)
+
 def setup_logging(log_level: int, console: Console):
     os.makedirs(LOG_DIR, exist_ok=True)
     log_file_name = LOG_FILE_NAME_ALL.format(datetime=datetime.now().strftime('%Y%m%d_%H%M%S'))
@@ -0,0 +1,55 @@
+from src.core.benchmark_history import BenchmarkHistory, compare_runs, welch_test, t_distribution_sf
+
+
+def _result(name, timings):
+    return {"name": name, "runs": len(timings), "median": sorted(timings)[len(timings) // 2],
+            "mean": sum(timings) / len(timings), "p95": max(timings), "stdev": 0.0, "timings": timings}
+
+
+def test_welch_test_detects_slowdown():
+    """明らかに遅くなった測定値は有意になり、同じ分布の測定値は有意にならないこと"""
+    baseline = [1.00, 1.02, 0.98, 1.01, 0.99, 1.03, 0.97]
+    assert abs(t_distribution_sf(2.228, 10) - 0.025) < 1e-3
+    assert welch_test(baseline, [value * 1.3 for value in baseline])[2] < 0.001
+    assert welch_test(baseline, list(reversed(baseline)))[2] == 0.5
+    assert welch_test([1.0], baseline) is None
+
+
+def test_history_records_runs_and_flags_regressions(tmp_path):
+    """履歴から同じバージョンの最新の実行を取得して比較し、推移に各実行の中央値が含まれること"""
+    db_file = str(tmp_path / "sample.accdb")
+    with BenchmarkHistory(str(tmp_path / "history" / "bench.sqlite3")) as store:
+        base = [0.10, 0.11, 0.09, 0.10, 0.12, 0.10]
+        store.record(db_file, "v1.0", "pc1", [_result("Q_fast", base), _result("Q_slow", base)])
+        store.record(db_file, "v1.0", "pc2", [_result("Q_fast", [9.9] * 5)])
+        current_id = store.record(db_file, "v1.1", "pc1", [_result("Q_fast", base), _result("Q_slow", [v * 1.5 for v in base])])
+
+        baseline_id = store.find_run(db_file, "v1.0", "pc1", before=current_id)
+        assert store.find_run(db_file, "v0.9", "pc1") is None
+        comparisons = compare_runs(store.run_timings(baseline_id), store.run_timings(current_id), threshold=0.10)
+        assert [(c["name"], c["regression"]) for c in comparisons] == [("Q_fast", False), ("Q_slow", True)]
+        assert abs(comparisons[1]["change"] - 0.5) < 1e-9
+
+        trends = store.trends(db_file, "pc1")
+        assert [run["version"] for run in trends["runs"]] == ["v1.0", "v1.1"]
+        assert [round(value, 6) for value in trends["queries"]["Q_slow"]] == [0.10, 0.15]
+
+
+def test_compare_runs_reports_missing_queries():
+    """ベースラインにあり今回の測定値がないクエリは、比較から除外せずに測定失敗として報告されること"""
+    base = [0.10, 0.11, 0.09, 0.10, 0.12, 0.10]
+    comparisons = compare_runs({"Q_ok": base, "Q_error": base, "Q_gone": base}, {"Q_ok": base, "Q_error": [], "Q_new": base})
+    assert [(c["name"], c["missing"], c["regression"]) for c in comparisons] == [
+        ("Q_error", True, False), ("Q_gone", True, False), ("Q_ok", False, False)]
+    assert comparisons[0]["current_mean"] is None and comparisons[0]["change"] is None
+
+
+def test_runs_are_separated_by_kind(tmp_path):
+    """フォームの実行はクエリの実行とは別に、ベースラインの検索と推移の対象になること"""
+    db_file = str(tmp_path / "sample.accdb")
+    with BenchmarkHistory(str(tmp_path / "bench.sqlite3")) as store:
+        query_id = store.record(db_file, "v1.0", "pc1", [_result("Q1", [0.1, 0.1])])
+        form_id = store.record(db_file, "v1.0", "pc1", [_result("frmMain", [0.5, 0.5])], kind="form")
+        assert store.find_run(db_file, "v1.0", "pc1") == query_id
+        assert store.find_run(db_file, "v1.0", "pc1", kind="form") == form_id
+        assert list(store.trends(db_file, "pc1", kind="form")["queries"]) == ["frmMain"]
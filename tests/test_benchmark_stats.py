@@ -0,0 +1,93 @@
+from src.core.benchmark_stats import percentile, reject_outliers, run_adaptive
+
+
+def test_percentile_and_outlier_rejection():
+    """パーセンタイルが線形補間で計算され、大きく外れた測定値が除外されることをテストします。"""
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 99) == 5
+    kept, rejected = reject_outliers([1.0, 1.1, 0.9, 1.0, 1.05, 9.0])
+    assert rejected == [9.0] and len(kept) == 5
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_run_adaptive_excludes_warmup_and_stops_when_ci_is_narrow():
+    """ウォームアップが集計から除外され、信頼区間が狭くなった時点で実行が終了することをテストします。"""
+    timings = iter([5.0] + [1.0, 1.01, 0.99, 1.0, 1.0] + [1.0] * 100)
+    result = run_adaptive("Q", lambda: next(timings), warmup=1, min_runs=5, max_runs=50, target_relative_ci=0.05)
+    assert result.timings == [1.0, 1.01, 0.99, 1.0, 1.0]
+    assert result.to_dict()["median"] == 1.0 and not result.timed_out
+
+
+def test_run_adaptive_stops_at_timeout_and_records_errors():
+    """時間の上限に達すると打ち切られ、実行時のエラーが結果に記録されることをテストします。"""
+    clock = FakeClock()
+
+    def measure():
+        clock.now += 2.0
+        return clock.now % 3
+
+    result = run_adaptive("Q", measure, warmup=0, min_runs=5, max_runs=50, timeout=5, clock=clock)
+    assert result.timed_out and result.runs == 3
+
+    def fail():
+        raise RuntimeError("locked")
+
+    result = run_adaptive("Q", fail, warmup=0)
+    assert result.error == "locked" and result.runs == 0
+
+
+def test_measure_query_breaks_down_execute_and_fetch():
+    """実行と読み込みの時間・行数・転送量が個別に記録され、中央値が集計されることをテストします。"""
+    import sqlite3
+    from src.core.db_operations import measure_query
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE [Q] (ID INTEGER, Name TEXT)")
+    conn.executemany("INSERT INTO [Q] VALUES (?, ?)", [(i, "abcd") for i in range(25)])
+    sample = measure_query(conn, "Q", batch_size=10)
+    assert sample["rows"] == 25 and sample["bytes"] == 25 * (8 + 8)
+    assert sample["seconds"] >= sample["first_row_seconds"] >= sample["execute_seconds"]
+
+    result = run_adaptive("Q", lambda: measure_query(conn, "Q"), warmup=0, min_runs=3, max_runs=3)
+    assert len(result.samples) == 3 and result.to_dict()["metrics"]["rows"] == 25
+
+
+def test_measure_query_binds_parameters_and_counts_affected_rows():
+    """パラメーターを CALL 構文でバインドし、アクションクエリの影響行数を記録することをテストします。"""
+    from src.core.db_operations import measure_query
+
+    class Cursor:
+        description = None
+        rowcount = 120
+
+        def __init__(self, executed):
+            self.executed = executed
+
+        def execute(self, sql, *params):
+            self.executed.append((sql, params))
+
+        def close(self):
+            pass
+
+    class Connection:
+        def __init__(self):
+            self.executed = []
+
+        def cursor(self):
+            return Cursor(self.executed)
+
+    conn = Connection()
+    ticks = iter(range(100))
+    sample = measure_query(conn, "qry更新", params=("2024-01-01", 5), clock=lambda: next(ticks))
+    assert conn.executed == [("{CALL [qry更新](?, ?)}", (("2024-01-01", 5),))]
+    assert sample["affected_rows"] == 120 and sample["rows"] == 0
+    assert sample["affected_rows_per_second"] == 120 / sample["seconds"]
+    measure_query(conn, "qry削除", call=True)
+    assert conn.executed[-1] == ("{CALL [qry削除]}", ())
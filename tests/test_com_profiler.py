@@ -0,0 +1,74 @@
+from src.core.com_profiler import ComProfiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.5
+        return self.now
+
+
+class FakeForm:
+    def __init__(self, name):
+        self.Name = name
+
+
+class FakeCollection:
+    def __init__(self, items):
+        self._items = items
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class FakeProject:
+    def __init__(self):
+        self.AllForms = FakeCollection([FakeForm("frmMain"), FakeForm("frmSub")])
+
+
+class FakeApplication:
+    """Access.Application の代わりに使用するオブジェクトです。"""
+
+    def __init__(self):
+        self.CurrentProject = FakeProject()
+        self.Visible = True
+        self.saved = []
+
+    def SaveAsText(self, object_type, name, path):
+        self.saved.append((object_type, name, path))
+
+
+def test_profiler_counts_calls_by_object_and_member():
+    """メソッド呼び出し、プロパティ、列挙がオブジェクトとメンバーごとに集計されることをテストします。"""
+    profiler = ComProfiler(clock=FakeClock())
+    fake = FakeApplication()
+    app = profiler.wrap(fake)
+
+    for form in app.CurrentProject.AllForms:
+        app.SaveAsText(2, form.Name, f"{form.Name}.frm")
+    app.Visible = False
+
+    calls = {(row["object"], row["member"]): row["count"] for row in profiler.slowest_calls()}
+    assert calls[("Application", "SaveAsText()")] == 2
+    assert calls[("Application", "CurrentProject")] == 1
+    assert calls[("Application.CurrentProject.AllForms", "__iter__")] == 3
+    assert calls[("Application.CurrentProject.AllForms[]", "Name")] == 4
+    assert calls[("Application", "Visible=")] == 1
+    assert fake.saved == [(2, "frmMain", "frmMain.frm"), (2, "frmSub", "frmSub.frm")]
+    assert fake.Visible is False
+
+
+def test_profiler_summary_and_json():
+    profiler = ComProfiler(clock=FakeClock())
+    app = profiler.wrap(FakeApplication())
+    app.SaveAsText(2, "frmMain", "a.frm")
+
+    data = profiler.to_dict()
+    assert data["total_calls"] == 1
+    assert data["objects"] == [{"object": "Application", "count": 1, "seconds": 0.5}]
+    assert data["calls"][0]["member"] == "SaveAsText()"
+
+    profiler.reset()
+    assert profiler.total_calls == 0
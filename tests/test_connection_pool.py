@@ -0,0 +1,111 @@
+import threading
+
+from src.core.connection_pool import ConnectionPool
+from src.utils import is_locked_by_others, read_lock_file_entries
+
+
+class FakeConnection:
+    def __init__(self, path, readonly):
+        self.path = path
+        self.readonly = readonly
+        self.closed = False
+        self.alive = True
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pool(**kwargs):
+    created = []
+
+    def connect(path, readonly):
+        created.append(FakeConnection(path, readonly))
+        return created[-1]
+
+    pool = ConnectionPool(connect, validate=lambda conn: conn.alive, **kwargs)
+    return pool, created
+
+
+def test_connection_pool_reuses_by_path_and_mode():
+    """同じパス・モードの接続は再利用され、読み取り専用かどうかで別の接続になることをテストします。"""
+    pool, created = _pool()
+    with pool.connection("C:/db/a.accdb") as conn1:
+        pass
+    with pool.connection("C:/db/a.accdb") as conn2:
+        assert conn2 is conn1
+    with pool.connection("C:/db/a.accdb", readonly=True) as conn3:
+        assert conn3 is not conn1 and conn3.readonly
+    assert (pool.opens, pool.reuses) == (2, 1)
+    assert conn1.rollbacks == 2
+    assert pool.holds("C:/db/a.accdb")
+
+    assert pool.close("C:/db/a.accdb") == 2
+    assert all(conn.closed for conn in created)
+    assert not pool.holds("C:/db/a.accdb")
+
+
+def test_connection_pool_replaces_invalid_idle_and_failed_connections():
+    """検証に失敗した接続・アイドル時間を超えた接続・エラーが発生した接続が作り直されることをテストします。"""
+    clock = FakeClock()
+    pool, created = _pool(idle_timeout=10, clock=clock)
+    with pool.connection("a.accdb") as conn:
+        pass
+    conn.alive = False
+    with pool.connection("a.accdb") as conn2:
+        assert conn2 is not conn and conn.closed
+    clock.now = 20
+    with pool.connection("a.accdb") as conn3:
+        assert conn3 is not conn2 and conn2.closed
+    try:
+        with pool.connection("a.accdb"):
+            raise RuntimeError("query failed")
+    except RuntimeError:
+        pass
+    assert conn3.closed
+    assert pool.opens == 3 and pool.discarded == 1
+
+
+def test_connection_pool_waits_when_max_size_is_reached():
+    """上限まで使用中の場合は、返却されるまで待機することをテストします。"""
+    pool, created = _pool(max_size=1)
+    results = []
+    with pool.connection("a.accdb") as conn:
+        thread = threading.Thread(target=lambda: results.append(pool._acquire("a.accdb", False)))
+        thread.start()
+        thread.join(timeout=0.1)
+        assert thread.is_alive()
+    thread.join(timeout=5)
+    assert results[0][1].conn is conn
+    assert pool.waits == 1 and len(created) == 1
+
+
+def _lock_entry(computer, user="Admin"):
+    return computer.encode("ascii").ljust(32, b"\0") + user.encode("ascii").ljust(32, b"\0")
+
+
+def test_lock_held_by_this_process_still_detects_other_computers(tmp_path, monkeypatch):
+    """このプロセスが接続を保持していても、他のコンピューターのロックファイルのエントリは検出されることをテストします。"""
+    monkeypatch.setenv("COMPUTERNAME", "PC01")
+    db_path = tmp_path / "app.accdb"
+    db_path.write_bytes(b"db")
+    lock_path = tmp_path / "app.laccdb"
+    lock_path.write_bytes(_lock_entry("PC01"))
+
+    assert read_lock_file_entries(str(lock_path)) == [("PC01", "Admin")]
+    assert is_locked_by_others(str(db_path))
+    assert not is_locked_by_others(str(db_path), held_by_this_process=True)
+
+    lock_path.write_bytes(_lock_entry("pc01") + _lock_entry("PC02", "tanaka"))
+    assert is_locked_by_others(str(db_path), held_by_this_process=True)
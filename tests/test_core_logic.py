@@ -1,7 +1,7 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from src.core.access_handler import access_application, export_objects
-from src.core.db_operations import db_connection, get_table_names, get_table_data, run_benchmark
+from src.core.db_operations import db_connection, get_table_names, get_table_data
 from src.core.reporting import create_diff_report
 import os
 import openpyxl
@@ -149,19 +149,6 @@ def test_get_table_data_mock():
     assert table_data == {("Data1", 1), ("Data2", 2)}
     mock_cursor.execute.assert_called_once_with("SELECT * FROM [TestTable]")
 
-# run_benchmark のモック化の例
-def test_run_benchmark_mock():
-    mock_conn = MagicMock()
-    mock_cursor = MagicMock()
-    mock_conn.cursor.return_value = mock_cursor
-
-    # time.perf_counter をモックして、常に同じ時間を返すようにする
-    with patch('src.core.db_operations.time.perf_counter', side_effect=[0, 1, 1, 2, 2, 3, 3, 4, 4, 5]): # 実行ごとに1秒かかるように設定
-        timings = run_benchmark(mock_conn, "TestQuery", 5)
-        assert timings == [1.0, 1.0, 1.0, 1.0, 1.0]
-        assert mock_cursor.execute.call_count == 5
-        assert mock_cursor.fetchall.call_count == 5
-
 # create_diff_report のテスト
 def test_create_diff_report(tmp_path):
     output_file = tmp_path / "report.xlsx"
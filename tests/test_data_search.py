@@ -0,0 +1,57 @@
+import sqlite3
+import contextlib
+
+from src.core.data_search import TableDataSearch, build_search_sql, escape_like
+from src.core.search_engine import compile_search_pattern
+
+
+def test_build_search_sql_pushes_like_over_text_columns():
+    """テキスト列ごと・キーワードごとの LIKE 条件が組み立てられ、ワイルドカードがエスケープされることをテストします。"""
+    sql, params = build_search_sql("顧客", ["Name", "Memo"], ["ID"], ["50%"])
+    assert sql == "SELECT [ID], [Name], [Memo] FROM [顧客] WHERE [Name] LIKE ? OR [Memo] LIKE ?"
+    assert params == ["%50[%]%", "%50[%]%"]
+    assert escape_like("a_b[c") == "a[_]b[[]c"
+    assert build_search_sql("T", ["Name"], [], None) == ("SELECT [Name] FROM [T]", [])
+
+
+class SqliteDataSearch(TableDataSearch):
+    """sqlite3 には cursor.columns() がないため、列定義を PRAGMA から取得します。"""
+
+    def text_columns(self, conn, table):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info([{table}])") if row[2] == "TEXT"]
+
+    def key_columns(self, conn, table):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info([{table}])") if row[5]]
+
+
+def test_table_data_search_reads_only_matching_rows_on_separate_connections(tmp_path):
+    """一致した値だけが、テーブルの順にキーの値とともに返されることをテストします。"""
+    db_path = tmp_path / "data.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE [Customers] (ID INTEGER PRIMARY KEY, Name TEXT, Amount INTEGER)")
+    conn.executemany("INSERT INTO [Customers] VALUES (?, ?, ?)", [(1, "Tokyo", 10), (2, "Osaka", 20), (3, "tokyo tower", 30)])
+    conn.execute("CREATE TABLE [Orders] (ID INTEGER PRIMARY KEY, Note TEXT)")
+    conn.executemany("INSERT INTO [Orders] VALUES (?, ?)", [(1, "ship to Tokyo"), (2, "none")])
+    conn.commit()
+    conn.close()
+
+    opened = []
+
+    @contextlib.contextmanager
+    def open_connection():
+        connection = sqlite3.connect(db_path, check_same_thread=False)
+        opened.append(connection)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    matcher = compile_search_pattern(["tokyo"])
+    results = list(SqliteDataSearch(open_connection, matcher, ["tokyo"], workers=2).iter_search(["Customers", "Orders"]))
+
+    assert [(r["name"], r["column_name"], r["line_content"]) for r in results] == [
+        ("Customers", "Name", "ID=1: Tokyo"),
+        ("Customers", "Name", "ID=3: tokyo tower"),
+        ("Orders", "Note", "ID=1: ship to Tokyo"),
+    ]
+    assert len(opened) == 2
@@ -0,0 +1,118 @@
+import os
+import time
+
+from src.core.export_cache import ExportCache, GARBAGE_GRACE_SECONDS
+
+
+def test_cache_hit_and_miss(tmp_path):
+    """DateModified が同じ場合はキャッシュから返され、変わった場合はミスになることをテストします。"""
+    cache = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    assert cache.get("Forms", "frmMain", "2024-01-01 10:00:00") is None
+    cache.put("Forms", "frmMain", "2024-01-01 10:00:00", b"form text")
+    cache.save()
+
+    reopened = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    assert reopened.get("Forms", "frmMain", "2024-01-01 10:00:00") == b"form text"
+    assert reopened.get("Forms", "frmMain", "2024-02-01 10:00:00") is None
+    assert (reopened.hits, reopened.misses) == (1, 1)
+
+
+def test_cache_is_keyed_by_database(tmp_path):
+    cache = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    cache.put("Modules", "Module1", "d1", b"code")
+    cache.save()
+
+    other = ExportCache(str(tmp_path), "C:/work/other.accdb")
+    assert other.get("Modules", "Module1", "d1") is None
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    cache = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    cache.put("Queries", "qry1", "d1", b"SELECT 1")
+    cache.put("Queries", "qry2", "d1", b"SELECT 1")
+    cache.save()
+
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 1
+
+
+def test_evict_by_age_and_size(tmp_path):
+    cache = ExportCache(str(tmp_path), "C:/work/app.accdb", max_bytes=10, max_age_days=1)
+    cache.put("Forms", "old", "d1", b"12345")
+    cache.put("Forms", "a", "d1", b"123456")
+    cache.put("Forms", "b", "d1", b"1234567")
+    cache._entries["Forms/old"]["accessed"] -= 2 * 24 * 60 * 60
+    cache._entries["Forms/a"]["accessed"] -= 10
+    cache.save()
+
+    assert cache.get("Forms", "old", "d1") is None
+    assert cache.get("Forms", "a", "d1") is None
+    assert cache.get("Forms", "b", "d1") == b"1234567"
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 1
+
+
+def test_size_limit_applies_to_shared_blob_store(tmp_path):
+    """上限サイズがデータベースごとではなく、全てのデータベースで共有する本体の合計に適用されることをテストします。"""
+    first = ExportCache(str(tmp_path), "C:/work/app.accdb", max_bytes=10)
+    first.put("Forms", "a", "d1", b"123456")
+    first._entries["Forms/a"]["accessed"] -= 10
+    first.save()
+
+    second = ExportCache(str(tmp_path), "C:/work/other.accdb", max_bytes=10)
+    second.put("Forms", "same", "d1", b"123456")
+    second.put("Forms", "b", "d1", b"1234567")
+    second._entries["Forms/same"]["accessed"] -= 5
+    second.save()
+
+    # 共有されている本体は、参照している全てのエントリが削除されるまで残る
+    assert ExportCache(str(tmp_path), "C:/work/app.accdb").get("Forms", "a", "d1") is None
+    assert second.get("Forms", "same", "d1") is None
+    assert second.get("Forms", "b", "d1") == b"1234567"
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 1
+
+
+def test_unreferenced_blobs_are_swept(tmp_path):
+    """索引が削除されて参照されなくなった本体が、猶予時間の経過後に削除されることをテストします。"""
+    orphan = ExportCache(str(tmp_path), "C:/work/deleted.accdb")
+    orphan.put("Forms", "a", "d1", b"orphan")
+    orphan.save()
+    os.remove(orphan._index_path)
+    orphan_blob = orphan._blob_path(next(iter(orphan._entries.values()))["hash"])
+    old = time.time() - GARBAGE_GRACE_SECONDS - 10
+    os.utime(orphan_blob, (old, old))
+
+    cache = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    cache.put("Forms", "b", "d1", b"kept")
+    cache.save()
+
+    assert not os.path.exists(orphan_blob)
+    assert cache.get("Forms", "b", "d1") == b"kept"
+
+
+def test_eviction_keeps_entries_saved_concurrently_by_another_database(tmp_path, monkeypatch):
+    """エビクションの後に他のデータベースの索引へ保存されたエントリが、索引の書き換えで失われないことをテストします。"""
+    first = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    first.put("Forms", "a", "d1", b"123456")
+    first._entries["Forms/a"]["accessed"] -= 10
+    first.save()
+
+    second = ExportCache(str(tmp_path), "C:/work/other.accdb", max_bytes=10)
+    second.put("Forms", "b", "d1", b"1234567")
+    write_index = second._write_index
+
+    def write_and_interleave(index_path, entries):
+        write_index(index_path, entries)
+        if index_path == second._index_path:
+            # エビクションの後、他のデータベースの索引が書き換えられる前に、別のプロセスが新しいエントリを保存する
+            first.put("Forms", "new", "d1", b"new")
+            write_index(first._index_path, first._entries)
+
+    monkeypatch.setattr(second, "_write_index", write_and_interleave)
+    second.save()
+
+    reopened = ExportCache(str(tmp_path), "C:/work/app.accdb")
+    assert reopened.get("Forms", "a", "d1") is None
+    assert reopened.get("Forms", "new", "d1") == b"new"
+    assert not os.path.exists(tmp_path / "index.lock")
@@ -0,0 +1,139 @@
+import os
+
+from src.core.export_manifest import (
+    ExportManifest, file_hash, plan_incremental_export, apply_incremental_export, remove_exported_files,
+    estimate_saved_seconds, list_exported_files, plan_incremental_load,
+)
+
+EXTENSIONS = {"Forms": ".frm", "Modules": ".bas"}
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _export(tmp_path, manifest, catalog, contents, durations=None):
+    staging = tmp_path / "staging"
+    staging.mkdir(exist_ok=True)
+    to_export, skipped, removed = plan_incremental_export(catalog, manifest, EXTENSIONS)
+    for category, name, _ in to_export:
+        _write(staging / f"{name}{EXTENSIONS[category]}", contents[name])
+    written, identical = apply_incremental_export(str(staging), manifest, to_export, EXTENSIONS, durations)
+    remove_exported_files(manifest, removed, keep=written + identical)
+    manifest.save(database="db.accdb")
+    return to_export, skipped, removed, written, identical
+
+
+def test_incremental_export_skips_unchanged_objects(tmp_path):
+    """DateModified とファイル内容が変わっていないオブジェクトがスキップされることをテストします。"""
+    out = tmp_path / "out"
+    out.mkdir()
+    catalog = [("Forms", "frmMain", "2024-01-01"), ("Modules", "Module1", "2024-01-01")]
+    contents = {"frmMain": "form v1", "Module1": "module v1"}
+    _export(tmp_path, ExportManifest(str(out)), catalog, contents, {("Forms", "frmMain"): 2.0, ("Modules", "Module1"): 1.0})
+
+    manifest = ExportManifest(str(out))
+    assert manifest.database == "db.accdb"
+    catalog[1] = ("Modules", "Module1", "2024-02-01")
+    contents["Module1"] = "module v2"
+    to_export, skipped, removed, written, identical = _export(tmp_path, manifest, catalog, contents)
+
+    assert [name for _, name, _ in to_export] == ["Module1"]
+    assert [name for _, name, _ in skipped] == ["frmMain"]
+    assert written == ["Module1.bas"] and identical == [] and removed == []
+    assert estimate_saved_seconds(manifest, skipped, EXTENSIONS) == 2.0
+    assert (out / "Module1.bas").read_text(encoding="utf-8") == "module v2"
+
+
+def test_identical_content_keeps_file_untouched(tmp_path):
+    """DateModified だけが変わり内容が同じ場合は、ファイルを書き換えないことをテストします。"""
+    out = tmp_path / "out"
+    out.mkdir()
+    catalog = [("Forms", "frmMain", "2024-01-01")]
+    _export(tmp_path, ExportManifest(str(out)), catalog, {"frmMain": "same"})
+    target = out / "frmMain.frm"
+    os.utime(target, ns=(1_000_000_000, 1_000_000_000))
+    manifest = ExportManifest(str(out))
+    manifest.record("frmMain.frm", "Forms", "frmMain", "2024-01-01")
+
+    _, _, _, written, identical = _export(tmp_path, manifest, [("Forms", "frmMain", "2024-03-01")], {"frmMain": "same"})
+
+    assert written == [] and identical == ["frmMain.frm"]
+    assert target.stat().st_mtime_ns == 1_000_000_000
+    assert manifest.entries["frmMain.frm"]["modified"] == "2024-03-01"
+
+
+def test_edited_file_and_removed_object(tmp_path):
+    """出力ファイルが手動で変更された場合は再エクスポートし、削除されたオブジェクトのファイルは削除されることをテストします。"""
+    out = tmp_path / "out"
+    out.mkdir()
+    catalog = [("Forms", "frmMain", "2024-01-01"), ("Modules", "Module1", "2024-01-01")]
+    contents = {"frmMain": "form", "Module1": "module"}
+    _export(tmp_path, ExportManifest(str(out)), catalog, contents)
+    _write(out / "frmMain.frm", "edited by hand")
+
+    to_export, _, removed, written, _ = _export(tmp_path, ExportManifest(str(out)), catalog[:1], contents)
+
+    assert [name for _, name, _ in to_export] == ["frmMain"]
+    assert written == ["frmMain.frm"]
+    assert removed == ["Module1.bas"]
+    assert not (out / "Module1.bas").exists()
+    assert (out / "frmMain.frm").read_text(encoding="utf-8") == "form"
+
+
+def test_case_only_rename_keeps_exported_file(tmp_path):
+    """大文字小文字だけの名前変更で、エクスポートしたファイルが削除されないことをテストします。"""
+    out = tmp_path / "out"
+    out.mkdir()
+    _export(tmp_path, ExportManifest(str(out)), [("Forms", "frmA", "2024-01-01")], {"frmA": "form v1"})
+
+    manifest = ExportManifest(str(out))
+    to_export, _, removed, _, _ = _export(tmp_path, manifest, [("Forms", "FrmA", "2024-02-01")], {"FrmA": "form v2"})
+
+    assert [name for _, name, _ in to_export] == ["FrmA"] and removed == []
+    assert list(manifest.entries) == ["FrmA.frm"]
+    assert [path.name.casefold() for path in out.glob("*.frm")] == ["frma.frm"]
+
+
+def test_remove_exported_files_keeps_written_files(tmp_path):
+    """同じ実行で書き込んだファイルは、削除対象と大文字小文字だけが異なる場合でも削除しないことをテストします。"""
+    _write(tmp_path / "FrmA.frm", "new")
+    manifest = ExportManifest(str(tmp_path))
+    manifest.entries["frmA.frm"] = {"hash": "old"}
+
+    remove_exported_files(manifest, ["frmA.frm"], keep=["FrmA.frm"])
+
+    assert (tmp_path / "FrmA.frm").exists() and manifest.entries == {}
+
+
+def test_list_exported_files_in_import_order(tmp_path):
+    """モジュールがフォーム/レポートより先にインポートされる順序で並ぶことをテストします。"""
+    for filename in ("frmMain.frm", "rptSales.rpt", "Module1.bas", "qryMain.qry", ".export_manifest.json"):
+        _write(tmp_path / filename, "x")
+    extensions = {"Forms": ".frm", "Reports": ".rpt", "Macros": ".mcr", "Modules": ".bas", "Queries": ".qry"}
+
+    files = list_exported_files(str(tmp_path), extensions)
+
+    assert [filename for _, _, filename in files] == ["Module1.bas", "qryMain.qry", "rptSales.rpt", "frmMain.frm"]
+
+
+def test_plan_incremental_load(tmp_path):
+    """記録と同じ内容のファイルはスキップし、変更・新規・記録なしのファイルを分類することをテストします。"""
+    for filename, text in (("Module1.bas", "module"), ("frmMain.frm", "form v2"), ("frmNew.frm", "new"), ("frmOther.frm", "other")):
+        _write(tmp_path / filename, text)
+    manifest = ExportManifest(str(tmp_path))
+    manifest.record_load("target.accdb", "Module1.bas", file_hash(str(tmp_path / "Module1.bas")), "2024-01-01")
+    manifest.record_load("target.accdb", "frmMain.frm", "old-hash", "2024-01-01")
+    files = list_exported_files(str(tmp_path), EXTENSIONS)
+    catalog = [("Modules", "module1", "2024-01-01"), ("Forms", "frmMain", "2024-01-01"), ("Forms", "frmOther", "2024-01-01")]
+
+    to_load, skipped, unverified = plan_incremental_load(files, manifest, "target.accdb", catalog)
+
+    assert [item[2] for item in skipped] == ["Module1.bas"]
+    assert [item[2] for item in to_load] == ["frmMain.frm", "frmNew.frm"]
+    assert [item[2] for item in unverified] == ["frmOther.frm"]
+
+    # インポート先の DateModified が記録と異なる場合は、Access側で変更されたとみなしてインポートする
+    to_load, skipped, _ = plan_incremental_load(files, manifest, "target.accdb", [("Modules", "Module1", "2024-05-01")])
+    assert "Module1.bas" in [item[2] for item in to_load]
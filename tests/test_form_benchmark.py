@@ -0,0 +1,81 @@
+from src.core.form_benchmark import benchmark_form, record_source_sql, AC_HIDDEN, FORM_METRIC_KEYS
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRecordset:
+    def __init__(self, clock, count):
+        self.clock = clock
+        self.count = count
+        self.BOF = self.EOF = count == 0
+        self.RecordCount = 1 if count else 0
+
+    def MoveLast(self):
+        self.clock.now += 0.3
+        self.RecordCount = self.count
+
+
+class FakeForm:
+    def __init__(self, clock, record_source, count):
+        self.RecordSource = record_source
+        self.RecordsetClone = FakeRecordset(clock, count)
+
+
+class FakeDoCmd:
+    def __init__(self, app):
+        self.app = app
+
+    def OpenForm(self, name, view, filter_name, where, data_mode, window_mode):
+        self.app.calls.append(("open", name, window_mode))
+        self.app.clock.now += 0.1
+        self.app.open_forms[name] = FakeForm(self.app.clock, *self.app.definitions[name])
+
+    def Close(self, object_type, name, save):
+        self.app.calls.append(("close", name))
+        self.app.clock.now += 0.05
+        del self.app.open_forms[name]
+
+
+class FakeApplication:
+    def __init__(self, clock, definitions):
+        self.clock = clock
+        self.definitions = definitions
+        self.open_forms = {}
+        self.calls = []
+        self.DoCmd = FakeDoCmd(self)
+
+    def Forms(self, name):
+        return self.open_forms[name]
+
+
+def test_benchmark_form_times_open_and_population_separately():
+    """フォームを非表示で開き、全レコードの読み込みまでを測定して毎回閉じることをテストします。"""
+    clock = FakeClock()
+    app = FakeApplication(clock, {"frm受注": ("qry受注一覧", 5000), "frmメニュー": ("", 0)})
+
+    result, record_source = benchmark_form(app, "frm受注", warmup=1, min_runs=3, max_runs=3, clock=clock)
+    assert record_source == "qry受注一覧"
+    assert result.runs == 3 and app.calls.count(("close", "frm受注")) == 4
+    assert all(call[2] == AC_HIDDEN for call in app.calls if call[0] == "open")
+    assert not app.open_forms
+    stats = result.to_dict()
+    assert abs(stats["median"] - 0.4) < 1e-9
+    assert abs(stats["metrics"]["open_seconds"] - 0.1) < 1e-9 and abs(stats["metrics"]["populate_seconds"] - 0.3) < 1e-9
+    assert stats["metrics"]["records"] == 5000
+    assert list(stats["metrics"]) == list(FORM_METRIC_KEYS)
+
+    result, record_source = benchmark_form(app, "frmメニュー", warmup=0, min_runs=2, max_runs=2, clock=clock)
+    assert record_source == "" and result.to_dict()["metrics"]["records"] == 0
+
+
+def test_record_source_sql():
+    """レコードソースのテーブル名・クエリ名・SQLが、件数の確認に使うSELECT文に変換されることをテストします。"""
+    assert record_source_sql("qry受注一覧") == "SELECT * FROM [qry受注一覧]"
+    assert record_source_sql("[tbl 顧客]") == "SELECT * FROM [tbl 顧客]"
+    assert record_source_sql("SELECT * FROM tbl受注 WHERE 状態=1;") == "SELECT * FROM tbl受注 WHERE 状態=1"
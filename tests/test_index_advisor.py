@@ -0,0 +1,98 @@
+from src.core.index_advisor import parse_query_sql, rank_index_suggestions, extract_sql_from_query_text, validate_suggestion
+
+ORDERS_SQL = """PARAMETERS [開始日] DateTime;
+SELECT o.*, c.[顧客名], Year(o.受注日) AS 年
+FROM (tblOrders AS o INNER JOIN [tbl Customers] c ON o.CustomerID = c.[ID])
+LEFT JOIN tblItems ON tblItems.OrderID = o.OrderID
+WHERE o.Status IN ('A','B') AND o.受注日 >= [開始日] AND c.Region = [Forms]![frmMain]![txtRegion] AND Amount > 100
+ORDER BY o.受注日 DESC, c.[顧客名];"""
+
+TABLE_COLUMNS = {
+    "tblOrders": ["OrderID", "CustomerID", "Status", "受注日", "Amount"],
+    "tbl Customers": ["ID", "顧客名", "Region"],
+    "tblItems": ["ItemID", "OrderID", "Qty"],
+}
+
+
+def test_parse_query_sql_resolves_aliases_and_clauses():
+    """別名の解決、句の種類の判定、パラメーター・フォーム参照・関数の除外をテストします。"""
+    parsed = parse_query_sql(ORDERS_SQL, TABLE_COLUMNS)
+    assert parsed["tables"] == ["tblOrders", "tbl Customers", "tblItems"]
+    assert parsed["columns"] == [
+        ("tblOrders", "CustomerID", "join"), ("tbl Customers", "ID", "join"),
+        ("tblItems", "OrderID", "join"), ("tblOrders", "OrderID", "join"),
+        ("tblOrders", "Status", "where"), ("tblOrders", "受注日", "where"),
+        ("tbl Customers", "Region", "where"), ("tblOrders", "Amount", "where"),
+        ("tblOrders", "受注日", "order"), ("tbl Customers", "顧客名", "order"),
+    ]
+    single = parse_query_sql("SELECT * FROM tblA WHERE Name Like 'a*' AND [Code] = 1 ORDER BY 2, Name")
+    assert single["columns"] == [("tblA", "Name", "where"), ("tblA", "Code", "where"), ("tblA", "Name", "order")]
+
+
+def test_extract_sql_from_query_text():
+    text = 'Operation =1\nOption =0\ndbMemo "SQL" ="SELECT * FROM t WHERE a=\\"x\\";\\015\\012"\n'
+    assert extract_sql_from_query_text(text) == 'SELECT * FROM t WHERE a="x";\r\n'
+    assert extract_sql_from_query_text("Operation =1\n") is None
+
+
+def test_rank_index_suggestions_skips_indexed_columns_and_weights_rows():
+    """既存インデックスの先頭列は除外し、使用回数と行数でスコアが決まることをテストします。"""
+    queries = {
+        "qryOrders": ORDERS_SQL,
+        "qryOpenOrders": "SELECT * FROM tblOrders WHERE Status = 'A' ORDER BY 受注日",
+        "qryItems": "SELECT * FROM tblItems WHERE Qty > 10",
+    }
+    indexes = {"tblOrders": [["OrderID"], ["受注日", "Status"]], "tbl Customers": [["ID"]], "tblItems": [["ItemID"]]}
+    rows = {"tblOrders": 100000, "tbl Customers": 500, "tblItems": 1000000}
+    suggestions = rank_index_suggestions(queries, indexes, rows, TABLE_COLUMNS)
+    ranked = [(s["table"], s["column"]) for s in suggestions]
+
+    assert ("tblOrders", "OrderID") not in ranked and ("tblOrders", "受注日") not in ranked
+    assert ranked[0] == ("tblOrders", "Status")
+    status = suggestions[0]
+    assert status["queries"] == ["qryOpenOrders", "qryOrders"] and status["clauses"] == ["where"]
+    # 結合に使われる列は、同じ行数の抽出条件の列より上位になる
+    assert ranked.index(("tblOrders", "CustomerID")) < ranked.index(("tblOrders", "Amount"))
+    assert ranked.index(("tblItems", "OrderID")) < ranked.index(("tblItems", "Qty"))
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+        self.conn.indexed = sql.startswith("CREATE INDEX")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+        self.indexed = False
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_validate_suggestion_measures_before_and_after():
+    """インデックスの追加前後で測定し、測定後にインデックスを削除することをテストします。"""
+    conn = FakeConnection()
+    suggestion = {"table": "tblOrders", "column": "Status", "queries": ["qryOpenOrders", "qryBroken"]}
+
+    def benchmark(conn, query_name):
+        if query_name == "qryBroken":
+            raise RuntimeError("パラメーターが少なすぎます。")
+        return 0.5 if conn.indexed else 2.0
+
+    timings = validate_suggestion(conn, suggestion, benchmark)
+    assert timings == {"qryOpenOrders": (2.0, 0.5), "qryBroken": (None, None)}
+    assert conn.executed == ["CREATE INDEX [advise_tblOrders_Status] ON [tblOrders] ([Status])",
+                             "DROP INDEX [advise_tblOrders_Status] ON [tblOrders]"]
+    assert not conn.indexed and conn.commits == 2
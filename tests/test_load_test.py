@@ -0,0 +1,45 @@
+import sqlite3
+import contextlib
+
+import pytest
+
+from src.core.db_operations import run_query
+from src.core.load_test import parse_query_mix, run_load_test
+
+
+def test_parse_query_mix():
+    """クエリの構成比の指定が解析され、重みを省略したクエリは 1 として扱われ、0 以下の重みはエラーになることをテストします。"""
+    assert parse_query_mix("受注一覧=5, 在庫集計") == [("受注一覧", 5.0), ("在庫集計", 1.0)]
+    with pytest.raises(ValueError):
+        parse_query_mix("A=0")
+
+
+def test_run_load_test_against_sqlite(tmp_path):
+    """SQLiteを代わりに使用し、ユーザーごとの接続でクエリが実行され、ロックの競合が区別されることをテストします。"""
+    db_path = tmp_path / "backend.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE [Orders] (ID INTEGER PRIMARY KEY, Name TEXT)")
+    conn.executemany("INSERT INTO [Orders] VALUES (?, ?)", [(i, f"order {i}") for i in range(50)])
+    conn.commit()
+    conn.close()
+
+    opened = []
+
+    def open_connection():
+        opened.append(1)
+        return contextlib.closing(sqlite3.connect(db_path, check_same_thread=False))
+
+    def execute(connection, name):
+        if name == "Locked":
+            raise sqlite3.OperationalError("database is locked")
+        assert run_query(connection, name, batch_size=7) == 50
+
+    result = run_load_test(open_connection, execute, [("Orders", 3), ("Locked", 1)], users=3, duration=0.3, seed=1)
+
+    assert len(opened) == 3
+    assert result.completed > 0 and result.lock_errors > 0 and result.errors == 0
+    assert result.throughput > 0
+    assert {row["name"] for row in result.per_query()} == {"Orders", "Locked"}
+    assert {user for _, user, _, _, _ in result.samples} == {0, 1, 2}
+    timeline = result.timeline(0.1)
+    assert sum(point["lock_errors"] for point in timeline) == result.lock_errors
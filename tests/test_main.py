@@ -182,3 +182,18 @@ def test_search_command_missing_args():
     assert result.exit_code != 0
     assert "Missing argument 'FILE_PATH'" in result.stderr or \
            "Missing argument 'PATTERN'" in result.stderr
+
+def test_requested_commands_resolves_single_command():
+    """実行するコマンドのモジュールだけを読み込むため、引数からコマンド名を特定できることをテストします。"""
+    from src.main import requested_commands
+    assert requested_commands(["--debug", "export", "db.accdb"]) == ["export"]
+    assert requested_commands(["--help"]) is None
+    assert requested_commands([]) is None
+    assert requested_commands(["unknown"]) is None
+    assert requested_commands(["--profile-com-json", "out.json", "search", "db.accdb", "x"]) == ["search"]
+
+def test_spawned_worker_does_not_register_commands():
+    """spawn で起動されたワーカープロセスと同じく __mp_main__ として読み込んだ場合、コマンドが登録されないことをテストします。"""
+    import runpy
+    namespace = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "src", "main.py"), run_name="__mp_main__")
+    assert namespace["app"].registered_commands == []
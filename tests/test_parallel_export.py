@@ -0,0 +1,107 @@
+import sys
+import types
+import contextlib
+import concurrent.futures
+
+import pytest
+
+from src.core import parallel_export
+from src.core.parallel_export import split_into_shards, export_objects_parallel
+
+
+def test_split_into_shards_is_deterministic():
+    """入力順に関係なく、同じ一覧からは同じシャードが作られることをテストします。"""
+    entries = [("Queries", "q2"), ("Forms", "frmB"), ("Modules", "Module1"), ("Forms", "frmA"), ("Queries", "q1")]
+    shards = split_into_shards(entries, 2)
+
+    assert shards == split_into_shards(list(reversed(entries)), 2)
+    assert shards == [
+        [("Forms", "frmA"), ("Modules", "Module1"), ("Queries", "q2")],
+        [("Forms", "frmB"), ("Queries", "q1")],
+    ]
+
+
+def test_split_into_shards_skips_empty_shards():
+    assert split_into_shards([("Forms", "frmA")], 4) == [[("Forms", "frmA")]]
+
+
+class FakeAccessApplication:
+    """SaveAsText でファイルを書き出す、COMを使わないテスト用の Access.Application です。"""
+
+    def __init__(self, calls, failures):
+        self.calls = calls
+        self.failures = failures
+
+    def SaveAsText(self, object_type, name, filepath):
+        self.calls.append(name)
+        if self.failures.get(name, 0) > 0:
+            self.failures[name] -= 1
+            raise RuntimeError(f"SaveAsText failed: {name}")
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(f"text of {name}")
+
+
+class FakeCache:
+    def __init__(self, stored):
+        self.stored = dict(stored)
+        self.put_calls = []
+
+    def get(self, category, name, date_modified):
+        return self.stored.get((category, name, date_modified))
+
+    def put(self, category, name, date_modified, data):
+        self.put_calls.append((category, name, date_modified))
+        self.stored[(category, name, date_modified)] = data
+
+
+@pytest.fixture
+def fake_access(monkeypatch):
+    calls, failures = [], {}
+
+    @contextlib.contextmanager
+    def fake_access_application(db_path):
+        yield FakeAccessApplication(calls, failures)
+
+    @contextlib.contextmanager
+    def fake_temporary_access_copy(db_path):
+        yield db_path, None
+
+    monkeypatch.setitem(sys.modules, "pythoncom", types.SimpleNamespace(CoInitialize=lambda: None, CoUninitialize=lambda: None))
+    monkeypatch.setattr(parallel_export, "access_application", fake_access_application)
+    monkeypatch.setattr(parallel_export, "temporary_access_copy", fake_temporary_access_copy)
+    monkeypatch.setattr(parallel_export, "release_access_session", lambda db_path: None)
+    # ワーカープロセスではモンキーパッチが効かないため、同じプロセスのスレッドで実行する
+    monkeypatch.setattr(parallel_export.concurrent.futures, "ProcessPoolExecutor", concurrent.futures.ThreadPoolExecutor)
+    return calls, failures
+
+
+def test_export_objects_parallel_retries_failed_shard_and_merges_results(tmp_path, fake_access):
+    """ワーカーで失敗したオブジェクトが順番に再実行され、全シャードの結果が export_objects と同じ形式にまとめられることをテストします。"""
+    calls, failures = fake_access
+    # retries=1 ではワーカー内の2回とも失敗し、全ワーカー終了後の再実行で成功する
+    failures.update({"frmFlaky": 2, "qryBroken": 10})
+    entries = [
+        ("Forms", "frmMain", "d1"), ("Forms", "frmFlaky", "d1"), ("Reports", "rptSales", "d1"),
+        ("Queries", "qryBroken", "d1"), ("Modules", "Module1", "d1"),
+    ]
+    cache = FakeCache({("Reports", "rptSales", "d1"): b"cached report"})
+
+    exported_files, worker_stats, failed = export_objects_parallel(
+        "C:/work/app.accdb", str(tmp_path), workers=2, retries=1, cache=cache, entries=entries)
+
+    assert exported_files["Forms"] == ["frmMain.frm", "frmFlaky.frm"]
+    assert exported_files["Reports"] == ["rptSales.rpt"]
+    assert exported_files["Modules"] == ["Module1.bas"]
+    assert exported_files["Queries"] == []
+    assert [(category, name) for category, name, _ in failed] == [("Queries", "qryBroken")]
+    assert "qryBroken" in failed[0][2]
+    assert [stats["worker"] for stats in worker_stats] == [1, 2]
+    assert sum(stats["objects"] for stats in worker_stats) == 2
+    assert sum(stats["failed"] for stats in worker_stats) == 2
+    assert calls.count("frmFlaky") == 3
+
+    # キャッシュから出力したオブジェクトは SaveAsText を呼ばず、ワーカーで出力したものだけをキャッシュに登録する
+    assert "rptSales" not in calls
+    assert (tmp_path / "rptSales.rpt").read_bytes() == b"cached report"
+    assert sorted(cache.put_calls) == [("Forms", "frmFlaky", "d1"), ("Forms", "frmMain", "d1"), ("Modules", "Module1", "d1")]
+    assert cache.stored[("Forms", "frmFlaky", "d1")] == b"text of frmFlaky"
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from src.core.parameter_sets import load_parameter_sets, ParameterCycle
+
+
+def test_load_parameter_sets_from_json_and_csv(tmp_path):
+    """JSONとCSVのパラメーターが、クエリごとの値のタプルとして読み込まれることをテストします。"""
+    json_path = tmp_path / "params.json"
+    json_path.write_text(json.dumps({"qry期間": [["2024-01-01", "2024-01-31"], ["2024-02-01", "2024-02-29"]], "qry顧客": [10, 20]},
+                                    ensure_ascii=False), encoding="utf-8")
+    assert load_parameter_sets(str(json_path)) == {
+        "qry期間": [("2024-01-01", "2024-01-31"), ("2024-02-01", "2024-02-29")],
+        "qry顧客": [(10,), (20,)],
+    }
+
+    csv_path = tmp_path / "params.csv"
+    csv_path.write_text("クエリ名,値1,値2\nqry期間,2024-01-01,2024-01-31\nqry顧客,10,\n\n", encoding="utf-8-sig")
+    assert load_parameter_sets(str(csv_path)) == {"qry期間": [("2024-01-01", "2024-01-31")], "qry顧客": [("10",)]}
+
+    with pytest.raises(ValueError):
+        load_parameter_sets(str(tmp_path / "params.txt"))
+
+
+def test_parameter_cycle_rotates_through_sets():
+    """クエリごとのパラメーターが順番に繰り返し使用され、定義のないクエリには None が返されることをテストします。"""
+    cycle = ParameterCycle({"qry顧客": [(10,), (20,)]})
+    assert [cycle.next("qry顧客") for _ in range(3)] == [(10,), (20,), (10,)]
+    assert cycle.next("qry一覧") is None
+    assert "qry顧客" in cycle and "qry一覧" not in cycle
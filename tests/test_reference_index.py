@@ -0,0 +1,46 @@
+from src.core.reference_index import ReferenceIndex, reference_tokens, extract_public_procedures
+
+
+def test_reference_tokens_identifier_level():
+    """部分一致ではなく識別子単位でトークン化されることをテストします。"""
+    tokens = reference_tokens('DoCmd.OpenForm "Form10"\nSet rs = db.OpenRecordset("SELECT * FROM [顧客 一覧]")')
+    assert "form10" in tokens
+    assert "form1" not in tokens
+    assert "顧客 一覧" in tokens
+    assert "openrecordset" in tokens
+
+
+def test_reference_tokens_class_module_names():
+    """Form_xxx / Report_xxx 形式のクラスモジュール名が本体名としても登録されることをテストします。"""
+    tokens = reference_tokens("Form_frmMain.Requery\nReport_rptSales.Visible = True")
+    assert "frmmain" in tokens
+    assert "rptsales" in tokens
+
+
+def test_extract_public_procedures():
+    source = "Option Compare Database\nPublic Function GetTotal()\nEnd Function\nPrivate Sub Helper()\nEnd Sub\nSub Run()\nEnd Sub\n"
+    assert extract_public_procedures(source) == ["GetTotal", "Run"]
+
+
+def test_find_unused_excludes_self_and_substring_hits():
+    """自己参照や部分一致（Form1 と Form10）を参照とみなさないことをテストします。"""
+    index = ReferenceIndex()
+    index.add_source(("Forms", "Form1"), 'Begin Form\n  Caption ="Form1"\nEnd')
+    index.add_source(("Forms", "Form10"), 'DoCmd.OpenForm "Form10"')
+    index.add_source(("Modules", "Module1"), 'Attribute VB_Name = "Module1"\nPublic Function GetTotal()\nEnd Function')
+    index.add_source(("Queries", "qryMain"), 'dbMemo "SQL" ="SELECT GetTotal() FROM [tblOrders]"')
+    index.add_source(("Macros", "AutoExec"), 'Argument ="qryMain"')
+
+    objects = [("Forms", "Form1"), ("Forms", "Form10"), ("Modules", "Module1"), ("Queries", "qryMain"), ("Macros", "AutoExec")]
+    unused = index.find_unused(objects, {"Module1": ["GetTotal"]})
+
+    assert unused == [("Forms", "Form1"), ("Forms", "Form10"), ("Macros", "AutoExec")]
+
+
+def test_resolve_references_reports_identifiers():
+    index = ReferenceIndex()
+    index.add_source(("Modules", "Module1"), "Public Sub Calc()\nEnd Sub")
+    index.add_source(("Forms", "frmMain"), "Private Sub cmd_Click()\n  Calc\nEnd Sub")
+
+    references = index.resolve_references([("Modules", "Module1")], {"Module1": ["Calc"]})
+    assert references[("Modules", "Module1")] == {"Calc": {("Forms", "frmMain")}}
@@ -0,0 +1,54 @@
+import contextlib
+
+from src.core.relink import backend_path, replace_backend, plan_relink, relink_groups
+
+
+def test_backend_path_and_replace():
+    connect = ";DATABASE=\\\\server\\share\\old\\data.accdb;TABLE=T1"
+    assert backend_path(connect) == "\\\\server\\share\\old\\data.accdb"
+    assert replace_backend(connect, "D:\\new\\data.accdb") == ";DATABASE=D:\\new\\data.accdb;TABLE=T1"
+    assert backend_path("ODBC;DRIVER=SQL Server;DATABASE=sales") is None
+
+
+def test_plan_relink_groups_tables_by_backend():
+    """同じバックエンドを参照するテーブルが1つのグループにまとめられることをテストします。"""
+    linked = [
+        ("T1", ";DATABASE=\\\\srv\\old\\a.accdb"),
+        ("T2", ";DATABASE=\\\\SRV\\old\\b.accdb"),
+        ("T3", ";DATABASE=\\\\srv\\old\\a.accdb"),
+        ("T4", ";DATABASE=C:\\other\\c.accdb"),
+        ("T5", "ODBC;DSN=prod"),
+    ]
+    groups = plan_relink(linked, "\\\\srv\\old", "\\\\srv\\new")
+
+    assert [group.new_backend for group in groups] == ["\\\\srv\\new\\a.accdb", "\\\\srv\\new\\b.accdb"]
+    assert [name for name, _ in groups[0].tables] == ["T1", "T3"]
+    assert groups[0].tables[0][1] == ";DATABASE=\\\\srv\\new\\a.accdb"
+
+
+def test_relink_groups_opens_each_backend_once_and_skips_invalid():
+    """バックエンドは1回だけ開かれ、開けないバックエンドのテーブルは変更されないことをテストします。"""
+    groups = plan_relink([("T1", ";DATABASE=old\\a.accdb"), ("T2", ";DATABASE=old\\a.accdb"), ("T3", ";DATABASE=old\\missing.accdb")],
+                         "old", "new")
+    opened, refreshed = [], []
+
+    @contextlib.contextmanager
+    def open_backend(path):
+        if "missing" in path:
+            raise FileNotFoundError(path)
+        opened.append(path)
+        yield
+
+    results = relink_groups(groups, lambda name, connect: refreshed.append(name), open_backend)
+
+    assert opened == ["new\\a.accdb"]
+    assert refreshed == ["T1", "T2"]
+    assert results[0]["refreshed"] == 2 and results[0]["error"] is None
+    assert results[1]["refreshed"] == 0 and results[1]["error"]
+
+
+def test_relink_groups_dry_run_changes_nothing():
+    groups = plan_relink([("T1", ";DATABASE=old\\a.accdb")], "old", "new")
+    refreshed = []
+    results = relink_groups(groups, lambda name, connect: refreshed.append(name), lambda path: contextlib.nullcontext(), dry_run=True)
+    assert refreshed == [] and results[0]["tables"] == 1 and results[0]["refreshed"] == 0
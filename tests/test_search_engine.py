@@ -0,0 +1,19 @@
+import pytest
+from src.core.search_engine import compile_search_pattern, iter_matching_lines
+
+
+def test_keywords_are_literal_and_case_insensitive():
+    matcher = compile_search_pattern(["debug.print", "TODO"])
+    lines = ["Debug.Print x", "debugXprint", "' todo: remove", "End Sub"]
+    assert list(iter_matching_lines(matcher, lines)) == [(1, "Debug.Print x"), (3, "' todo: remove")]
+
+
+def test_regex_patterns():
+    matcher = compile_search_pattern([r"Form\d+\b"], regex=True)
+    lines = ['DoCmd.OpenForm "Form10"', "FormA"]
+    assert list(iter_matching_lines(matcher, lines)) == [(1, 'DoCmd.OpenForm "Form10"')]
+
+
+def test_empty_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        compile_search_pattern([""])
@@ -0,0 +1,69 @@
+import pytest
+from src.core.search_engine import compile_search_pattern
+from src.core.search_index import SearchIndex, text_trigrams
+
+
+@pytest.fixture
+def index(tmp_path):
+    db_path = tmp_path / "app.accdb"
+    db_path.write_bytes(b"dummy")
+    with SearchIndex(str(tmp_path / "index"), str(db_path)) as search_index:
+        yield search_index
+
+
+TEXTS = {
+    ("Modules", "Module1"): "Public Sub Main()\n    Debug.Print \"hello\"\nEnd Sub\n",
+    ("Forms", "frmOrders"): "Begin Form\n    RecordSource =\"tblOrders\"\nEnd\n",
+    ("Queries", "qryCustomers"): "dbMemo \"SQL\" =\"SELECT * FROM tblCustomers\"\n",
+}
+CATALOG = [(category, name, "2024-01-01") for category, name in TEXTS]
+
+
+def read_text(category, name, modified):
+    return TEXTS[(category, name)]
+
+
+def test_text_trigrams():
+    assert text_trigrams("ABCd") == {"abc", "bcd"}
+    assert text_trigrams("ab") == set()
+
+
+def test_candidates_are_narrowed_by_trigrams(index):
+    """キーワードの全トライグラムを含むオブジェクトのみが候補になることをテストします。"""
+    index.apply(CATALOG, dict(TEXTS))
+    ids = {(category, name): object_id for object_id, category, name, _ in index.objects()}
+
+    assert index.candidate_ids(["tblorders"]) == {ids[("Forms", "frmOrders")]}
+    assert index.candidate_ids(["debug.print", "tblCustomers"]) == {ids[("Modules", "Module1")], ids[("Queries", "qryCustomers")]}
+    assert index.candidate_ids(["zz"]) == set(ids.values())
+    assert index.candidate_ids(["notfound"]) == set()
+
+
+def test_iter_search_verifies_candidates(index):
+    index.apply(CATALOG, dict(TEXTS))
+    matcher = compile_search_pattern(["Debug.Print"])
+    results = list(index.iter_search(matcher, ["Debug.Print"], read_text))
+    assert results == [{"type": "Modules", "name": "Module1", "line_num": 2, "line_content": 'Debug.Print "hello"'}]
+
+
+def test_only_changed_objects_are_reindexed(index):
+    index.apply(CATALOG, dict(TEXTS))
+    TEXTS_CHANGED = dict(TEXTS)
+    TEXTS_CHANGED[("Forms", "frmOrders")] = "Begin Form\n    RecordSource =\"tblInvoices\"\nEnd\n"
+    catalog = [(c, n, "2024-02-01" if n == "frmOrders" else m) for c, n, m in CATALOG[:2]]
+
+    index.apply(catalog, {("Forms", "frmOrders"): TEXTS_CHANGED[("Forms", "frmOrders")]})
+
+    names = [name for _, _, name, _ in index.objects()]
+    assert names == ["Module1", "frmOrders"]
+    assert index.candidate_ids(["tblOrders"]) == set()
+    assert len(index.candidate_ids(["tblInvoices"])) == 1
+    assert index.candidate_ids(["tblCustomers"]) == set()
+
+
+def test_is_current_tracks_database_file(index, tmp_path):
+    assert not index.is_current()
+    index.mark_current()
+    assert index.is_current()
+    (tmp_path / "app.accdb").write_bytes(b"changed content")
+    assert not index.is_current()
@@ -0,0 +1,141 @@
+import pytest
+from src.core.session_pool import AccessSessionPool
+
+
+class FakeCollection:
+    def __init__(self):
+        self.items = []
+
+    @property
+    def Count(self):
+        return len(self.items)
+
+    def __call__(self, index):
+        return self.items[index]
+
+
+class FakeForm:
+    def __init__(self, name):
+        self.Name = name
+
+
+class FakeDoCmd:
+    def __init__(self, app):
+        self.app = app
+        self.warnings = None
+
+    def Close(self, object_type, name, save):
+        collection = self.app.Forms if object_type == 2 else self.app.Reports
+        collection.items = [obj for obj in collection.items if obj.Name != name]
+
+    def SetWarnings(self, value):
+        self.warnings = value
+
+
+class FakeProject:
+    def __init__(self, app):
+        self.app = app
+
+    @property
+    def FullName(self):
+        if self.app.crashed:
+            raise RuntimeError("RPC server is unavailable")
+        return self.app.db_path
+
+
+class FakeAccessApplication:
+    """Access.Application の代わりに使用する、COMを使わないテスト用オブジェクトです。"""
+
+    def __init__(self):
+        self.db_path = None
+        self.quit_called = False
+        self.crashed = False
+        self.Forms = FakeCollection()
+        self.Reports = FakeCollection()
+        self.DoCmd = FakeDoCmd(self)
+        self.CurrentProject = FakeProject(self)
+
+    def OpenCurrentDatabase(self, db_path):
+        self.db_path = db_path
+
+    def CloseCurrentDatabase(self):
+        self.db_path = None
+
+    def Quit(self):
+        self.quit_called = True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def pool():
+    apps = []
+
+    def factory():
+        app = FakeAccessApplication()
+        apps.append(app)
+        return app
+
+    clock = FakeClock()
+    session_pool = AccessSessionPool(factory, idle_timeout=60, clock=clock)
+    session_pool.apps = apps
+    session_pool.clock = clock
+    return session_pool
+
+
+def test_session_is_reused_for_same_database(pool):
+    """同じデータベースに対する連続したコマンドで、同じインスタンスが再利用されることをテストします。"""
+    with pool.session("C:/work/app.accdb") as app1:
+        pass
+    with pool.session("C:/work/app.accdb") as app2:
+        pass
+    with pool.session("C:/work/other.accdb") as app3:
+        pass
+
+    assert app1 is app2
+    assert app3 is not app1
+    assert (pool.launches, pool.reuses) == (2, 1)
+
+
+def test_session_is_reset_between_commands(pool):
+    """返却時に開いたままのフォームが閉じられることをテストします。"""
+    with pool.session("C:/work/app.accdb") as app:
+        app.Forms.items.append(FakeForm("frmMain"))
+        app.DoCmd.SetWarnings(False)
+    assert app.Forms.Count == 0
+    assert app.DoCmd.warnings is True
+
+
+def test_unhealthy_session_is_restarted(pool):
+    with pool.session("C:/work/app.accdb") as app1:
+        pass
+    app1.crashed = True
+    with pool.session("C:/work/app.accdb") as app2:
+        pass
+
+    assert app2 is not app1
+    assert app1.quit_called
+
+
+def test_idle_session_is_closed(pool):
+    with pool.session("C:/work/app.accdb") as app:
+        pass
+    pool.clock.now = 61
+    assert pool.evict_idle() == 1
+    assert app.quit_called
+    assert not pool.holds("C:/work/app.accdb")
+
+
+def test_close_all(pool):
+    with pool.session("C:/work/app.accdb"):
+        pass
+    with pool.session("C:/work/other.accdb"):
+        pass
+    assert pool.close_all() == 2
+    assert all(app.quit_called for app in pool.apps)
@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from src.core.db_operations import iter_table_rows
+from src.core.table_diff import (
+    TableDiff, OrderMismatchError, merge_join_diff, as_table_diff, row_digest, digest_counts, collect_rows_by_digest,
+    diff_rows_by_key,
+)
+
+
+def _connection(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE [顧客] (ID INTEGER PRIMARY KEY, Name TEXT, Amount INTEGER)")
+    conn.executemany("INSERT INTO [顧客] VALUES (?, ?, ?)", rows)
+    return conn
+
+
+def test_merge_join_diff_reports_added_removed_and_updated():
+    """主キーが同じで内容が異なる行が、列単位の UPDATED として報告されることをテストします。"""
+    conn1 = _connection([(1, "a", 10), (2, "b", 20), (3, "c", 30)])
+    conn2 = _connection([(2, "b", 25), (3, "c", 30), (4, "d", 40)])
+    columns = ["ID", "Name", "Amount"]
+
+    result = merge_join_diff(
+        TableDiff("顧客", columns, ["ID"]),
+        iter_table_rows(conn1, "顧客", columns, ["ID"], batch_size=2),
+        iter_table_rows(conn2, "顧客", columns, ["ID"], batch_size=2),
+        [0],
+    )
+
+    assert result.removed == [(1, "a", 10)]
+    assert result.added == [(4, "d", 40)]
+    assert result.updated == [((2,), [("Amount", 20, 25)])]
+    assert result.total_changes == 3
+
+
+def test_merge_join_diff_without_unique_key_compares_as_multiset():
+    """キーが重複する場合は行の多重集合として比較されることをテストします。"""
+    rows1 = [("x", 1), ("x", 1), ("y", 2)]
+    rows2 = [("x", 1), ("y", 2), ("y", 3)]
+    result = merge_join_diff(TableDiff("T", ["A", "B"], ["A"]), iter(rows1), iter(rows2), [0])
+    assert result.removed == [("x", 1)]
+    assert result.added == [("y", 3)]
+    assert result.updated == []
+
+
+def test_merge_join_diff_detects_unsorted_input():
+    with pytest.raises(OrderMismatchError):
+        merge_join_diff(TableDiff("T", ["A"], ["A"]), iter([(2,), (1,)]), iter([]), [0])
+
+
+def test_table_diff_keeps_counts_beyond_reported_rows():
+    """レポート用に保持する行数を超えても、件数は全件数えられることをテストします。"""
+    result = merge_join_diff(TableDiff("T", ["A"], ["A"], max_rows=2), iter([]), iter([(i,) for i in range(10)]), [0])
+    assert result.added_count == 10 and len(result.added) == 2
+
+
+def test_as_table_diff_converts_legacy_format():
+    result = as_table_diff("T", ({(1, "a")}, {"Table only exists in file 2"}))
+    assert result.removed == [(1, "a")] and result.note == "Table only exists in file 2"
+
+
+def test_row_digest_is_canonical():
+    """同じ値は型の表現が異なっても同じハッシュ値になり、値の境界が区別されることをテストします。"""
+    import decimal
+    assert row_digest((1, "a", None)) == row_digest((1.0, "a", None))
+    assert row_digest((decimal.Decimal("1.50"),)) == row_digest((decimal.Decimal("1.5"),))
+    assert row_digest(("ab", "c")) != row_digest(("a", "bc"))
+    assert row_digest((None,)) != row_digest(("",))
+    assert len(row_digest((1,))) == 16
+
+
+def test_digest_diff_counts_duplicates_and_refetches_only_differences():
+    """重複行が件数として比較され、差分のある行だけが取得されることをテストします。"""
+    rows1 = [(1, "a"), (2, "b"), (2, "b"), (3, "c")]
+    rows2 = [(1, "a"), (2, "b"), (3, "x"), (4, "d")]
+    counts1, counts2 = digest_counts(rows1), digest_counts(rows2)
+    only1, only2 = counts1 - counts2, counts2 - counts1
+
+    removed = collect_rows_by_digest(rows1, only1)
+    added = collect_rows_by_digest(rows2, only2)
+    assert removed == [(2, "b"), (3, "c")]
+    assert added == [(3, "x"), (4, "d")]
+
+    result = diff_rows_by_key(TableDiff("T", ["ID", "Name"], ["ID"]), removed, added, [0])
+    assert result.removed == [(2, "b")]
+    assert result.added == [(4, "d")]
+    assert result.updated == [((3,), [("Name", "c", "x")])]
@@ -0,0 +1,33 @@
+import os
+
+from src.core.table_fingerprint import compute_fingerprint, FingerprintCache
+
+
+def test_fingerprint_ignores_row_order_but_counts_duplicates():
+    """行の順序が異なっても同じ値になり、重複行の件数の違いは区別されることをテストします。"""
+    columns = ["ID", "Name"]
+    rows = [(1, "a"), (2, "b"), (2, "b")]
+    assert compute_fingerprint(columns, rows) == compute_fingerprint(columns, list(reversed(rows)))
+    assert compute_fingerprint(columns, rows) != compute_fingerprint(columns, rows[:2])
+    assert compute_fingerprint(columns, rows) != compute_fingerprint(["ID", "Title"], rows)
+    assert compute_fingerprint(columns, rows)["rows"] == 3
+
+
+def test_fingerprint_cache_is_invalidated_when_file_changes(tmp_path):
+    """ファイルのサイズや更新日時が変わると、キャッシュが使われなくなることをテストします。"""
+    db_path = tmp_path / "data.accdb"
+    db_path.write_bytes(b"v1")
+    cache_dir = tmp_path / "cache"
+    fingerprint = compute_fingerprint(["ID"], [(1,)])
+
+    cache = FingerprintCache(str(cache_dir), str(db_path))
+    assert cache.get("T") is None
+    cache.put("T", fingerprint)
+    cache.save()
+
+    cache = FingerprintCache(str(cache_dir), str(db_path))
+    assert cache.get("T") == fingerprint and cache.hits == 1
+
+    db_path.write_bytes(b"v2 changed")
+    os.utime(db_path, ns=(1, 1))
+    assert FingerprintCache(str(cache_dir), str(db_path)).get("T") is None
@@ -0,0 +1,109 @@
+import sqlite3
+
+from src.core.table_fingerprint import compute_fingerprint
+from src.core.table_pipeline import SideFetcher, BufferedBytes, pipelined_table_diffs
+
+
+class SqliteFetcher(SideFetcher):
+    """sqlite3 には cursor.columns() がないため、列定義を PRAGMA から取得します。"""
+
+    def describe(self, table):
+        rows = self.conn.execute(f"PRAGMA table_info([{table}])").fetchall()
+        return [(row[1], 12) for row in rows], [row[1] for row in rows if row[5]]
+
+
+def _database(tables):
+    # 読み込みは専用のスレッドで行われるため、作成したスレッド以外からの使用を許可する
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    for table, rows in tables.items():
+        conn.execute(f"CREATE TABLE [{table}] (ID INTEGER PRIMARY KEY, Name TEXT)")
+        conn.executemany(f"INSERT INTO [{table}] VALUES (?, ?)", rows)
+    return conn
+
+
+def test_pipelined_table_diffs_returns_results_in_table_order():
+    """先読みしながら比較しても、結果がテーブルの順に返り、変更が UPDATED として報告されることをテストします。"""
+    tables = {f"T{i}": [(1, "a"), (2, "b")] for i in range(5)}
+    changed = dict(tables, T3=[(1, "a"), (2, "x"), (3, "c")])
+    fetcher1 = SqliteFetcher(_database(tables), batch_size=1)
+    fetcher2 = SqliteFetcher(_database(changed), batch_size=1)
+    try:
+        results = list(pipelined_table_diffs(fetcher1, fetcher2, sorted(tables), max_inflight=2, memory_cap=1))
+    finally:
+        fetcher1.close()
+        fetcher2.close()
+
+    assert [table for table, _ in results] == sorted(tables)
+    diffs = {table: result for table, result in results if result.has_changes()}
+    assert list(diffs) == ["T3"]
+    assert diffs["T3"].updated == [((2,), [("Name", "b", "x")])]
+    assert diffs["T3"].added == [(3, "c")]
+    assert fetcher1.rows == 10 and fetcher2.rows == 11
+
+
+def test_fetch_adds_table_size_to_shared_counter():
+    """読み込んだテーブルのおおよそのサイズが、読み込みスレッドから共有のカウンターに加算されることをテストします。"""
+    rows = [(i, "x" * 100) for i in range(1000)]
+    fetcher = SqliteFetcher(_database({"T": rows}), batch_size=100)
+    buffered = BufferedBytes()
+    try:
+        fetched = fetcher.submit("T", buffered).result()
+    finally:
+        fetcher.close()
+
+    assert fetched.bytes > 100 * len(rows)
+    assert buffered.value == fetched.bytes
+    buffered.release(fetched.bytes)
+    assert buffered.value == 0
+
+
+class FakeCache:
+    def __init__(self, fingerprints):
+        self.fingerprints = dict(fingerprints)
+
+    def get(self, table):
+        return self.fingerprints.get(table)
+
+    def put(self, table, fingerprint):
+        self.fingerprints[table] = fingerprint
+
+
+def test_pipelined_table_diffs_skips_tables_with_matching_cached_fingerprints():
+    """両方のキャッシュのフィンガープリントが一致するテーブルは読み込まず、計算した値はキャッシュされることをテストします。"""
+    tables = {"A": [(1, "a")], "B": [(1, "b")]}
+    cached = {"A": compute_fingerprint(["ID", "Name"], [(1, "a")])}
+    caches = (FakeCache(cached), FakeCache(cached))
+    fetcher1 = SqliteFetcher(_database(tables))
+    fetcher2 = SqliteFetcher(_database(dict(tables, B=[(1, "x")])))
+    try:
+        results = dict(pipelined_table_diffs(fetcher1, fetcher2, ["A", "B"], use_fingerprints=True, fingerprint_caches=caches))
+    finally:
+        fetcher1.close()
+        fetcher2.close()
+
+    assert results["A"] is None
+    assert results["B"].updated == [((1,), [("Name", "b", "x")])]
+    assert fetcher1.rows == 1
+    assert caches[0].get("B") == compute_fingerprint(["ID", "Name"], [(1, "b")])
+    assert caches[1].get("B") == compute_fingerprint(["ID", "Name"], [(1, "x")])
+
+
+def test_pipelined_table_diffs_skips_matching_tables_with_one_cold_cache():
+    """一方のファイルのキャッシュが無効になっていても、計算したフィンガープリントが一致するテーブルは読み込まないことをテストします。"""
+    tables = {"A": [(1, "a"), (2, "b")], "B": [(1, "b")]}
+    baseline = FakeCache({table: compute_fingerprint(["ID", "Name"], rows) for table, rows in tables.items()})
+    changed = FakeCache({})
+    fetcher1 = SqliteFetcher(_database(tables))
+    fetcher2 = SqliteFetcher(_database(dict(tables, B=[(1, "b"), (2, "c")])))
+    try:
+        results = dict(pipelined_table_diffs(fetcher1, fetcher2, ["A", "B"], use_fingerprints=True,
+                                             fingerprint_caches=(baseline, changed)))
+    finally:
+        fetcher1.close()
+        fetcher2.close()
+
+    assert results["A"] is None
+    assert results["B"].added == [(2, "c")]
+    # 比較のために読み込んだのは変更されたテーブル B のみ
+    assert (fetcher1.rows, fetcher2.rows) == (1, 2)
+    assert changed.get("A") == baseline.get("A")
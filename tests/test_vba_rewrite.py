@@ -0,0 +1,86 @@
+from src.core.vba_rewrite import rewrite_line, plan_line_changes, component_owner, rewrite_code_module, VBEXT_CT_DOCUMENT
+
+
+class FakeCodeModule:
+    """CodeModule の代わりに使用し、呼び出された操作を記録するオブジェクトです。"""
+
+    def __init__(self, text, early_bound=False):
+        self.lines = text.split("\r\n")
+        self.early_bound = early_bound
+        self.calls = []
+
+    @property
+    def CountOfLines(self):
+        self.calls.append("CountOfLines")
+        return len(self.lines)
+
+    def Lines(self, start, count):
+        self.calls.append("Lines")
+        return "\r\n".join(self.lines[start - 1:start - 1 + count])
+
+    def Find(self, target, start_line, start_column, end_line, end_column, whole_word, match_case, pattern):
+        self.calls.append("Find")
+        text = "\r\n".join(self.lines)
+        found = target in text if match_case else target.lower() in text.lower()
+        return (found, 1, 1, 1, 1) if self.early_bound else found
+
+    def ReplaceLine(self, line_no, text):
+        self.calls.append("ReplaceLine")
+        self.lines[line_no - 1] = text
+
+
+def test_rewrite_line():
+    assert rewrite_line('c = "DSN=test"', "DSN=test", "DSN=prod") == 'c = "DSN=prod"'
+    assert rewrite_line("    Debug.Print x", "DSN=test", "DSN=prod") == "'    Debug.Print x"
+    assert rewrite_line("' Debug.Print x", "DSN=test", "DSN=prod") == "' Debug.Print x"
+
+
+def test_plan_line_changes_returns_only_changed_lines():
+    text = 'Sub A()\r\n    Debug.Print 1\r\n    c = "DSN=test"\r\nEnd Sub\r\n'
+    assert plan_line_changes(text, "DSN=test", "DSN=prod") == [(2, "'    Debug.Print 1"), (3, '    c = "DSN=prod"')]
+
+
+def test_component_owner():
+    assert component_owner("Form_frmMain", VBEXT_CT_DOCUMENT) == ("Forms", "frmMain")
+    assert component_owner("Report_rptSales", VBEXT_CT_DOCUMENT) == ("Reports", "rptSales")
+    assert component_owner("Module1", 1) == ("Modules", "Module1")
+
+
+def test_component_owner_keeps_prefixed_standard_modules():
+    """"Form_" で始まる標準モジュールやクラスモジュールがフォームとして扱われないことをテストします。"""
+    assert component_owner("Form_Utils", 1) == ("Modules", "Form_Utils")
+    assert component_owner("Report_Helper", 2) == ("Modules", "Report_Helper")
+
+
+def test_rewrite_code_module_replaces_only_changed_lines():
+    """変更が必要な行だけが ReplaceLine で置き換えられることをテストします。"""
+    module = FakeCodeModule("Sub A()\r\n    x = 1\r\n    Debug.Print x\r\nEnd Sub", early_bound=True)
+
+    stats = rewrite_code_module("Module1", module, "DSN=test", "DSN=prod")
+
+    assert module.lines[2] == "'    Debug.Print x"
+    assert module.calls == ["Find", "Find", "CountOfLines", "Lines", "ReplaceLine"]
+    assert stats["candidate"] and stats["changed_lines"] == 1 and stats["com_calls"] == 5
+
+
+def test_rewrite_code_module_skips_non_candidates():
+    """Find で対象外と判定されたモジュールは読み込まないことをテストします。"""
+    module = FakeCodeModule("Sub A()\r\nEnd Sub")
+    stats = rewrite_code_module("Module1", module, "DSN=test", "DSN=prod")
+    assert not stats["candidate"] and module.calls == ["Find", "Find"]
+
+
+
+def test_rewrite_code_module_confirms_cache_misses_with_find():
+    """キャッシュのテキストが古く対象外と判定されても、Find で確認して書き換えることをテストします。"""
+    module = FakeCodeModule("Sub A()\r\n    Debug.Print 1\r\nEnd Sub")
+    stats = rewrite_code_module("Module1", module, "DSN=test", "DSN=prod", cached_text="Sub A()\r\nEnd Sub")
+    assert stats["candidate"] and stats["changed_lines"] == 1
+    assert module.calls[:2] == ["Find", "Find"]
+
+
+def test_rewrite_code_module_skips_find_for_cached_candidates():
+    """キャッシュのテキストで対象と判定されたモジュールは Find を省略することをテストします。"""
+    module = FakeCodeModule('Sub A()\r\n    c = "DSN=test"\r\nEnd Sub')
+    stats = rewrite_code_module("Module1", module, "DSN=test", "DSN=prod", cached_text='c = "DSN=test"')
+    assert module.calls == ["CountOfLines", "Lines", "ReplaceLine"] and stats["com_calls"] == 3